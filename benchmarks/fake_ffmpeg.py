@@ -0,0 +1,103 @@
+# benchmarks/fake_ffmpeg.py
+"""
+Stand-in for ffmpeg and ffprobe that understands just the command lines
+utils/ffmpeg_utils.py builds, so the video pipeline can run without ffmpeg.
+
+Use it through the environment variables read by utils.ffmpeg_utils:
+
+    GLOBAL_CLASSROOM_FFMPEG="python benchmarks/fake_ffmpeg.py"
+    GLOBAL_CLASSROOM_FFPROBE="python benchmarks/fake_ffmpeg.py"
+
+Inputs are the fake videos from benchmarks.fixtures.make_video: a JSON header
+line with the duration, padded to a realistic size. Encodes and muxes report
+progress like ffmpeg does and write the video bytes plus the subtitles to the
+output. GLOBAL_CLASSROOM_FAKE_FFMPEG_SPEED sets how many media seconds are
+processed per wall second (0, the default, means no delay).
+"""
+
+import json
+import math
+import os
+import struct
+import sys
+import time
+
+SPEED_ENV = "GLOBAL_CLASSROOM_FAKE_FFMPEG_SPEED"
+DEFAULT_DURATION = 10.0
+_PROGRESS_STEP_SECONDS = 5.0
+
+
+def read_duration(path):
+    try:
+        with open(path, "rb") as f:
+            header = json.loads(f.readline().decode("utf-8"))
+        return float(header["duration"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return DEFAULT_DURATION
+
+
+def _inputs(args):
+    return [args[i + 1] for i, arg in enumerate(args[:-1]) if arg == "-i"]
+
+
+def write_audio(duration, sample_rate, out, progress=None):
+    """
+    Writes speech-like 16-bit mono PCM: 4 s of tone, then 1 s of silence.
+    With a progress stream, reports the position there after every period.
+    """
+    tone = [int(8000 * math.sin(2 * math.pi * 220 * n / sample_rate)) for n in range(4 * sample_rate)]
+    period = struct.pack(f"<{len(tone)}h", *tone) + bytes(2 * sample_rate)
+    total = int(duration * sample_rate) * 2
+    remaining = total
+    while remaining > 0:
+        out.write(period[:remaining])
+        remaining -= len(period)
+        if progress is not None:
+            position = (total - max(remaining, 0)) / 2 / sample_rate
+            state = "end" if remaining <= 0 else "continue"
+            progress.write(f"out_time_us={int(position * 1000000)}\nprogress={state}\n")
+            progress.flush()
+    out.flush()
+
+
+def encode(args, duration):
+    speed = float(os.environ.get(SPEED_ENV, "0") or 0)
+    position = 0.0
+    while True:
+        position = min(duration, position + _PROGRESS_STEP_SECONDS)
+        if speed:
+            time.sleep(_PROGRESS_STEP_SECONDS / speed)
+        done = position >= duration
+        sys.stdout.write(f"out_time_us={int(position * 1000000)}\nprogress={'end' if done else 'continue'}\n")
+        sys.stdout.flush()
+        if done:
+            break
+    with open(args[-1], "wb") as out:
+        for path in _inputs(args):
+            with open(path, "rb") as f:
+                out.write(f.read())
+
+
+def main(args):
+    if "-encoders" in args:
+        print("Encoders:\n V..... libx264              libx264 H.264 / AVC (fake)")
+        return 0
+    if "-show_entries" in args:
+        print(read_duration(args[-1]))
+        return 0
+    inputs = _inputs(args)
+    if not inputs or not os.path.exists(inputs[0]):
+        sys.stderr.write(f"{inputs[0] if inputs else '?'}: No such file or directory\n")
+        return 1
+    duration = read_duration(inputs[0])
+    if "s16le" in args:
+        sample_rate = int(args[args.index("-ar") + 1]) if "-ar" in args else 16000
+        progress = sys.stderr if "-progress" in args else None
+        write_audio(duration, sample_rate, sys.stdout.buffer, progress)
+        return 0
+    encode(args, duration)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
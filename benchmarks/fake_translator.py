@@ -0,0 +1,55 @@
+# benchmarks/fake_translator.py
+"""Local stand-ins for Google Translate, for tests and benchmarks."""
+
+import random
+import threading
+import time
+
+from utils.translation_backends import TranslatorBackend
+
+
+class FakeTranslator:
+    """
+    Local stand-in for GoogleTranslator with the same translate(text) method.
+
+    Each call sleeps for `latency` seconds (plus up to `jitter`), then fails
+    with probability `failure_rate` or returns the text tagged with the target
+    language line by line, so batched requests keep their line structure.
+    Counts calls across all instances in `FakeTranslator.calls`.
+    """
+
+    calls = 0
+    _calls_lock = threading.Lock()
+
+    def __init__(self, source='auto', target='ne', latency=0.0, jitter=0.0, failure_rate=0.0, seed=None):
+        self.source = source
+        self.target = target
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+
+    def translate(self, text):
+        with FakeTranslator._calls_lock:
+            FakeTranslator.calls += 1
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            raise ConnectionError("Injected translation failure")
+        return "\n".join(f"[{self.target}] {line}" if line.strip() else line for line in text.split("\n"))
+
+
+class FakeBackend(TranslatorBackend):
+    """A translation backend built on FakeTranslator; can be pickled like the built-in ones."""
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=None, rate=None):
+        self._options = (latency, jitter, failure_rate, seed, rate)
+
+        def factory(source_language, target_language):
+            return FakeTranslator(source=source_language, target=target_language, latency=latency, jitter=jitter,
+                                  failure_rate=failure_rate, seed=seed)
+        super().__init__(factory, name="fake", default_concurrency=4, default_rate=rate)
+
+    def __reduce__(self):
+        return FakeBackend, self._options
@@ -0,0 +1,143 @@
+# benchmarks/fixtures.py
+"""Synthetic inputs for the benchmarks."""
+
+import json
+import os
+import shutil
+import subprocess
+
+_WORDS = ("energy", "cell", "the", "of", "photosynthesis", "and", "a", "lecture", "students", "reaction",
+          "measure", "model", "we", "observe", "temperature", "is", "to", "pressure", "in", "result")
+
+
+def sentence(index, words=12):
+    """Returns a deterministic, mostly unique sentence."""
+    picked = [_WORDS[(index * 7 + i * 3 + i * i) % len(_WORDS)] for i in range(words)]
+    return f"{' '.join(picked).capitalize()} ({index})."
+
+
+def _timestamp(seconds):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02}:{minutes:02}:{secs:02},{millis:03}"
+
+
+def make_srt(path, cues=500, cue_seconds=3.0, repeat_every=0):
+    """
+    Writes an SRT file. With repeat_every, every n-th cue repeats an earlier
+    text, like the recurring phrases of a real lecture.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(cues):
+            text_index = i % repeat_every if repeat_every and i >= repeat_every and i % 3 == 0 else i
+            f.write(f"{i + 1}\n{_timestamp(i * cue_seconds)} --> {_timestamp((i + 1) * cue_seconds)}\n"
+                    f"{sentence(text_index)}\n\n")
+    return path
+
+
+def make_docx(path, paragraphs=1000, table_rows=20, image_bytes=0):
+    """
+    Writes a Word document with paragraphs split into several formatted runs,
+    a table with a nested table, a header and a footer, and optionally a
+    filler image of about image_bytes.
+    """
+    from docx import Document
+    document = Document()
+    document.sections[0].header.paragraphs[0].text = "Course pack - synthetic benchmark"
+    document.sections[0].footer.paragraphs[0].text = "Page footer text"
+    for i in range(paragraphs):
+        paragraph = document.add_paragraph()
+        words = sentence(i, words=24).split(" ")
+        # Bold a few words in the middle, like emphasis in course notes.
+        paragraph.add_run(" ".join(words[:8]) + " ")
+        paragraph.add_run(" ".join(words[8:11]) + " ").bold = True
+        paragraph.add_run(" ".join(words[11:]))
+    table = document.add_table(rows=table_rows, cols=3)
+    for r, row in enumerate(table.rows):
+        for c, cell in enumerate(row.cells):
+            cell.text = sentence(paragraphs + r * 3 + c, words=5)
+    table.cell(0, 0).add_table(rows=2, cols=2).cell(0, 0).text = "Nested table cell"
+    if image_bytes:
+        import io
+        document.add_picture(io.BytesIO(_filler_bmp(image_bytes)))
+    document.save(path)
+    return path
+
+
+def _filler_bmp(size):
+    """Returns an uncompressed grey BMP image of roughly `size` bytes."""
+    import struct
+    side = max(1, int((size / 3) ** 0.5)) // 4 * 4 or 4
+    pixels = bytes([128]) * (side * side * 3)
+    header = struct.pack("<2sIHHI", b"BM", 54 + len(pixels), 0, 0, 54)
+    info = struct.pack("<IiiHHIIiiII", 40, side, side, 1, 24, 0, len(pixels), 2835, 2835, 0, 0)
+    return header + info + pixels
+
+
+def make_video(path, seconds=120, real=False, bytes_per_second=250000):
+    """
+    Writes a short video. With real=True it is encoded by ffmpeg from test
+    patterns; otherwise it is a fake for benchmarks/fake_ffmpeg.py: a JSON
+    header with the duration, padded to the size of a real lecture video.
+    """
+    if real:
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg is not installed; use the fake video instead")
+        subprocess.run([ffmpeg, "-v", "error", "-y", "-f", "lavfi", "-i", f"testsrc=size=640x360:rate=25:d={seconds}",
+                        "-f", "lavfi", "-i", f"sine=frequency=220:d={seconds}", "-shortest",
+                        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", path], check=True)
+        return path
+    with open(path, "wb") as f:
+        f.write(json.dumps({"duration": seconds}).encode("utf-8") + b"\n")
+        remaining = int(seconds * bytes_per_second)
+        block = os.urandom(1 << 16)
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= len(block)
+    return path
+
+
+# Reference text of the speech fixture: natural sentences, so the word error
+# rate reflects what a lecture transcription would get.
+LECTURE_TEXT = (
+    "Today we look at how energy moves through an ecosystem. "
+    "Producers such as plants and algae capture sunlight and store it as chemical energy. "
+    "When a herbivore eats a plant, only about ten percent of that energy reaches the next level. "
+    "The rest is lost as heat through respiration and movement. "
+    "That is why food chains rarely have more than four or five links. "
+    "Next week we will measure the temperature and pressure in our own model ecosystem, "
+    "and compare the result with what the students observed last year."
+)
+
+
+def make_speech(path, text=LECTURE_TEXT, words_per_minute=150):
+    """
+    Writes a WAV file of `text` spoken by espeak-ng (or espeak), for
+    transcription benchmarks. Raises RuntimeError if neither is installed.
+    """
+    espeak = shutil.which("espeak-ng") or shutil.which("espeak")
+    if espeak is None:
+        raise RuntimeError("espeak-ng is not installed; pass a recording with --clip and --reference instead")
+    subprocess.run([espeak, "-v", "en", "-s", str(words_per_minute), "-w", path, text], check=True)
+    return path
+
+
+def read_wav(path, sample_rate=16000):
+    """Reads a PCM WAV file as mono float32 samples at sample_rate, without ffmpeg."""
+    import wave
+    import numpy as np
+    with wave.open(path, "rb") as f:
+        channels, width, rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        frames = f.readframes(f.getnframes())
+    if width != 2:
+        raise ValueError(f"Expected 16-bit PCM in '{path}', got {8 * width}-bit")
+    samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate:
+        # Linear interpolation is enough for speech recognition benchmarks.
+        positions = np.arange(int(len(samples) * sample_rate / rate)) * (rate / sample_rate)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+    return samples
@@ -0,0 +1,237 @@
+# benchmarks/pipeline.py
+"""
+Offline end-to-end benchmarks of subtitle, document and video translation.
+
+    python -m benchmarks.pipeline
+    python -m benchmarks.pipeline --scenario video --video-seconds 600 --latency 0.2 --json results.json
+
+Every scenario runs in a fresh interpreter with its own translation memory,
+checkpoint store and work dir under a temporary folder, against local
+stand-ins: benchmarks.fake_translator.FakeBackend for Google Translate,
+benchmarks.stubs.StubWhisperModel for Whisper and benchmarks/fake_ffmpeg.py
+for ffmpeg (use --whisper real and --ffmpeg real for the real ones). Each
+reports wall time per stage, translation requests, peak RSS and bytes
+written.
+"""
+
+import argparse
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from utils.translation_backends import TranslationBackend
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("srt", "docx", "docx-stream", "video")
+
+
+def _tree_bytes(root):
+    total = 0
+    for folder, _, files in os.walk(root):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(folder, name))
+            except OSError:
+                pass
+    return total
+
+
+def _peak_rss_mb():
+    """Returns (this process, its child processes) peak RSS in MB, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return None, None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+
+def _timed(timings, name, func, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+class _CountingBackend(TranslationBackend):
+    """Wraps a translation backend and counts the batches sent to it."""
+
+    def __init__(self, backend):
+        self._backend = backend
+        self.calls = 0
+        for name in ("name", "max_chars", "max_texts", "default_concurrency", "default_rate", "joins_lines"):
+            setattr(self, name, getattr(backend, name))
+
+    def translate_batch(self, texts, source_language, target_language):
+        self.calls += 1
+        return self._backend.translate_batch(texts, source_language, target_language)
+
+
+def _configure(args, root):
+    """Points state at the scratch folder and swaps in the stand-ins. Runs before the pipeline is imported."""
+    os.environ["GLOBAL_CLASSROOM_TM_PATH"] = os.path.join(root, "translation_memory.sqlite3")
+    os.environ["GLOBAL_CLASSROOM_CHECKPOINT_DIR"] = os.path.join(root, "checkpoints")
+    os.environ["GLOBAL_CLASSROOM_WORK_DIR"] = os.path.join(root, "work")
+    os.makedirs(os.environ["GLOBAL_CLASSROOM_WORK_DIR"], exist_ok=True)
+    if args.ffmpeg == "fake":
+        command = [sys.executable, os.path.join(REPO_ROOT, "benchmarks", "fake_ffmpeg.py")]
+        command = shlex.join(command) if os.name != "nt" else " ".join(command)
+        os.environ["GLOBAL_CLASSROOM_FFMPEG"] = command
+        os.environ["GLOBAL_CLASSROOM_FFPROBE"] = command
+        os.environ["GLOBAL_CLASSROOM_FAKE_FFMPEG_SPEED"] = str(args.ffmpeg_speed)
+
+    from utils.translation_backends import get_backend, set_default_backend
+    if args.backend == "fake":
+        from benchmarks.fake_translator import FakeBackend
+        backend = FakeBackend(latency=args.latency, jitter=args.jitter, rate=args.rate or None)
+    else:
+        backend = get_backend(args.backend)
+    backend = _CountingBackend(backend)
+    set_default_backend(backend)
+    if args.whisper == "stub":
+        from utils.model_cache import set_model_loader
+        from benchmarks.stubs import stub_loader
+        set_model_loader(stub_loader(args.whisper_rtf))
+    return backend
+
+
+def run_scenario(name, args):
+    """Runs one scenario in this process and returns its result dict."""
+    root = tempfile.mkdtemp(prefix="global-classroom-bench-")
+    try:
+        backend = _configure(args, root)
+        from benchmarks import fixtures
+
+        fixtures_dir = os.path.join(root, "fixtures")
+        out_dir = os.path.join(root, "out")
+        os.makedirs(fixtures_dir)
+        os.makedirs(out_dir)
+        timings = {}
+        result = {"scenario": name, "languages": args.languages, "error": None}
+
+        if name == "srt":
+            srt_path = _timed(timings, "fixture", fixtures.make_srt, os.path.join(fixtures_dir, "lecture.srt"),
+                              cues=args.cues, repeat_every=50)
+        elif name in ("docx", "docx-stream"):
+            doc_path = _timed(timings, "fixture", fixtures.make_docx, os.path.join(fixtures_dir, "course_pack.docx"),
+                              paragraphs=args.paragraphs, image_bytes=args.image_mb * 1024 * 1024)
+        else:
+            video_path = _timed(timings, "fixture", fixtures.make_video, os.path.join(fixtures_dir, "lecture.mp4"),
+                                seconds=args.video_seconds, real=args.ffmpeg == "real")
+        del timings["fixture"]
+        bytes_before = _tree_bytes(root)
+        calls_before = backend.calls
+        start = time.perf_counter()
+
+        if name == "srt":
+            from utils.translation import translate_srt_file
+            for language in args.languages:
+                _timed(timings, "translate", translate_srt_file, srt_path, language)
+        elif name == "docx":
+            from utils.translation import translate_document
+            for language in args.languages:
+                document = _timed(timings, "translate", translate_document, doc_path, language)
+                _timed(timings, "save", document.save, os.path.join(out_dir, f"course_pack_{language}.docx"))
+        elif name == "docx-stream":
+            from utils.translation import translate_document_streaming
+            for language in args.languages:
+                _timed(timings, "translate", translate_document_streaming, doc_path,
+                       os.path.join(out_dir, f"course_pack_{language}.docx"), language)
+        else:
+            from processors.video_processor import process_video_file
+            job = process_video_file(video_path, target_languages=args.languages, output_dir=out_dir,
+                                     output_mode=args.output_mode, encoder_profile=args.profile)
+            timings.update(job.timings)
+            result["error"] = job.error
+
+        result["total_seconds"] = time.perf_counter() - start
+        result["stages"] = timings
+        result["requests"] = backend.calls - calls_before
+        result["bytes_written"] = _tree_bytes(root) - bytes_before
+        result["peak_rss_mb"], result["peak_child_rss_mb"] = _peak_rss_mb()
+        return result
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def _run_child(name, args):
+    """Runs a scenario in a fresh interpreter, so peak RSS belongs to that scenario alone."""
+    config = {key: value for key, value in vars(args).items() if key not in ("child", "config", "json", "scenario")}
+    completed = subprocess.run([sys.executable, "-m", "benchmarks.pipeline", "--child", name,
+                                "--config", json.dumps(config)],
+                               cwd=REPO_ROOT, capture_output=True, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        error = completed.stderr.strip().splitlines()
+        return {"scenario": name, "error": error[-1] if error else "no output"}
+    return json.loads(lines[-1])
+
+
+def _format(result):
+    if "stages" not in result:
+        return f"{result['scenario']}: failed: {result['error']}"
+    stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result["stages"].items())
+    rss = result["peak_rss_mb"]
+    line = (f"{result['scenario']}: {result['total_seconds']:.2f}s ({stages}); {result['requests']} requests; "
+            f"peak RSS {f'{rss:.0f} MB' if rss is not None else 'n/a'}; "
+            f"{result['bytes_written'] / 1e6:.1f} MB written")
+    return line + (f"; error: {result['error']}" if result["error"] else "")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmarks of the translation pipeline.")
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append", help="Scenarios to run (default: all).")
+    parser.add_argument("--languages", default="ne,es", help="Comma-separated target languages (default: ne,es).")
+    parser.add_argument("--backend", choices=("fake", "local", "google"), default="fake",
+                        help="Translation backend (default: fake). 'local' needs models, 'google' the network.")
+    parser.add_argument("--rate", type=float, default=5.0,
+                        help="Fake backend requests per second, like Google's limit; 0 for no limit.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake translator latency per request in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Extra random fake translator latency in seconds.")
+    parser.add_argument("--cues", type=int, default=1000, help="Cues in the SRT fixture.")
+    parser.add_argument("--paragraphs", type=int, default=2000, help="Paragraphs in the DOCX fixture.")
+    parser.add_argument("--image-mb", type=int, default=20, help="Size of the image embedded in the DOCX fixture.")
+    parser.add_argument("--video-seconds", type=int, default=300, help="Length of the video fixture.")
+    parser.add_argument("--output-mode", choices=("burn", "mux"), default="burn")
+    parser.add_argument("--profile", help="Encoder profile for burning.")
+    parser.add_argument("--whisper", choices=("stub", "real"), default="stub")
+    parser.add_argument("--whisper-rtf", type=float, default=0.0,
+                        help="Seconds the Whisper stub spends per second of audio.")
+    parser.add_argument("--ffmpeg", choices=("fake", "real"), default="fake")
+    parser.add_argument("--ffmpeg-speed", type=float, default=0.0,
+                        help="Media seconds the fake ffmpeg encodes per second; 0 for no delay.")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to this JSON file.")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--config", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.child:
+        # Options come from the parent as JSON, already parsed.
+        print(json.dumps(run_scenario(args.child, argparse.Namespace(**json.loads(args.config)))))
+        return 0
+
+    args.languages = [code.strip() for code in args.languages.split(",") if code.strip()]
+    results = []
+    for name in args.scenario or SCENARIOS:
+        result = _run_child(name, args)
+        results.append(result)
+        print(_format(result), flush=True)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if any(result.get("error") for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# benchmarks/startup.py
+"""
+Measures cold-start time of the GUI and the CLI, each in a fresh interpreter,
+and checks that no heavy backend is imported before a job needs it.
+
+    python -m benchmarks.startup --repeat 5 --budget 1.0
+
+Exits with status 1 if the median GUI start-up exceeds the budget or a heavy
+module was imported, so it can run in CI to catch regressions.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must stay unloaded until a job asks for them.
+HEAVY_MODULES = ("torch", "whisper", "faster_whisper", "ctranslate2", "numpy", "docx", "deep_translator")
+
+# Each scenario prints a JSON object with the elapsed seconds and the heavy
+# modules found in sys.modules.
+_REPORT = """
+import json, sys, time
+elapsed = time.perf_counter() - start
+loaded = sorted({{name.split('.')[0] for name in sys.modules}} & set({heavy!r}))
+print(json.dumps({{"seconds": elapsed, "heavy_modules": loaded}}))
+"""
+
+SCENARIOS = {
+    # Time until the main window has been shown and painted once.
+    "gui": """
+import time
+start = time.perf_counter()
+from PySide6.QtWidgets import QApplication
+from gui.app import MainWindow
+app = QApplication([])
+window = MainWindow()
+window.show()
+app.processEvents()
+""",
+    "cli": """
+import time
+start = time.perf_counter()
+import cli
+cli.build_parser()
+""",
+}
+
+
+def run_scenario(name, python=sys.executable):
+    code = SCENARIOS[name] + _REPORT.format(heavy=HEAVY_MODULES)
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    completed = subprocess.run([python, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Scenario '{name}' failed:\n{completed.stderr.strip()}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario (default: 5).")
+    parser.add_argument("--budget", type=float, default=1.0,
+                        help="Maximum median GUI start-up in seconds (default: 1.0).")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="Only run these scenarios (default: all).")
+    args = parser.parse_args(argv)
+
+    ok = True
+    for name in args.scenario or sorted(SCENARIOS):
+        try:
+            runs = [run_scenario(name) for _ in range(max(1, args.repeat))]
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            ok = False
+            continue
+        seconds = [run["seconds"] for run in runs]
+        heavy = sorted({module for run in runs for module in run["heavy_modules"]})
+        median = statistics.median(seconds)
+        print(f"{name}: median {median * 1000:.0f} ms, min {min(seconds) * 1000:.0f} ms, "
+              f"max {max(seconds) * 1000:.0f} ms over {len(seconds)} runs")
+        if heavy:
+            print(f"{name}: heavy modules imported at start-up: {', '.join(heavy)}", file=sys.stderr)
+            ok = False
+        if name == "gui" and median > args.budget:
+            print(f"{name}: median start-up {median:.2f}s is over the {args.budget:.2f}s budget", file=sys.stderr)
+            ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
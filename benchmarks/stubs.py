@@ -0,0 +1,51 @@
+# benchmarks/stubs.py
+"""Stand-in for a Whisper model, for benchmarking without torch."""
+
+import time
+
+SAMPLE_RATE = 16000
+_SENTENCES = (
+    "Today we look at how energy moves through an ecosystem.",
+    "Producers capture sunlight and store it as chemical energy.",
+    "Only about ten percent of it reaches the next trophic level.",
+    "That is why food chains rarely have more than five links.",
+)
+
+
+class StubWhisperModel:
+    """
+    Has Whisper's transcribe(audio, **options) method and returns a segment
+    of canned lecture text every `segment_seconds`. Sleeps for
+    `realtime_factor` seconds per second of audio to stand in for decoding.
+    """
+
+    def __init__(self, segment_seconds=3.0, realtime_factor=0.0):
+        self.segment_seconds = segment_seconds
+        self.realtime_factor = realtime_factor
+
+    def transcribe(self, audio, **options):
+        duration = len(audio) / SAMPLE_RATE
+        if self.realtime_factor:
+            time.sleep(duration * self.realtime_factor)
+        segments = []
+        start = 0.0
+        while start < duration:
+            end = min(duration, start + self.segment_seconds)
+            segments.append({"id": len(segments), "start": start, "end": end,
+                             "text": " " + _SENTENCES[len(segments) % len(_SENTENCES)]})
+            start = end
+        return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": "en"}
+
+
+class _StubLoader:
+    # A class rather than a closure, so spawned worker processes can be sent it.
+    def __init__(self, realtime_factor):
+        self.realtime_factor = realtime_factor
+
+    def __call__(self, model_name, device, precision):
+        return StubWhisperModel(realtime_factor=self.realtime_factor)
+
+
+def stub_loader(realtime_factor=0.0):
+    """Returns a loader for utils.model_cache.set_model_loader."""
+    return _StubLoader(realtime_factor)
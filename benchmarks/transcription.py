@@ -0,0 +1,191 @@
+# benchmarks/transcription.py
+"""
+Compares the speed and accuracy of the transcription engines on one clip.
+
+    python -m benchmarks.transcription
+    python -m benchmarks.transcription --model small --engine whisper --engine faster-whisper:int8
+    python -m benchmarks.transcription --clip lecture.wav --reference lecture.txt --json results.json
+
+Engines are given as NAME or NAME:COMPUTE_TYPE, e.g. faster-whisper:float32.
+Without --clip, a fixture clip of benchmarks.fixtures.LECTURE_TEXT is spoken
+by espeak-ng. Each engine runs in a fresh interpreter on the CPU and reports
+the model load time, the real-time factor (seconds of transcription per
+second of audio; lower is faster), the word error rate against the reference
+text and the peak RSS.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ENGINES = ("whisper", "faster-whisper:int8")
+SAMPLE_RATE = 16000
+
+
+def normalize_words(text):
+    """Lower-cases text and splits it into words without punctuation."""
+    return re.findall(r"[\w']+", text.lower())
+
+
+def word_error_rate(reference, hypothesis):
+    """
+    Returns (substitutions + deletions + insertions) / reference words, the
+    usual word error rate, after normalize_words.
+    """
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, start=1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def _engine(spec, args):
+    """Builds the engine for a NAME[:COMPUTE_TYPE] spec."""
+    from utils.transcription_engines import get_engine
+    name, _, compute_type = spec.partition(":")
+    options = {}
+    if args.threads:
+        options["threads"] = args.threads
+    if args.beam_size:
+        options["beam_size"] = args.beam_size
+    if name == "faster-whisper":
+        options.update(compute_type=compute_type or None, vad_filter=not args.no_vad)
+    elif compute_type:
+        raise ValueError(f"'{name}' takes no compute type")
+    return get_engine(name, **options)
+
+
+def _load_clip(path):
+    if path.lower().endswith(".wav"):
+        from benchmarks.fixtures import read_wav
+        return read_wav(path, SAMPLE_RATE)
+    from utils.ffmpeg_utils import load_audio
+    return load_audio(path, sample_rate=SAMPLE_RATE)
+
+
+def run_engine(spec, args):
+    """Transcribes the clip with one engine in this process and returns its result dict."""
+    from utils.model_cache import get_model
+    from utils.transcription import transcribe_audio
+
+    result = {"engine": spec, "model": args.model}
+    engine = _engine(spec, args)
+    audio = _load_clip(args.clip)
+    duration = len(audio) / SAMPLE_RATE
+    with open(args.reference, "r", encoding="utf-8") as f:
+        reference = f.read()
+
+    start = time.perf_counter()
+    get_model(args.model, device="cpu", engine=engine)
+    result["load_seconds"] = time.perf_counter() - start
+    runs = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        transcript = transcribe_audio(audio, model_name=args.model, device="cpu", chunked=False, engine=engine)
+        runs.append(time.perf_counter() - start)
+    result["audio_seconds"] = duration
+    result["seconds"] = min(runs)
+    result["rtf"] = min(runs) / duration if duration else None
+    result["wer"] = word_error_rate(reference, " ".join(transcript.track.texts))
+    result["language"] = transcript.language
+    try:
+        import resource
+        scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+        result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    except ImportError:
+        result["peak_rss_mb"] = None
+    return result
+
+
+def _run_child(spec, args):
+    config = {key: value for key, value in vars(args).items() if key not in ("child", "config", "json", "engine")}
+    completed = subprocess.run([sys.executable, "-m", "benchmarks.transcription", "--child", spec,
+                                "--config", json.dumps(config)],
+                               cwd=REPO_ROOT, capture_output=True, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        error = completed.stderr.strip().splitlines()
+        return {"engine": spec, "error": error[-1] if error else "no output"}
+    return json.loads(lines[-1])
+
+
+def _format(result):
+    if "error" in result:
+        return f"{result['engine']}: failed: {result['error']}"
+    rss = result["peak_rss_mb"]
+    return (f"{result['engine']} ({result['model']}): load {result['load_seconds']:.1f}s, "
+            f"RTF {result['rtf']:.3f}, WER {result['wer']:.1%}, language {result['language']}, "
+            f"peak RSS {f'{rss:.0f} MB' if rss is not None else 'n/a'}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Compare transcription engines on one clip.")
+    parser.add_argument("--engine", action="append",
+                        help=f"Engine as NAME or NAME:COMPUTE_TYPE; repeat to compare (default: "
+                             f"{' and '.join(DEFAULT_ENGINES)}).")
+    parser.add_argument("--model", default="base", help="Whisper model size (default: base).")
+    parser.add_argument("--clip", help="Audio or video to transcribe (default: a synthesized fixture).")
+    parser.add_argument("--reference", help="Text file with what is said in --clip.")
+    parser.add_argument("--threads", type=int, help="CPU threads per engine (default: all cores).")
+    parser.add_argument("--beam-size", type=int, help="Beam width for every engine (default: each engine's own).")
+    parser.add_argument("--no-vad", action="store_true", help="Turn off faster-whisper's silence skipping.")
+    parser.add_argument("--repeat", type=int, default=1, help="Transcribe this many times and keep the fastest.")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to this JSON file.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--config", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.child:
+        print(json.dumps(run_engine(args.child, argparse.Namespace(**json.loads(args.config)))))
+        return 0
+    if bool(args.clip) != bool(args.reference):
+        parser.error("--clip and --reference go together")
+
+    root = None
+    try:
+        if not args.clip:
+            from benchmarks import fixtures
+            root = tempfile.mkdtemp(prefix="global-classroom-asr-")
+            try:
+                args.clip = fixtures.make_speech(os.path.join(root, "lecture.wav"))
+            except RuntimeError as e:
+                print(e, file=sys.stderr)
+                return 1
+            args.reference = os.path.join(root, "lecture.txt")
+            with open(args.reference, "w", encoding="utf-8") as f:
+                f.write(fixtures.LECTURE_TEXT)
+        args.clip = os.path.abspath(args.clip)
+        args.reference = os.path.abspath(args.reference)
+        results = []
+        for spec in args.engine or DEFAULT_ENGINES:
+            result = _run_child(spec, args)
+            results.append(result)
+            print(_format(result), flush=True)
+    finally:
+        if root:
+            shutil.rmtree(root, ignore_errors=True)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if any("error" in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+# cli.py
+"""
+Headless entry point for servers without a display.
+
+    global_classroom_cli lecture1.mp4 "notes/*.docx" --languages ne,es
+    global_classroom_cli --watch /srv/uploads --output-dir /srv/translated --languages ne
+
+Neither Qt nor torch/whisper is imported here; the processors are imported
+only when there is a job for them, and Whisper only once a video reaches the
+transcription stage.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import threading
+import time
+
+from utils import metrics
+from utils.progress import format_eta
+
+# Kept in sync with processors.video_processor.VIDEO_EXTENSIONS, which is not
+# imported here so that document-only runs never load the video stack.
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".avi", ".mov", ".flv", ".wmv")
+DOCUMENT_EXTENSIONS = (".docx",)
+DEFAULT_WATCH_INTERVAL = 5.0  # seconds
+
+
+def expand_inputs(patterns):
+    """
+    Turns file names, glob patterns and directories into a list of
+    supported files. Directories contribute their top-level videos and
+    documents.
+    """
+    paths = []
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            print(f"No files match '{pattern}'.", file=sys.stderr)
+        for match in matches:
+            if os.path.isdir(match):
+                paths.extend(os.path.join(match, name) for name in sorted(os.listdir(match)))
+            else:
+                paths.append(match)
+    supported = []
+    for path in dict.fromkeys(paths):
+        if _kind(path) is None:
+            print(f"Skipping unsupported file: '{path}'", file=sys.stderr)
+        elif not os.path.isfile(path):
+            print(f"File not found: '{path}'", file=sys.stderr)
+        else:
+            supported.append(path)
+    return supported
+
+
+def _kind(path):
+    name = path.lower()
+    if ".partial." in name:
+        return None
+    if name.endswith(VIDEO_EXTENSIONS):
+        return "video"
+    if name.endswith(DOCUMENT_EXTENSIONS) and not os.path.basename(name).startswith("~$"):
+        return "document"
+    return None
+
+
+class ProgressPrinter:
+    """Prints a line for each stage of each file every `step` percent."""
+
+    def __init__(self, step=10, stream=sys.stderr):
+        self.step = step
+        self.stream = stream
+        self._last = {}
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        if not event.total:
+            return
+        percent = int(100 * min(1.0, event.current / event.total))
+        key = (event.file, event.stage)
+        with self._lock:
+            now = time.monotonic()
+            started = self._started.setdefault(key, now)
+            bucket = percent // self.step
+            if self._last.get(key) == bucket:
+                return
+            self._last[key] = bucket
+            line = f"{os.path.basename(event.file)}: {event.stage} {percent}%"
+            if 0 < event.current < event.total:
+                line += f", about {format_eta((now - started) * (event.total - event.current) / event.current)} left"
+            print(line, file=self.stream, flush=True)
+
+
+def run_jobs(paths, languages, concurrency=2, output_dir=None, output_mode="burn", encoder_profile=None,
+             work_dir=None, use_checkpoints=True, stream_documents=None, on_progress=None, source_language='auto',
+             model_name=None, transcription_engine=None):
+    """
+    Processes videos and documents headlessly.
+
+    Args:
+        paths (list): Input files, as returned by expand_inputs.
+        languages (list): Target language codes.
+        concurrency (int): Videos translated and encoded at the same time, and
+                           document worker processes, see
+                           process_documents.
+        output_dir (str): Where to write the results. Defaults to the
+                          directory of each input.
+        output_mode (str): 'burn' or 'mux', see process_video_file.
+        encoder_profile (str): Encoder profile name for burning.
+        work_dir (str): Where to create scratch files.
+        use_checkpoints (bool): Reuse stage results from earlier runs.
+        stream_documents (bool): Translate documents with bounded memory. By
+                                 default only large documents are streamed.
+        source_language (str): Language of the documents, or 'auto'. Videos
+                               use the language Whisper detects.
+        model_name (str): Whisper model size for videos.
+        transcription_engine (TranscriptionEngine): Engine to transcribe
+                                                    videos with.
+        on_progress (callable): Called with each utils.progress.ProgressEvent.
+
+    Returns:
+        tuple: (outputs, errors), the written files and a dict of input path
+               to error message.
+    """
+    videos = [p for p in paths if _kind(p) == "video"]
+    documents = [p for p in paths if _kind(p) == "document"]
+    outputs = []
+    errors = {}
+    concurrency = max(1, int(concurrency))
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    if videos:
+        from processors.video_processor import process_videos
+        stage_workers = {"translate": concurrency, "burn": concurrency}
+        jobs = process_videos(videos, target_languages=languages, stage_workers=stage_workers,
+                              output_dir=output_dir, work_dir=work_dir, use_checkpoints=use_checkpoints,
+                              output_mode=output_mode, encoder_profile=encoder_profile, on_progress=on_progress,
+                              model_name=model_name, transcription_engine=transcription_engine)
+        for job in jobs:
+            outputs.extend(job.outputs)
+            if job.error:
+                errors[job.video_path] = job.error
+
+    if documents:
+        from processors.document_processor import process_documents
+        for language in languages:
+            suffix = "_translated" if len(languages) == 1 else f"_translated_{language}"
+            results = process_documents(documents, language, suffix=suffix, output_dir=output_dir,
+                                        workers=concurrency, streaming=stream_documents, on_progress=on_progress,
+                                        source_language=source_language)
+            for result in results:
+                if result.error:
+                    errors.setdefault(result.path, result.error)
+                    print(f"Error processing '{result.path}': {result.error}", file=sys.stderr)
+                else:
+                    outputs.append(result.output)
+
+    return outputs, errors
+
+
+def _snapshot(folder):
+    """Returns {path: (size, mtime_ns)} for the supported files in a folder."""
+    snapshot = {}
+    try:
+        entries = list(os.scandir(folder))
+    except OSError as e:
+        print(f"Error listing '{folder}': {e}", file=sys.stderr)
+        return snapshot
+    for entry in entries:
+        if entry.is_file() and _kind(entry.path) is not None:
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            snapshot[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+def watch_folder(folder, languages, interval=DEFAULT_WATCH_INTERVAL, include_existing=False, max_polls=None,
+                 **job_options):
+    """
+    Processes files as they are uploaded to a folder, until interrupted.
+
+    A file is picked up once its size and modification time have stayed the
+    same for one poll interval, so half-copied uploads are left alone. Files
+    this process writes are never picked up again.
+
+    Args:
+        folder (str): Folder to watch (not recursive).
+        languages (list): Target language codes.
+        interval (float): Seconds between polls.
+        include_existing (bool): Also process files already in the folder at
+                                 start-up.
+        max_polls (int): Stop after this many polls. None runs forever.
+        job_options: Passed on to run_jobs.
+    """
+    folder = os.path.abspath(folder)
+    seen = set() if include_existing else set(_snapshot(folder))
+    pending = {}
+    polls = 0
+    print(f"Watching '{folder}' for new files every {interval:g}s.", file=sys.stderr, flush=True)
+    while max_polls is None or polls < max_polls:
+        polls += 1
+        current = _snapshot(folder)
+        ready = []
+        for path, signature in current.items():
+            if path in seen:
+                continue
+            if pending.get(path) == signature:
+                ready.append(path)
+                del pending[path]
+            else:
+                pending[path] = signature
+        for path in list(pending):
+            if path not in current:
+                del pending[path]
+        if ready:
+            seen.update(ready)
+            outputs, errors = run_jobs(sorted(ready), languages, **job_options)
+            seen.update(os.path.abspath(output) for output in outputs)
+            for path in ready:
+                status = f"failed: {errors[path]}" if path in errors else "done"
+                print(f"{os.path.basename(path)}: {status}", file=sys.stderr, flush=True)
+            metrics.flush()
+        time.sleep(interval)
+
+
+def _parse_languages(values):
+    languages = []
+    for value in values:
+        languages.extend(code.strip() for code in value.split(",") if code.strip())
+    return list(dict.fromkeys(languages))
+
+
+def _transcription_engine(parser, args):
+    """Builds the transcription engine from the command line, or None for the default."""
+    from utils.transcription_engines import ENGINE_ENV, DEFAULT_ENGINE, get_engine
+    name = args.engine or os.environ.get(ENGINE_ENV, DEFAULT_ENGINE)
+    options = {}
+    if args.threads:
+        options["threads"] = args.threads
+    if args.beam_size:
+        options["beam_size"] = args.beam_size
+    if name == "faster-whisper":
+        options.update(compute_type=args.compute_type, vad_filter=not args.no_vad)
+    elif args.compute_type or args.no_vad:
+        parser.error("--compute-type and --no-vad need --engine faster-whisper")
+    if not args.engine and not options:
+        return None
+    return get_engine(name, **options)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="global_classroom_cli",
+        description="Translate videos and Word documents without the GUI.")
+    parser.add_argument("inputs", nargs="*", help="Files, glob patterns or folders to process.")
+    parser.add_argument("-l", "--languages", action="append", default=[],
+                        help="Target language codes, comma-separated or repeated (default: ne).")
+    parser.add_argument("-j", "--concurrency", type=int, default=2,
+                        help="Videos translated and encoded, or documents translated, at the same time (default: 2).")
+    parser.add_argument("-o", "--output-dir", help="Where to write results (default: next to each input).")
+    parser.add_argument("--output-mode", choices=("burn", "mux"), default="burn",
+                        help="Burn subtitles into the video, or add them as selectable tracks (default: burn).")
+    parser.add_argument("--profile", help="Encoder profile for burning, e.g. fast-draft, archive, low-bandwidth.")
+    parser.add_argument("--work-dir", help="Where to create scratch files.")
+    parser.add_argument("--no-checkpoints", action="store_true", help="Do not reuse results from earlier runs.")
+    parser.add_argument("--backend", choices=("google", "local"),
+                        help="Translation backend (default: GLOBAL_CLASSROOM_TRANSLATION_BACKEND or google). "
+                             "'local' runs offline models, see utils/translation_backends.py.")
+    parser.add_argument("--source-language", default="auto",
+                        help="Language the documents are written in (default: auto-detect). "
+                             "Videos always use the language detected during transcription.")
+    parser.add_argument("--model", help="Whisper model size, e.g. tiny, base, small, medium, large-v3 "
+                                        "(default: GLOBAL_CLASSROOM_WHISPER_MODEL or base).")
+    parser.add_argument("--engine", choices=("whisper", "faster-whisper"),
+                        help="Transcription engine (default: GLOBAL_CLASSROOM_TRANSCRIPTION_ENGINE or whisper). "
+                             "faster-whisper runs int8 on the CPU several times faster.")
+    parser.add_argument("--compute-type", help="faster-whisper compute type, e.g. int8, int8_float32, float32 "
+                                               "(default: int8 on the CPU).")
+    parser.add_argument("--threads", type=int,
+                        help="CPU threads for transcription (default: OMP_NUM_THREADS if set, else all cores).")
+    parser.add_argument("--beam-size", type=int, help="Transcription beam width; 1 is fastest.")
+    parser.add_argument("--no-vad", action="store_true",
+                        help="With faster-whisper, decode silences too instead of skipping them.")
+    parser.add_argument("--stream-documents", action="store_true", default=None,
+                        help="Translate every document with bounded memory (default: only large ones).")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Do not print progress.")
+    parser.add_argument("--metrics", metavar="FOLDER",
+                        help="Record spans and counters to FOLDER/events.jsonl and FOLDER/metrics.prom "
+                             "(default: GLOBAL_CLASSROOM_METRICS, or off).")
+    parser.add_argument("--watch", metavar="FOLDER", help="Keep running and process new files in FOLDER.")
+    parser.add_argument("--interval", type=float, default=DEFAULT_WATCH_INTERVAL,
+                        help=f"Seconds between checks of the watch folder (default: {DEFAULT_WATCH_INTERVAL:g}).")
+    parser.add_argument("--include-existing", action="store_true",
+                        help="In watch mode, also process files already in the folder.")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.watch:
+        parser.error("give at least one input or --watch FOLDER")
+    if args.watch and not os.path.isdir(args.watch):
+        parser.error(f"--watch: '{args.watch}' is not a folder")
+
+    languages = _parse_languages(args.languages) or ["ne"]
+    if args.metrics:
+        # Before any worker process starts, so they record into the same folder.
+        metrics.enable(args.metrics)
+    if args.backend:
+        # Through the environment so document worker processes see it too.
+        from utils.translation_backends import BACKEND_ENV
+        os.environ[BACKEND_ENV] = args.backend
+    job_options = dict(concurrency=args.concurrency, output_dir=args.output_dir, output_mode=args.output_mode,
+                       encoder_profile=args.profile, work_dir=args.work_dir,
+                       use_checkpoints=not args.no_checkpoints, stream_documents=args.stream_documents,
+                       source_language=args.source_language, model_name=args.model,
+                       transcription_engine=_transcription_engine(parser, args),
+                       on_progress=None if args.quiet else ProgressPrinter())
+
+    failed = False
+    if args.inputs:
+        paths = expand_inputs(args.inputs)
+        if not paths and not args.watch:
+            print("Nothing to do.", file=sys.stderr)
+            return 1
+        outputs, errors = run_jobs(paths, languages, **job_options)
+        for path in outputs:
+            print(path)
+        failed = bool(errors)
+    if args.watch:
+        try:
+            watch_folder(args.watch, languages, interval=args.interval, include_existing=args.include_existing,
+                         **job_options)
+        except KeyboardInterrupt:
+            print("Stopped watching.", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,13 +2,19 @@
 
 __all__ = ["run_app"]
 
+import importlib
 import sys
 import os
+import threading
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-    QLabel, QRadioButton, QFileDialog, QProgressBar, QTextEdit, QComboBox
+    QLabel, QRadioButton, QFileDialog, QProgressBar, QTextEdit, QComboBox,
+    QListWidget, QAbstractItemView
 )
 from PySide6.QtCore import Qt, QThread, Signal, QTimer
+from utils import metrics
+from utils.progress import ProgressTracker, VIDEO_STAGE_WEIGHTS, DOCUMENT_STAGE_WEIGHTS, format_eta
+from utils.transcription_engines import MODEL_SIZES, default_model_name
 
 # Language mapping: language name -> language code
 LANGUAGE_MAPPING = {
@@ -120,35 +126,132 @@ LANGUAGE_MAPPING = {
     'zulu': 'zu'
 }
 
+# Modules each mode needs, imported in the background once the window is up so
+# the first job does not pay for them. Videos also load the transcription
+# engine's package; "whisper" brings in torch.
+PREWARM_MODULES = {
+    "Videos": ("processors.video_processor", "deep_translator"),
+    "Documents": ("processors.document_processor", "docx", "deep_translator"),
+}
+# Give the window time to paint before competing with it for the GIL.
+PREWARM_DELAY_MS = 500
+
+_prewarmed = set()
+_prewarm_lock = threading.Lock()
+
+def prewarm(mode):
+    """
+    Imports the modules for one mode ("Videos" or "Documents") in a daemon
+    thread. Each mode is pre-warmed at most once; failures are left for the
+    job itself to report.
+    """
+    with _prewarm_lock:
+        if mode in _prewarmed or mode not in PREWARM_MODULES:
+            return None
+        _prewarmed.add(mode)
+
+    modules = PREWARM_MODULES[mode]
+    if mode == "Videos":
+        from utils.transcription_engines import get_default_engine
+        modules += (get_default_engine().module,)
+
+    def load():
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                print(f"Could not pre-load '{name}': {e}")
+
+    thread = threading.Thread(target=load, name=f"prewarm-{mode.lower()}", daemon=True)
+    thread.start()
+    return thread
+
 # Worker thread for processing files without blocking the UI.
 class WorkerThread(QThread):
-    progress_signal = Signal(int)
+    progress_signal = Signal(object)  # utils.progress.ProgressEvent
+    file_done_signal = Signal(str)
     status_signal = Signal(str)
     finished_signal = Signal()
 
-    def __init__(self, files, mode, target_language, parent=None):
+    def __init__(self, files, mode, target_languages, output_mode="burn", source_language='auto', model_name=None,
+                 parent=None):
         super().__init__(parent)
         self.files = files
         self.mode = mode
-        self.target_language = target_language
+        self.target_languages = list(target_languages)
+        self.output_mode = output_mode
+        self.source_language = source_language
+        self.model_name = model_name
 
     def run(self):
-        total = len(self.files)
-        for idx, file in enumerate(self.files, start=1):
-            self.status_signal.emit(f"Processing file {idx}/{total}: {os.path.basename(file)}")
-            try:
-                if self.mode == "Videos":
-                    from processors.video_processor import process_single_video
-                    process_single_video(file, target_language=self.target_language)
-                else:
-                    from processors.document_processor import process_single_document
-                    process_single_document(file, target_language=self.target_language)
-                self.status_signal.emit(f"Finished processing: {os.path.basename(file)}")
-            except Exception as e:
-                self.status_signal.emit(f"Error processing {os.path.basename(file)}: {str(e)}")
-        self.status_signal.emit("All files processed successfully.")
+        if self.mode == "Videos":
+            failed = self.run_videos()
+        else:
+            failed = self.run_documents()
+        metrics.flush()
+        if failed:
+            self.status_signal.emit(f"Finished with errors: {failed} of {len(self.files)} file(s) failed.")
+        else:
+            self.status_signal.emit("All files processed successfully.")
         self.finished_signal.emit()
 
+    def run_videos(self):
+        """Processes the videos and returns how many of them failed."""
+        from processors.video_processor import process_videos
+        total = len(self.files)
+        done = []
+
+        def on_done(job):
+            done.append(job)
+            name = os.path.basename(job.video_path)
+            if job.error:
+                self.status_signal.emit(f"Error processing {name}: {job.error}")
+            else:
+                self.status_signal.emit(f"Finished processing {len(done)}/{total}: {name}")
+            self.file_done_signal.emit(job.video_path)
+
+        self.status_signal.emit(f"Processing {total} video(s)...")
+        jobs = process_videos(self.files, target_languages=self.target_languages, on_done=on_done,
+                              output_mode=self.output_mode, on_progress=self.progress_signal.emit,
+                              model_name=self.model_name)
+        return sum(1 for job in jobs if job.error)
+
+    def run_documents(self):
+        """Translates the documents into every language and returns how many of them failed."""
+        from processors.document_processor import process_documents
+        total = len(self.files)
+        count = len(self.target_languages)
+        failed = set()
+        self.status_signal.emit(f"Processing {total} document(s)...")
+        for index, language in enumerate(self.target_languages):
+            done = []
+
+            def on_done(result, last=index == count - 1):
+                done.append(result)
+                name = os.path.basename(result.path)
+                if result.error:
+                    failed.add(result.path)
+                    self.status_signal.emit(f"Error processing {name}: {result.error}")
+                elif last and result.path not in failed:
+                    self.status_signal.emit(f"Finished processing {len(done)}/{total}: {name}")
+                if last:
+                    self.file_done_signal.emit(result.path)
+
+            # Keep one output per language apart when several are selected.
+            suffix = "_translated" if count == 1 else f"_translated_{language}"
+            process_documents(self.files, target_language=language, suffix=suffix, on_done=on_done,
+                              on_progress=self._language_progress(index, count),
+                              source_language=self.source_language)
+        return len(failed)
+
+    def _language_progress(self, index, count):
+        """Scales a document's progress for one language into its share of all languages."""
+        def forward(event):
+            if event.total:
+                event = event._replace(current=index * event.total + event.current, total=count * event.total)
+            self.progress_signal.emit(event)
+        return forward
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -214,22 +317,89 @@ class MainWindow(QMainWindow):
 
         # Language selection layout
         lang_layout = QHBoxLayout()
-        lang_label = QLabel("Select Target Language:")
+        lang_label = QLabel("Select Target Languages:")
         lang_label.setStyleSheet("color: #0A3D62; font: 18px 'Segoe UI';")
         lang_layout.addWidget(lang_label)
 
-        self.lang_combo = QComboBox()
-        self.lang_combo.setStyleSheet(
+        # Several languages can be selected; videos are transcribed once for all of them.
+        self.lang_list = QListWidget()
+        self.lang_list.setSelectionMode(QAbstractItemView.MultiSelection)
+        self.lang_list.setMaximumHeight(120)
+        self.lang_list.setStyleSheet(
             "background-color: #FFFFFF; color: #0A3D62; font: 16px 'Segoe UI';"
             "border: 1px solid #38ADA9; padding: 4px;"
         )
         languages = list(LANGUAGE_MAPPING.keys())
-        self.lang_combo.addItems(languages)
+        self.lang_list.addItems(languages)
         default_index = languages.index("nepali") if "nepali" in languages else 0
-        self.lang_combo.setCurrentIndex(default_index)
-        lang_layout.addWidget(self.lang_combo)
+        self.lang_list.item(default_index).setSelected(True)
+        self.lang_list.scrollToItem(self.lang_list.item(default_index))
+        lang_layout.addWidget(self.lang_list)
         layout.addLayout(lang_layout)
 
+        # Source language selection (documents only; videos use the
+        # language detected while transcribing)
+        source_layout = QHBoxLayout()
+        source_label = QLabel("Document Language:")
+        source_label.setStyleSheet("color: #0A3D62; font: 18px 'Segoe UI';")
+        source_layout.addWidget(source_label)
+
+        self.source_combo = QComboBox()
+        self.source_combo.setStyleSheet(
+            "background-color: #FFFFFF; color: #0A3D62; font: 16px 'Segoe UI';"
+            "border: 1px solid #38ADA9; padding: 4px;"
+        )
+        self.source_combo.addItem("Auto-detect", "auto")
+        for name, code in LANGUAGE_MAPPING.items():
+            self.source_combo.addItem(name, code)
+        self.source_combo.setEnabled(False)
+        source_layout.addWidget(self.source_combo)
+        layout.addLayout(source_layout)
+
+        # Subtitle output selection (videos only)
+        output_layout = QHBoxLayout()
+        output_label = QLabel("Subtitle Output:")
+        output_label.setStyleSheet("color: #0A3D62; font: 18px 'Segoe UI';")
+        output_layout.addWidget(output_label)
+
+        self.output_combo = QComboBox()
+        self.output_combo.setStyleSheet(
+            "background-color: #FFFFFF; color: #0A3D62; font: 16px 'Segoe UI';"
+            "border: 1px solid #38ADA9; padding: 4px;"
+        )
+        # Display text -> output mode understood by the video processor.
+        self.output_modes = {
+            "Burn into video": "burn",
+            "Selectable subtitle tracks (fast)": "mux",
+        }
+        self.output_combo.addItems(list(self.output_modes.keys()))
+        output_layout.addWidget(self.output_combo)
+        layout.addLayout(output_layout)
+
+        # Whisper model size (videos only): larger is more accurate and slower
+        model_layout = QHBoxLayout()
+        model_label = QLabel("Transcription Model:")
+        model_label.setStyleSheet("color: #0A3D62; font: 18px 'Segoe UI';")
+        model_layout.addWidget(model_label)
+
+        self.model_combo = QComboBox()
+        self.model_combo.setStyleSheet(
+            "background-color: #FFFFFF; color: #0A3D62; font: 16px 'Segoe UI';"
+            "border: 1px solid #38ADA9; padding: 4px;"
+        )
+        model_sizes = list(MODEL_SIZES)
+        if default_model_name() not in model_sizes:
+            model_sizes.append(default_model_name())
+        self.model_combo.addItems(model_sizes)
+        self.model_combo.setCurrentText(default_model_name())
+        model_layout.addWidget(self.model_combo)
+        layout.addLayout(model_layout)
+
+        self.document_radio.toggled.connect(lambda checked: self.output_combo.setEnabled(not checked))
+        self.document_radio.toggled.connect(lambda checked: self.model_combo.setEnabled(not checked))
+        self.document_radio.toggled.connect(self.source_combo.setEnabled)
+        self.document_radio.toggled.connect(lambda checked: prewarm(self.current_mode()))
+
         # File selection layout
         file_layout = QHBoxLayout()
         self.browse_button = QPushButton("Browse Files")
@@ -287,6 +457,12 @@ class MainWindow(QMainWindow):
         """)
         layout.addWidget(self.progress_bar)
 
+        # What each file is doing right now, with an estimate of the time left.
+        self.stage_label = QLabel("")
+        self.stage_label.setWordWrap(True)
+        self.stage_label.setStyleSheet("color: #0A3D62; font: 14px 'Segoe UI';")
+        layout.addWidget(self.stage_label)
+
         # Status messages text area
         self.status_text = QTextEdit()
         self.status_text.setReadOnly(True)
@@ -297,22 +473,13 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.status_text)
 
         self.selected_files = []
-        
-        # QTimer for simulated progress updates.
-        self.fake_progress = 0
-        self.timer = QTimer(self)
-        self.timer.setInterval(200)  # update every 200 ms
-        self.timer.timeout.connect(self.update_fake_progress)
-        # We'll calculate a tick increment based on expected processing time.
-        self.tick_increment = 0
-
-    def update_fake_progress(self):
-        if self.fake_progress < 95:
-            self.fake_progress += self.tick_increment
-            self.progress_bar.setValue(int(self.fake_progress))
+        self.tracker = None
+
+    def current_mode(self):
+        return "Videos" if self.video_radio.isChecked() else "Documents"
 
     def browse_files(self):
-        mode = "Videos" if self.video_radio.isChecked() else "Documents"
+        mode = self.current_mode()
         file_filter = "Video Files (*.mp4 *.mkv *.avi *.mov *.flv *.wmv)" if mode == "Videos" else "Word Documents (*.docx)"
         files, _ = QFileDialog.getOpenFileNames(self, "Select Files", "", file_filter)
         if files:
@@ -326,43 +493,76 @@ class MainWindow(QMainWindow):
         if not self.selected_files:
             self.append_status("Please select one or more files.")
             return
+        target_languages = [
+            LANGUAGE_MAPPING[item.text()]
+            for item in sorted(self.lang_list.selectedItems(), key=self.lang_list.row)
+        ]
+        if not target_languages:
+            self.append_status("Please select one or more target languages.")
+            return
         self.translate_button.setEnabled(False)
-        self.fake_progress = 0
         self.progress_bar.setValue(0)
-        
-        # Calculate expected processing time:
-        # Assuming 10 minutes (600,000 ms) per file.
-        expected_time_ms = 600000 * len(self.selected_files)
-        # Total ticks = expected_time_ms divided by timer interval.
-        total_ticks = expected_time_ms / self.timer.interval()
-        # We want to reach 95% over total_ticks.
-        self.tick_increment = 95 / total_ticks
-        
-        self.timer.start()  # Start simulated progress updates
-
-        mode = "Videos" if self.video_radio.isChecked() else "Documents"
-        lang_name = self.lang_combo.currentText()
-        target_language = LANGUAGE_MAPPING.get(lang_name, "ne")
-        self.worker = WorkerThread(self.selected_files, mode, target_language)
-        self.worker.progress_signal.connect(lambda x: None)  # Ignored in favor of fake progress.
+        self.stage_label.setText("")
+
+        mode = self.current_mode()
+        output_mode = self.output_modes[self.output_combo.currentText()]
+        source_language = self.source_combo.currentData() if mode == "Documents" else 'auto'
+        weights = VIDEO_STAGE_WEIGHTS if mode == "Videos" else DOCUMENT_STAGE_WEIGHTS
+        self.tracker = ProgressTracker(self.selected_files, weights)
+        self.worker = WorkerThread(self.selected_files, mode, target_languages, output_mode, source_language,
+                                   self.model_combo.currentText())
+        self.worker.progress_signal.connect(self.update_progress)
+        self.worker.file_done_signal.connect(self.file_finished)
         self.worker.status_signal.connect(self.append_status)
         self.worker.finished_signal.connect(self.translation_finished)
         self.worker.start()
 
+    def update_progress(self, event):
+        self.tracker.update(event)
+        self.refresh_progress()
+
+    def file_finished(self, file):
+        self.tracker.finish_file(file)
+        self.refresh_progress()
+
+    def refresh_progress(self):
+        self.progress_bar.setValue(int(100 * self.tracker.overall()))
+        lines = []
+        for file, stage, fraction, eta in self.tracker.active_stages():
+            line = f"{os.path.basename(file)}: {stage} {int(100 * fraction)}%"
+            if eta is not None:
+                line += f", about {format_eta(eta)} left"
+            lines.append(line)
+        self.stage_label.setText("\n".join(lines))
+
     def translation_finished(self):
-        self.timer.stop()  # Stop the timer once processing is complete.
         self.progress_bar.setValue(100)
+        self.stage_label.setText("")
         self.translate_button.setEnabled(True)
         self.append_status("Translation complete!")
 
     def append_status(self, message):
         self.status_text.append(message)
 
-def run_app():
-    """Function to run the PySide6 application."""
+def run_app(warm_up_models=None):
+    """
+    Function to run the PySide6 application.
+
+    Args:
+        warm_up_models (iterable): Whisper model names to load in the
+                                   background while the window starts.
+    """
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+
+    def start_background_loading():
+        prewarm(window.current_mode())
+        if warm_up_models:
+            from utils.model_cache import warm_up
+            warm_up(warm_up_models)
+
+    QTimer.singleShot(PREWARM_DELAY_MS, start_background_loading)
     sys.exit(app.exec())
 
 if __name__ == "__main__":
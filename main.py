@@ -6,7 +6,15 @@ warnings.filterwarnings(
     module="whisper"
 )
 
-from gui.app import run_app
+import os
+
+def main():
+    # Imported here so that importing this module stays cheap; the GUI module
+    # itself defers the processors and their backends until they are needed.
+    from gui.app import run_app
+    # Optional comma-separated list of Whisper models to preload, e.g. "base".
+    warm_up_models = [m for m in os.environ.get("GLOBAL_CLASSROOM_WARM_UP", "").split(",") if m.strip()]
+    run_app(warm_up_models=[m.strip() for m in warm_up_models])
 
 if __name__ == "__main__":
-    run_app()
+    main()
@@ -1,37 +1,208 @@
 # processors/document_processor.py
 
+import multiprocessing
 import os
-import tempfile
-import shutil
-from utils.translation import translate_document
+import pickle
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.translation import translate_document, translate_document_streaming, make_engine
+from utils.translation_backends import get_backend, get_default_backend
+from utils.progress import reporter
+from utils import metrics
 
-def process_single_document(doc_path, target_language='ne'):
-    temp_dir = tempfile.mkdtemp()
-    try:
-        shutil.copy(doc_path, temp_dir)
-        process_documents_in_folder(temp_dir, target_language)
-        base, ext = os.path.splitext(os.path.basename(doc_path))
-        output_file = f"{base}_translated{ext}"
-        src = os.path.join(temp_dir, output_file)
-        if os.path.exists(src):
-            shutil.copy(src, os.path.dirname(doc_path))
-    finally:
-        shutil.rmtree(temp_dir)
+# Documents at least this large are streamed instead of loaded whole. Size is
+# mostly embedded images, which python-docx would otherwise hold in memory.
+LARGE_DOCUMENT_BYTES = 20 * 1024 * 1024
+
+# Outcome of translating one document in a batch.
+#   path:     input document
+#   output:   translated document, or None if it failed
+#   seconds:  wall time spent on the document
+#   requests: translation requests sent, retries included
+#   retries:  requests that were retries
+#   failures: texts left untranslated
+#   error:    error message, or None
+DocumentResult = namedtuple("DocumentResult",
+                            ["path", "output", "seconds", "requests", "retries", "failures", "error"])
+
+def process_document_file(doc_path, target_language='ne', suffix="_translated", output_dir=None, on_progress=None,
+                          streaming=None, engine=None, source_language='auto'):
+    """
+    Translates one Word document, reading it in place and writing only the
+    translated copy.
+
+    Args:
+        doc_path (str): Path to the input .docx file.
+        target_language (str): Target language code (default is 'ne').
+        suffix (str): Appended to the file name of the output.
+        output_dir (str): Where to write the output. Defaults to the directory
+                          of the input.
+        on_progress (callable): Called with a utils.progress.ProgressEvent as
+                                text is translated.
+        streaming (bool): Rewrite the .docx part by part with bounded memory
+                          instead of loading it with python-docx. By default
+                          only documents of LARGE_DOCUMENT_BYTES or more are
+                          streamed.
+        engine (TranslationEngine): Engine to translate with. Defaults to
+                                    one from utils.translation.make_engine.
+        source_language (str): Language the document is written in, or
+                               'auto' (the default) to have it detected for
+                               every batch of paragraphs.
+
+    Returns:
+        str: Path to the translated document.
+    """
+    name, ext = os.path.splitext(os.path.basename(doc_path))
+    output_dir = output_dir or os.path.dirname(os.path.abspath(doc_path))
+    new_file_path = os.path.join(output_dir, f"{name}{suffix}{ext}")
+    size = os.path.getsize(doc_path)
+    if streaming is None:
+        streaming = size >= LARGE_DOCUMENT_BYTES
+    with metrics.span("document", file=doc_path, mode="streaming" if streaming else "whole",
+                      language=target_language):
+        if streaming:
+            translate_document_streaming(doc_path, new_file_path, target_language=target_language, engine=engine,
+                                         on_progress=reporter(on_progress, doc_path, "translate", "bytes"),
+                                         source_language=source_language)
+        else:
+            translated_doc = translate_document(doc_path, target_language=target_language, engine=engine,
+                                                on_progress=reporter(on_progress, doc_path, "translate",
+                                                                     "paragraphs"),
+                                                source_language=source_language)
+            translated_doc.save(new_file_path)
+    metrics.count("bytes_read", size, kind="document")
+    if metrics.enabled():
+        metrics.count("bytes_written", os.path.getsize(new_file_path), kind="document")
+    print(f"Translated '{os.path.basename(doc_path)}' to '{os.path.basename(new_file_path)}' successfully.")
+    return new_file_path
+
+def process_single_document(doc_path, target_language='ne', suffix="_translated"):
+    process_document_file(doc_path, target_language, suffix=suffix)
     # Instead of a blocking message box, return a success message.
     return "Document processing completed successfully."
 
-def process_documents_in_folder(folder_path, target_language='ne'):
-    for filename in os.listdir(folder_path):
-        if filename.endswith(".docx"):
-            file_path = os.path.join(folder_path, filename)
-            try:
-                translated_doc = translate_document(file_path, target_language=target_language)
-                name, ext = os.path.splitext(filename)
-                new_filename = f"{name}_translated{ext}"
-                new_file_path = os.path.join(folder_path, new_filename)
-                translated_doc.save(new_file_path)
-                print(f"Translated '{filename}' to '{new_filename}' successfully.")
-            except Exception as e:
-                print(f"Error processing '{filename}': {e}")
-        else:
-            print(f"Skipping non-Word file: '{filename}'")
+def _translate_one(doc_path, backend, target_language, suffix, output_dir, concurrency, rate, streaming,
+                   source_language, on_progress=None):
+    """
+    Translates one document with its own engine and reports how it went. The
+    backend is passed in rather than looked up, so a worker process uses the
+    same one as the process that started it whatever its start method.
+    """
+    engine = make_engine(target_language, concurrency=concurrency, rate=rate, backend=backend)
+    start = time.perf_counter()
+    output, error = None, None
+    try:
+        output = process_document_file(doc_path, target_language, suffix=suffix, output_dir=output_dir,
+                                       on_progress=on_progress, streaming=streaming, engine=engine,
+                                       source_language=source_language)
+    except Exception as e:
+        error = str(e)
+        metrics.error("document", error, file=doc_path)
+    metrics.flush()
+    return DocumentResult(doc_path, output, time.perf_counter() - start, engine.requests, engine.retries,
+                          engine.failures, error)
+
+def _can_send(backend):
+    """True if the backend can be handed to a worker process."""
+    try:
+        pickle.dumps(backend)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return False
+    return True
+
+def process_documents(doc_paths, target_language='ne', suffix="_translated", output_dir=None, workers=None,
+                      concurrency=None, rate=None, streaming=None, on_done=None, source_language='auto',
+                      on_progress=None, backend=None):
+    """
+    Translates several documents in parallel worker processes, so parsing and
+    rewriting large documents is not held back by one interpreter.
+
+    The translation limits are shared: each of the workers gets an equal part
+    of `concurrency` and `rate`, so the batch as a whole never sends more
+    requests than a single engine with those settings would.
+
+    Args:
+        doc_paths (list): Input .docx files.
+        target_language (str): Target language code (default is 'ne').
+        suffix (str): Appended to the file name of each output.
+        output_dir (str): Where to write the outputs. Defaults to the
+                          directory of each input.
+        workers (int): Worker processes. Defaults to the CPU count, at most
+                       one per document.
+        concurrency (int): Translation requests in flight across all workers.
+                           Defaults to the translation backend's.
+        rate (float): Translation requests per second across all workers, 0
+                      for no limit. Defaults to the translation backend's.
+        streaming (bool): See process_document_file.
+        on_done (callable): Called with each DocumentResult as it finishes.
+        source_language (str): Language of the documents, or 'auto'.
+        on_progress (callable): Called with utils.progress.ProgressEvents.
+                                Documents translated in worker processes
+                                report only once each, when they finish.
+        backend (TranslationBackend or str): Backend or backend name to
+                                             translate with. Defaults to the
+                                             process-wide default backend.
+                                             A backend that cannot be sent
+                                             to a worker process translates
+                                             every document in this one.
+
+    Returns:
+        list: A DocumentResult per input, in input order.
+    """
+    doc_paths = list(doc_paths)
+    if not doc_paths:
+        return []
+    backend = get_backend(backend) if isinstance(backend, str) else backend or get_default_backend()
+    concurrency = concurrency or backend.default_concurrency
+    rate = backend.default_rate if rate is None else rate
+    workers = max(1, min(workers or os.cpu_count() or 1, len(doc_paths), concurrency))
+    if workers > 1 and not _can_send(backend):
+        print(f"Translation backend '{backend.name}' cannot be sent to worker processes; "
+              f"translating in this process.")
+        workers = 1
+    args = (backend, target_language, suffix, output_dir, max(1, concurrency // workers),
+            rate / workers if rate else 0, streaming, source_language)
+    results = {}
+    if workers == 1:
+        for path in doc_paths:
+            results[path] = _translate_one(path, *args, on_progress=on_progress)
+            if on_done is not None:
+                on_done(results[path])
+    else:
+        # Spawned, not forked: the caller may run other threads (the GUI, the
+        # video stages) and hold the translation memory's SQLite connection.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(_translate_one, path, *args): path for path in doc_paths}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    results[path] = future.result()
+                except Exception as e:
+                    # The worker process itself died, e.g. out of memory.
+                    results[path] = DocumentResult(path, None, 0.0, 0, 0, 0, str(e))
+                    metrics.error("document", e, file=path)
+                reporter(on_progress, path, "translate", "documents")(1, 1)
+                if on_done is not None:
+                    on_done(results[path])
+    return [results[path] for path in doc_paths]
+
+def process_documents_in_folder(folder_path, target_language='ne', suffix="_translated", output_dir=None,
+                                workers=None, concurrency=None, rate=None, on_done=None, source_language='auto'):
+    """
+    Translates every Word document in a folder with process_documents.
+
+    The folder is listed once up front, and documents that already end with
+    `suffix` are left out, so outputs written into the same folder are never
+    translated again.
+
+    Returns:
+        list: A DocumentResult per document.
+    """
+    doc_paths = [
+        os.path.join(folder_path, filename) for filename in sorted(os.listdir(folder_path))
+        if filename.lower().endswith(".docx") and not filename.startswith("~$")
+        and not os.path.splitext(filename)[0].endswith(suffix)
+    ]
+    return process_documents(doc_paths, target_language, suffix=suffix, output_dir=output_dir, workers=workers,
+                             concurrency=concurrency, rate=rate, on_done=on_done, source_language=source_language)
@@ -0,0 +1,103 @@
+# processors/pipeline.py
+
+import queue
+import threading
+
+_STOP = object()
+
+
+class Stage:
+    """
+    One step of a pipeline.
+
+    Args:
+        name (str): Stage name, used in error messages and thread names.
+        func (callable): Called with a job; may modify it in place.
+        workers (int): Number of threads running this stage.
+        queue_size (int): Capacity of the queue in front of this stage. When
+                          it is full, the previous stage blocks (backpressure).
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=2):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+
+
+class Pipeline:
+    """
+    Runs jobs through a sequence of stages, each with its own worker threads
+    and a bounded queue in between, so different jobs can be in different
+    stages at the same time.
+
+    A job is any object with an `error` attribute. If a stage raises, the
+    error is stored on the job and the remaining stages skip it.
+    """
+
+    def __init__(self, stages, on_done=None):
+        self.stages = list(stages)
+        self.on_done = on_done
+
+    def run(self, jobs):
+        """
+        Feeds the jobs through every stage and blocks until all are done.
+
+        Returns:
+            list: The jobs in completion order.
+        """
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        queues.append(queue.Queue())  # finished jobs, unbounded
+        remaining = [stage.workers for stage in self.stages]
+        lock = threading.Lock()
+        threads = []
+
+        def worker(index):
+            stage = self.stages[index]
+            inbox, outbox = queues[index], queues[index + 1]
+            while True:
+                job = inbox.get()
+                if job is _STOP:
+                    break
+                if job.error is None:
+                    try:
+                        stage.func(job)
+                    except Exception as e:
+                        job.error = f"{stage.name}: {e}"
+                outbox.put(job)
+            with lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            # The last worker of a stage shuts down the next one.
+            if last:
+                next_workers = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+                for _ in range(next_workers):
+                    outbox.put(_STOP)
+
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                thread = threading.Thread(target=worker, args=(index,), name=f"{stage.name}-{n}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        def feed():
+            for job in jobs:
+                queues[0].put(job)
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_STOP)
+
+        feeder = threading.Thread(target=feed, name="pipeline-feed", daemon=True)
+        feeder.start()
+
+        finished = []
+        while True:
+            job = queues[-1].get()
+            if job is _STOP:
+                break
+            finished.append(job)
+            if self.on_done is not None:
+                self.on_done(job)
+        feeder.join()
+        for thread in threads:
+            thread.join()
+        return finished
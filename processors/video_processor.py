@@ -1,40 +1,502 @@
 # processors/video_processor.py
 
 import os
-import tempfile
 import shutil
-from utils.transcription import transcribe_video
-from utils.translation import translate_srt_file
-from utils.ffmpeg_utils import burn_subtitles
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.transcription import transcribe_audio, audio_backing_file
+from utils.translation import translate_track, TranslationIncomplete
+from utils.subtitles import SubtitleTrack
+from utils.transcription_engines import get_default_engine, default_model_name
+from utils.translation_backends import get_default_backend
+from utils.ffmpeg_utils import (burn_subtitles, mux_subtitles, mux_output_extension, load_audio, map_audio,
+                                probe_duration, progress_seconds, SAMPLE_RATE)
+from utils.workspace import make_scratch_dir, link_or_copy
+from utils.checkpoints import get_checkpoint_store, file_digest
+from utils.progress import reporter
+from utils import metrics
+from processors.pipeline import Pipeline, Stage
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".avi", ".mov", ".flv", ".wmv")
+
+# How many languages are translated and burned at the same time for one video.
+MAX_PARALLEL_LANGUAGES = 3
+
+# Worker threads per pipeline stage. Whisper keeps one CPU/GPU busy on its
+# own, translation waits on the network and burning waits on ffmpeg.
+DEFAULT_STAGE_WORKERS = {"audio": 2, "transcribe": 1, "translate": 2, "burn": 2}
+# Jobs allowed to wait between two stages before the earlier stage blocks.
+DEFAULT_QUEUE_SIZE = 2
+
+# "burn" re-encodes the video with the subtitles drawn in, one file per
+# language. "mux" copies the streams and adds every language as a selectable
+# subtitle track in a single file, which takes seconds instead of an encode.
+OUTPUT_MODES = ("burn", "mux")
+
+# Set your font path if needed for burning subtitles.
+FONT_PATH = "C:\\Windows\\Fonts\\NotoSansDevanagari-Regular.ttf"
+
+def _resolve_languages(target_language, target_languages):
+    if target_languages:
+        return list(dict.fromkeys(target_languages))
+    return [target_language]
+
+class VideoJob:
+    """State of one video as it moves through the processing stages."""
+
+    def __init__(self, video_path, languages, output_dir=None, work_dir=None, isolate=False, checkpoints=None,
+                 output_mode="burn", encoder_profile=None, on_progress=None, model_name=None,
+                 transcription_engine=None):
+        if output_mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode '{output_mode}', expected one of {OUTPUT_MODES}")
+        self.video_path = video_path
+        self.languages = languages
+        self.output_mode = output_mode
+        self.encoder_profile = encoder_profile
+        self.on_progress = on_progress
+        self.model_name = model_name or default_model_name()
+        self.engine = transcription_engine or get_default_engine()
+        self.duration = None
+        self.output_dir = output_dir or os.path.dirname(os.path.abspath(video_path))
+        self.work_dir = work_dir
+        self.isolate = isolate
+        self.checkpoints = checkpoints
+        self.digest = None
+        self.temp_dir = None
+        self.source_video = video_path
+        self.audio = None
+        self.cached_srt = None
+        self.track = None     # SubtitleTrack of the transcription
+        self.language = None  # spoken language detected by Whisper
+        self.translated_tracks = {}
+        # Languages whose translation left some cues untranslated, with the
+        # error; their results are written but never checkpointed.
+        self.incomplete = {}
+        # SRT files ffmpeg can read, per language: checkpoints, or scratch
+        # files written from translated_tracks when first needed.
+        self.subtitle_files = {}
+        self.outputs = []
+        self.timings = {}
+        self.error = None
+
+    def cleanup(self):
+        if self.temp_dir:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.temp_dir = None
+
+def _timed(name, func):
+    def run(job):
+        start = time.perf_counter()
+        try:
+            with metrics.span("video_stage", file=job.video_path, stage=name):
+                func(job)
+        finally:
+            job.timings[name] = time.perf_counter() - start
+    return run
 
-def process_single_video(video_path, target_language='ne'):
-    temp_dir = tempfile.mkdtemp()
+# Parameters that change the result of each stage; part of the checkpoint key.
+def _audio_params():
+    return {"sample_rate": SAMPLE_RATE}
+
+def _transcribe_params(job):
+    return dict(job.engine.params(), model=job.model_name)
+
+def _translate_params(job, language):
+    return dict(_transcribe_params(job), language=language, source=job.language or 'auto',
+                backend=get_default_backend().name)
+
+def _burn_params(job, language):
+    base = os.path.splitext(os.path.basename(job.video_path))[0]
+    return dict(_translate_params(job, language), font=FONT_PATH, encoder=job.encoder_profile,
+                output=os.path.join(os.path.abspath(job.output_dir), f"{base}_{language}.mp4"))
+
+def _audio_stage(job):
+    # Only scratch files go to the work dir; the source video is read in place.
+    job.temp_dir = make_scratch_dir(job.work_dir)
+    if job.isolate:
+        job.source_video = link_or_copy(job.video_path, job.temp_dir)
+    if job.checkpoints is not None:
+        job.digest = file_digest(job.source_video)
+        job.cached_srt = job.checkpoints.get("transcribe", job.digest, _transcribe_params(job), ".srt")
+        if job.cached_srt:
+            # Transcriptions from before the language was recorded have no marker.
+            marker = job.checkpoints.get_marker("transcribe", job.digest, _transcribe_params(job)) or {}
+            job.language = marker.get("language")
+            job.duration = marker.get("duration") or probe_duration(job.source_video)
+            if marker:
+                # Left behind by a run that stopped before it could clean up.
+                job.checkpoints.remove("audio", job.digest, _audio_params(), ".f32")
+            return
+        cached_audio = job.checkpoints.get("audio", job.digest, _audio_params(), ".f32")
+        if cached_audio:
+            job.audio = map_audio(cached_audio)
+            job.duration = len(job.audio) / SAMPLE_RATE
+            return
+    on_block = None
+    if job.on_progress is not None:
+        # The duration gives the decode progress a total to count toward.
+        job.duration = probe_duration(job.source_video)
+        report = _ffmpeg_progress(job, "audio")
+        on_block = lambda block: report("audio", block)
+    job.audio = load_audio(job.source_video, scratch_dir=job.temp_dir, on_progress=on_block)
+    job.duration = len(job.audio) / SAMPLE_RATE
+    reporter(job.on_progress, job.video_path, "audio", "s")(job.duration, job.duration)
+    spill_file = audio_backing_file(job.audio)
+    if job.checkpoints is not None and spill_file:
+        # Long recordings are already on disk; keeping them costs only a rename.
+        job.audio = None
+        stored = job.checkpoints.put("audio", job.digest, spill_file, _audio_params(), ".f32", move=True)
+        job.audio = map_audio(stored)
+
+def _checkpoint_track(job, stage, track, params):
+    """Stores a track in the checkpoint store as SRT and returns the stored file."""
+    fd, scratch = tempfile.mkstemp(dir=job.temp_dir, suffix=".srt")
+    os.close(fd)
+    track.write_srt(scratch)
+    return job.checkpoints.put(stage, job.digest, scratch, params, ".srt", move=True)
+
+def _source_track(job):
+    # A checkpointed transcription is parsed only once a language needs it.
+    if job.track is None and job.cached_srt:
+        job.track = SubtitleTrack.read(job.cached_srt, job.language)
+    return job.track
+
+def _subtitle_file(job, language):
+    """Returns an SRT file of the language's subtitles for ffmpeg, writing one if there is none yet."""
+    if language not in job.subtitle_files:
+        base = os.path.splitext(os.path.basename(job.video_path))[0]
+        job.subtitle_files[language] = job.translated_tracks[language].write_srt(
+            os.path.join(job.temp_dir, f"{base}_{language}.srt"))
+    return job.subtitle_files[language]
+
+def _transcribe_stage(job):
+    if job.cached_srt:
+        print(f"Reusing transcription of '{job.video_path}'.")
+        return
     try:
-        # Copy the original video to a temporary directory.
-        shutil.copy(video_path, temp_dir)
-        # Process all videos in the temporary directory.
-        process_videos_in_folder(temp_dir, target_language)
-        base, ext = os.path.splitext(os.path.basename(video_path))
-        # Only copy the final video (with burned subtitles) to the output.
-        final_video = os.path.join(temp_dir, f"{base}_{target_language}.mp4")
-        if os.path.exists(final_video):
-            shutil.copy(final_video, os.path.dirname(video_path))
+        transcript = transcribe_audio(job.audio, model_name=job.model_name, engine=job.engine,
+                                      on_progress=reporter(job.on_progress, job.video_path, "transcribe", "s"))
     finally:
-        shutil.rmtree(temp_dir)
-    return "Video processing completed successfully."
+        audio_file = audio_backing_file(job.audio)
+        job.audio = None
+        # Spill files in the scratch dir go; checkpointed audio stays until
+        # the transcription is checkpointed too.
+        if audio_file and os.path.dirname(os.path.abspath(audio_file)) == os.path.abspath(job.temp_dir):
+            os.remove(audio_file)
+    job.track = transcript.track
+    job.language = transcript.language
+    if job.checkpoints is not None:
+        _checkpoint_track(job, "transcribe", job.track, _transcribe_params(job))
+        job.checkpoints.put_marker("transcribe", job.digest,
+                                   {"language": transcript.language, "duration": transcript.duration},
+                                   _transcribe_params(job))
+        # Decoded audio takes about 230 MB per hour and is only needed until
+        # the transcription is stored.
+        job.checkpoints.remove("audio", job.digest, _audio_params(), ".f32")
+    print(f"Transcribed '{job.video_path}' ({job.language or 'unknown language'}): {len(job.track)} segments.")
+
+def _translate_stage(job):
+    report = reporter(job.on_progress, job.video_path, "translate", "cues")
+    for index, language in enumerate(job.languages):
+        # Every language translates the same cues, so progress is reported
+        # over all languages together.
+        def on_cues(done, total, index=index):
+            report(index * total + done, total * len(job.languages))
+
+        if job.checkpoints is not None:
+            cached = job.checkpoints.get("translate", job.digest, _translate_params(job, language), ".srt")
+            if cached:
+                # ffmpeg reads the checkpoint directly; it is never parsed.
+                job.subtitle_files[language] = cached
+                print(f"Reusing '{language}' translation of '{job.video_path}'.")
+                continue
+        # Whisper already identified the spoken language; telling the backend
+        # saves it detecting the language again for every short cue.
+        try:
+            translated = translate_track(_source_track(job), target_language=language,
+                                         source_language=job.language or 'auto', on_progress=on_cues, strict=True)
+        except TranslationIncomplete as e:
+            # Still burned, so the other cues are not lost, but kept out of
+            # the checkpoints so the next run translates it again.
+            translated = e.track
+            job.incomplete[language] = str(e)
+        job.translated_tracks[language] = translated
+        if job.checkpoints is not None and language not in job.incomplete:
+            job.subtitle_files[language] = _checkpoint_track(job, "translate", translated,
+                                                             _translate_params(job, language))
+
+def _ffmpeg_progress(job, stage, parts=1):
+    """
+    Returns a callback for ffmpeg progress blocks that reports the output
+    position summed over `parts` encodes running at the same time, each
+    identified by the key passed as its first argument.
+    """
+    report = reporter(job.on_progress, job.video_path, stage, "s")
+    total = job.duration * parts if job.duration else None
+    positions = {}
+    lock = threading.Lock()
 
-def process_videos_in_folder(folder_path, target_language='ne'):
-    model_name = "base"
-    # Set your font path if needed for burning subtitles.
-    font_path = "C:\\Windows\\Fonts\\NotoSansDevanagari-Regular.ttf"
-    for filename in os.listdir(folder_path):
-        if filename.endswith((".mp4", ".mkv", ".avi", ".mov", ".flv", ".wmv")):
-            video_path = os.path.join(folder_path, filename)
+    def on_block(key, block):
+        seconds = progress_seconds(block)
+        if seconds is None:
+            return
+        with lock:
+            positions[key] = seconds
+            done = sum(positions.values())
+        report(min(done, total) if total else done, total)
+
+    return on_block
+
+def _burn_one(job, language, on_block=None):
+    base = os.path.splitext(os.path.basename(job.video_path))[0]
+    final_video = os.path.join(job.output_dir, f"{base}_{language}.mp4")
+    if job.checkpoints is not None:
+        marker = job.checkpoints.get_marker("burn", job.digest, _burn_params(job, language))
+        if marker and os.path.exists(final_video) and os.path.getsize(final_video) == marker.get("size"):
+            print(f"Reusing existing video '{final_video}'.")
+            return final_video
+    # Write under a temporary name next to the destination, so a failed burn
+    # never leaves a truncated video behind and success needs no extra copy.
+    partial_video = os.path.join(job.output_dir, f"{base}_{language}.partial.mp4")
+    on_progress = (lambda block: on_block(language, block)) if on_block else None
+    if burn_subtitles(job.source_video, _subtitle_file(job, language), partial_video, FONT_PATH,
+                      profile=job.encoder_profile, on_progress=on_progress):
+        os.replace(partial_video, final_video)
+        if job.checkpoints is not None and language not in job.incomplete:
+            job.checkpoints.put_marker("burn", job.digest, {"size": os.path.getsize(final_video)},
+                                       _burn_params(job, language))
+        return final_video
+    if os.path.exists(partial_video):
+        os.remove(partial_video)
+    return None
+
+def _mux_params(job, output_path):
+    return dict(_transcribe_params(job), languages=job.languages, source=job.language or 'auto',
+                backend=get_default_backend().name, mode="mux",
+                output=os.path.abspath(output_path))
+
+def _mux_all(job):
+    base = os.path.splitext(os.path.basename(job.video_path))[0]
+    ext = mux_output_extension(job.video_path)
+    final_video = os.path.join(job.output_dir, f"{base}_{'_'.join(job.languages)}{ext}")
+    if job.checkpoints is not None:
+        marker = job.checkpoints.get_marker("mux", job.digest, _mux_params(job, final_video))
+        if marker and os.path.exists(final_video) and os.path.getsize(final_video) == marker.get("size"):
+            print(f"Reusing existing video '{final_video}'.")
+            job.outputs.append(final_video)
+            return
+    partial_video = os.path.join(job.output_dir, f"{base}_{'_'.join(job.languages)}.partial{ext}")
+    tracks = [(_subtitle_file(job, language), language) for language in job.languages]
+    on_block = _ffmpeg_progress(job, "mux")
+    if mux_subtitles(job.source_video, tracks, partial_video, on_progress=lambda block: on_block("mux", block)):
+        os.replace(partial_video, final_video)
+        if job.checkpoints is not None and not job.incomplete:
+            job.checkpoints.put_marker("mux", job.digest, {"size": os.path.getsize(final_video)},
+                                       _mux_params(job, final_video))
+        job.outputs.append(final_video)
+    elif os.path.exists(partial_video):
+        os.remove(partial_video)
+
+def _burn_stage(job):
+    if job.output_mode == "mux":
+        _mux_all(job)
+        return
+    if job.duration is None:
+        job.duration = probe_duration(job.source_video)
+    on_block = _ffmpeg_progress(job, "burn", parts=len(job.languages)) if job.on_progress else None
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_LANGUAGES, len(job.languages))) as pool:
+        futures = [pool.submit(_burn_one, job, language, on_block) for language in job.languages]
+    for future in futures:
+        final_video = future.result()
+        if final_video:
+            job.outputs.append(final_video)
+
+def _incomplete_error(job):
+    """Returns the job's error for untranslated cues, which do not stop the later stages, or None."""
+    if not job.incomplete:
+        return None
+    return "translate: " + "; ".join(job.incomplete[language] for language in job.languages
+                                     if language in job.incomplete)
+
+_STAGES = (
+    ("audio", _audio_stage),
+    ("transcribe", _transcribe_stage),
+    ("translate", _translate_stage),
+    ("burn", _burn_stage),
+)
+
+def process_video_file(video_path, target_language='ne', target_languages=None, output_dir=None,
+                       work_dir=None, isolate=False, use_checkpoints=True, output_mode="burn",
+                       encoder_profile=None, on_progress=None, model_name=None, transcription_engine=None):
+    """
+    Produces a subtitled video per target language without copying the input.
+
+    The source is read in place, scratch files go to a fresh directory under
+    the work dir and only the final videos are written to output_dir.
+
+    Args:
+        video_path (str): Path to the input video.
+        target_language (str): Target language code (default is 'ne').
+        target_languages (list): Several target language codes. Overrides
+                                 target_language when given.
+        output_dir (str): Where to write the final videos. Defaults to the
+                          directory of the input.
+        work_dir (str): Where to create scratch files. Defaults to
+                        GLOBAL_CLASSROOM_WORK_DIR or the system temp dir.
+        isolate (bool): Hardlink (or reflink, or as a last resort copy) the
+                        input into the scratch dir and read it from there,
+                        for sources that may change while being processed.
+        use_checkpoints (bool): Keep each stage's result in the checkpoint
+                                store and skip stages already done for the
+                                same input and settings (default is True).
+        output_mode (str): 'burn' to draw the subtitles into one re-encoded
+                           video per language, or 'mux' to add all languages
+                           as selectable tracks to one stream-copied video.
+        encoder_profile (str or dict): Encoder settings for burning, e.g.
+                                       'fast-draft', 'archive' or
+                                       'low-bandwidth'. See
+                                       utils.ffmpeg_utils.ENCODER_PROFILES.
+        on_progress (callable): Called with a utils.progress.ProgressEvent as
+                                each stage advances.
+        model_name (str): Whisper model size, e.g. 'base' or 'small'.
+                          Defaults to GLOBAL_CLASSROOM_WHISPER_MODEL or 'base'.
+        transcription_engine (TranscriptionEngine): Engine to transcribe
+                                                    with, see
+                                                    utils.transcription_engines.
+
+    Returns:
+        VideoJob: The finished job. `outputs` lists the written videos and
+                  `error` is set if a stage failed or some subtitles could
+                  not be translated.
+    """
+    job = VideoJob(video_path, _resolve_languages(target_language, target_languages),
+                   output_dir=output_dir, work_dir=work_dir, isolate=isolate,
+                   checkpoints=get_checkpoint_store() if use_checkpoints else None,
+                   output_mode=output_mode, encoder_profile=encoder_profile, on_progress=on_progress,
+                   model_name=model_name, transcription_engine=transcription_engine)
+    try:
+        for name, stage in _STAGES:
             try:
-                transcribe_video(video_path, model_name)
-                # Translate the SRT file using the specified target language.
-                srt_path = translate_srt_file(os.path.splitext(video_path)[0] + ".srt", target_language=target_language)
-                # Burn the translated subtitles into a new video file.
-                burn_subtitles(video_path, srt_path, os.path.splitext(video_path)[0] + f"_{target_language}.mp4", font_path)
+                _timed(name, stage)(job)
             except Exception as e:
-                print(f"Error processing '{filename}': {e}")
+                job.error = f"{name}: {e}"
+                print(f"Error processing '{video_path}': {job.error}")
+                metrics.error(name, e, file=video_path)
+                break
+        else:
+            job.error = _incomplete_error(job)
+            if job.error:
+                print(f"Error processing '{video_path}': {job.error}")
+                metrics.error("translate", job.error.partition(": ")[2], file=video_path)
+    finally:
+        job.cleanup()
+    return job
+
+def process_single_video(video_path, target_language='ne', target_languages=None, work_dir=None,
+                         output_mode="burn", encoder_profile=None, model_name=None, transcription_engine=None):
+    """
+    Produces a subtitled copy of the video next to the original for each
+    target language. The video is transcribed only once.
+
+    Args:
+        video_path (str): Path to the input video.
+        target_language (str): Target language code (default is 'ne').
+        target_languages (list): Several target language codes. Overrides
+                                 target_language when given.
+        work_dir (str): Where to create scratch files.
+        output_mode (str): 'burn' or 'mux', see process_video_file.
+        encoder_profile (str or dict): Encoder settings for burning.
+        model_name (str): Whisper model size, see process_video_file.
+        transcription_engine (TranscriptionEngine): Engine to transcribe with.
+
+    Raises:
+        RuntimeError: If a stage failed.
+    """
+    job = process_video_file(video_path, target_language, target_languages, work_dir=work_dir,
+                             output_mode=output_mode, encoder_profile=encoder_profile, model_name=model_name,
+                             transcription_engine=transcription_engine)
+    if job.error:
+        raise RuntimeError(f"Error processing '{video_path}': {job.error}")
+    return "Video processing completed successfully."
+
+def _is_output(filename, languages):
+    """
+    True for files the video pipeline writes itself: unfinished '.partial'
+    videos and subtitled copies for these languages, '<name>_<language>' and
+    the muxed '<name>_<language>_<language>...'.
+    """
+    if ".partial." in filename.lower():
+        return True
+    base = os.path.splitext(filename)[0]
+    return base.endswith(tuple(f"_{language}" for language in languages) + (f"_{'_'.join(languages)}",))
+
+def process_videos_in_folder(folder_path, target_language='ne', target_languages=None, work_dir=None,
+                             output_mode="burn", encoder_profile=None, model_name=None, transcription_engine=None):
+    languages = _resolve_languages(target_language, target_languages)
+    # Take the listing up front so outputs written into the folder are not picked up.
+    filenames = [f for f in os.listdir(folder_path)
+                 if f.lower().endswith(VIDEO_EXTENSIONS) and not _is_output(f, languages)]
+    for filename in filenames:
+        process_video_file(os.path.join(folder_path, filename), target_languages=languages,
+                           output_dir=folder_path, work_dir=work_dir, output_mode=output_mode,
+                           encoder_profile=encoder_profile, model_name=model_name,
+                           transcription_engine=transcription_engine)
+
+def process_videos(video_paths, target_language='ne', target_languages=None, stage_workers=None,
+                   queue_size=DEFAULT_QUEUE_SIZE, on_done=None, output_dir=None, work_dir=None,
+                   use_checkpoints=True, output_mode="burn", encoder_profile=None, on_progress=None,
+                   model_name=None, transcription_engine=None):
+    """
+    Processes several videos with the stages overlapping: while one video is
+    being burned, the next can be translated and the one after transcribed.
+
+    Args:
+        video_paths (list): Paths to the input videos.
+        target_language (str): Target language code (default is 'ne').
+        target_languages (list): Several target language codes. Overrides
+                                 target_language when given.
+        stage_workers (dict): Worker threads per stage ('audio', 'transcribe',
+                              'translate', 'burn', the last one also doing
+                              the muxing in 'mux' mode). Missing stages use
+                              DEFAULT_STAGE_WORKERS.
+        queue_size (int): Jobs allowed to wait in front of each stage.
+        on_done (callable): Called with each VideoJob as it finishes.
+        output_dir (str): Where to write the final videos. Defaults to the
+                          directory of each input.
+        work_dir (str): Where to create scratch files.
+        use_checkpoints (bool): Skip stages already done for the same input
+                                and settings (default is True).
+        output_mode (str): 'burn' or 'mux', see process_video_file.
+        encoder_profile (str or dict): Encoder settings for burning.
+        on_progress (callable): Called with a utils.progress.ProgressEvent as
+                                each stage of each video advances. May be
+                                called from several threads.
+        model_name (str): Whisper model size, see process_video_file.
+        transcription_engine (TranscriptionEngine): Engine to transcribe with.
+
+    Returns:
+        list: The finished VideoJob objects. A job whose `error` is set failed.
+    """
+    languages = _resolve_languages(target_language, target_languages)
+    workers = dict(DEFAULT_STAGE_WORKERS, **(stage_workers or {}))
+    stages = [Stage(name, _timed(name, func), workers[name], queue_size) for name, func in _STAGES]
+
+    def finish(job):
+        job.cleanup()
+        if job.error is None:
+            job.error = _incomplete_error(job)
+        if job.error:
+            print(f"Error processing '{job.video_path}': {job.error}")
+            stage, _, message = job.error.partition(": ")
+            metrics.error(stage, message, file=job.video_path)
+        if on_done is not None:
+            on_done(job)
+
+    checkpoints = get_checkpoint_store() if use_checkpoints else None
+    jobs = [VideoJob(path, languages, output_dir=output_dir, work_dir=work_dir, checkpoints=checkpoints,
+                     output_mode=output_mode, encoder_profile=encoder_profile, on_progress=on_progress,
+                     model_name=model_name, transcription_engine=transcription_engine)
+            for path in video_paths]
+    return Pipeline(stages, on_done=finish).run(jobs)
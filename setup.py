@@ -7,18 +7,19 @@ setup(
     author="Gustavo Guzman",
     author_email="gustavo.guzman88@gmail.com.com",
     url="https://github.com/GustavoGuzman-alt/GlobalClassroom",  # Update with your repo URL
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks"]),
     install_requires=[
         "whisper>=1.2.0",
         "deep-translator>=1.7.0",
-        "pysrt>=1.1.2",
         "python-docx>=0.8.11",
         "PySide6>=6.2.0",
-        "torch"
+        "torch",
+        "numpy"
     ],
     entry_points={
         "console_scripts": [
-            "global_classroom=main:run_app"
+            "global_classroom=main:main",
+            "global_classroom_cli=cli:main"
         ]
     },
     classifiers=[
@@ -0,0 +1,8 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# The modules are imported as top-level packages (utils, processors), the way
+# main.py and cli.py import them.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
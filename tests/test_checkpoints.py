@@ -0,0 +1,23 @@
+# tests/test_checkpoints.py
+
+from utils.checkpoints import CheckpointStore
+
+
+def test_put_get_and_remove(tmp_path):
+    store = CheckpointStore(str(tmp_path / "store"))
+    source = tmp_path / "audio.f32"
+    source.write_bytes(b"\0" * 16)
+    stored = store.put("audio", "digest", str(source), {"sample_rate": 16000}, ".f32", move=True)
+    assert not source.exists()
+    assert store.get("audio", "digest", {"sample_rate": 16000}, ".f32") == stored
+    assert store.get("audio", "digest", {"sample_rate": 8000}, ".f32") is None
+    assert store.remove("audio", "digest", {"sample_rate": 16000}, ".f32")
+    assert store.get("audio", "digest", {"sample_rate": 16000}, ".f32") is None
+    assert not store.remove("audio", "digest", {"sample_rate": 16000}, ".f32")
+
+
+def test_markers(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    assert store.get_marker("burn", "digest") is None
+    store.put_marker("burn", "digest", {"size": 3})
+    assert store.get_marker("burn", "digest") == {"size": 3}
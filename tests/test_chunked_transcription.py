@@ -0,0 +1,43 @@
+# tests/test_chunked_transcription.py
+
+import numpy as np
+
+from utils.chunked_transcription import find_cut_points, stitch_segments
+
+
+def segment(start, end, text):
+    return {"start": start, "end": end, "text": text}
+
+
+def test_segments_in_the_overlap_are_kept_once():
+    # Chunk 0 owns [0, 10), chunk 1 owns [10, 20); both heard 8-12 s.
+    bounds = [(0.0, 10.0), (10.0, 20.0)]
+    first = [segment(0.0, 4.0, "one"), segment(8.5, 9.5, "two"), segment(10.5, 11.5, "three (cut off)")]
+    second = [segment(8.4, 9.6, "two"), segment(10.5, 11.5, "three"), segment(15.0, 19.0, "four")]
+    assert stitch_segments([first, second], bounds) == [
+        segment(0.0, 4.0, "one"), segment(8.5, 9.5, "two"), segment(10.5, 11.5, "three"),
+        segment(15.0, 19.0, "four"),
+    ]
+
+
+def test_overlapping_segments_are_trimmed():
+    bounds = [(0.0, 10.0), (10.0, 20.0)]
+    stitched = stitch_segments([[segment(6.0, 10.8, "end of first")], [segment(10.2, 12.0, "start of second")]],
+                               bounds)
+    assert stitched == [segment(6.0, 10.2, "end of first"), segment(10.2, 12.0, "start of second")]
+
+
+def test_repeated_text_across_the_cut_is_dropped():
+    bounds = [(0.0, 10.0), (10.0, 20.0)]
+    stitched = stitch_segments([[segment(8.0, 9.9, "Thank you.")], [segment(10.0, 11.0, " Thank you.")]], bounds)
+    assert stitched == [segment(8.0, 9.9, "Thank you.")]
+
+
+def test_cuts_land_in_silence():
+    sample_rate = 100
+    audio = np.ones(sample_rate * 100, dtype=np.float32)
+    audio[sample_rate * 25:sample_rate * 26] = 0  # a silence 5 s before the first target
+    cuts = find_cut_points(audio, sample_rate, chunk_seconds=30, search_seconds=10)
+    assert 25 * sample_rate <= cuts[0] <= 26 * sample_rate
+    assert all(later > earlier for earlier, later in zip(cuts, cuts[1:]))
+    assert len(audio) - cuts[-1] <= (30 + 10) * sample_rate
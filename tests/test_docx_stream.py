@@ -0,0 +1,83 @@
+# tests/test_docx_stream.py
+
+import zipfile
+
+import pytest
+
+docx = pytest.importorskip("docx")
+
+from benchmarks.fake_translator import FakeTranslator
+from utils.docx_stream import translate_docx_streaming
+from utils.translation import translate_document
+from utils.translation_engine import TranslationEngine
+
+
+def tag(texts):
+    return [f"[es] {text}" for text in texts]
+
+
+@pytest.fixture
+def document_path(tmp_path):
+    from docx.shared import Inches
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = "Header text"
+    paragraph = document.add_paragraph()
+    paragraph.paragraph_format.tab_stops.add_tab_stop(Inches(1))
+    paragraph.add_run("Name:").bold = True
+    paragraph.add_run("\tValue & <x>")
+    paragraph = document.add_paragraph()
+    paragraph.add_run("First line")
+    paragraph.add_run().add_break()
+    paragraph.add_run("second line")
+    document.add_paragraph("\tIndented")
+    document.add_paragraph("")
+    document.add_table(rows=1, cols=1).rows[0].cells[0].text = "In a table"
+    path = tmp_path / "input.docx"
+    document.save(str(path))
+    return str(path)
+
+
+def paragraph_texts(path):
+    document = docx.Document(path)
+    texts = [paragraph.text for paragraph in document.paragraphs]
+    texts += [cell.text for table in document.tables for row in table.rows for cell in row.cells]
+    return texts + [document.sections[0].header.paragraphs[0].text]
+
+
+def test_round_trip_keeps_tabs_and_breaks(document_path, tmp_path):
+    output = translate_docx_streaming(document_path, str(tmp_path / "output.docx"), tag)
+    assert paragraph_texts(output) == ["[es] Name:\tValue & <x>", "[es] First line\nsecond line",
+                                       "\t[es] Indented", "", "[es] In a table", "[es] Header text"]
+    # Run formatting and the tab stop survive.
+    paragraph = docx.Document(output).paragraphs[0]
+    assert paragraph.runs[0].bold
+    assert len(paragraph.paragraph_format.tab_stops) == 1
+
+
+def test_matches_python_docx(document_path, tmp_path):
+    engine = TranslationEngine(lambda: FakeTranslator(target="es"), concurrency=1, rate=0)
+    expected = str(tmp_path / "expected.docx")
+    translate_document(document_path, "es", use_memory=False, engine=engine).save(expected)
+    output = translate_docx_streaming(document_path, str(tmp_path / "output.docx"), engine.translate_many)
+    assert paragraph_texts(output) == paragraph_texts(expected)
+
+
+def test_translation_without_tabs_keeps_them_in_place(document_path, tmp_path):
+    def drop_tabs(texts):
+        return [text.replace("\t", " ") for text in texts]
+
+    output = translate_docx_streaming(document_path, str(tmp_path / "output.docx"), drop_tabs)
+    assert paragraph_texts(output)[0].count("\t") == 1
+
+
+def test_other_parts_are_copied_unchanged(document_path, tmp_path):
+    output = translate_docx_streaming(document_path, str(tmp_path / "output.docx"), tag)
+    with zipfile.ZipFile(document_path) as src, zipfile.ZipFile(output) as dst:
+        assert src.namelist() == dst.namelist()
+        assert src.read("word/styles.xml") == dst.read("word/styles.xml")
+
+
+def test_failed_translation_keeps_the_original(document_path, tmp_path):
+    output = translate_docx_streaming(document_path, str(tmp_path / "output.docx"),
+                                      lambda texts: [None] * len(texts))
+    assert paragraph_texts(output) == paragraph_texts(document_path)
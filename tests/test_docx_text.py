@@ -0,0 +1,91 @@
+# tests/test_docx_text.py
+
+import pytest
+
+from utils.docx_text import apply_translation, distribute, distribute_fragments, paragraph_text, split_text
+
+
+def test_split_text_keeps_every_character():
+    text = "The quick brown fox jumps over the lazy dog"
+    pieces = split_text(text, [10, 5, 20])
+    assert len(pieces) == 3
+    assert "".join(pieces) == text
+
+
+def test_split_text_cuts_after_spaces():
+    pieces = split_text("alpha beta gamma delta", [6, 5, 11])
+    assert pieces == ["alpha ", "beta ", "gamma delta"]
+
+
+def test_split_text_without_spaces_cuts_proportionally():
+    assert split_text("一二三四五六", [1, 1, 1]) == ["一二", "三四", "五六"]
+
+
+def test_split_text_edge_cases():
+    assert split_text("whole", [3]) == ["whole"]
+    assert split_text("", [2, 3]) == ["", ""]
+    assert "".join(split_text("text", [0, 0])) == "text"
+
+
+def test_distribute_keeps_surrounding_whitespace():
+    pieces = distribute(["  Hello ", "world  "], "Hola mundo")
+    assert pieces[0].startswith("  ")
+    assert pieces[-1].endswith("  ")
+    assert "".join(pieces).strip() == "Hola mundo"
+
+
+def test_distribute_gives_empty_runs_nothing_to_lose():
+    pieces = distribute(["Bold", "", "plain text"], "Negrita texto normal")
+    assert len(pieces) == 3
+    assert "".join(pieces) == "Negrita texto normal"
+
+
+def make_paragraph():
+    docx = pytest.importorskip("docx")
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+    paragraph = docx.Document().add_paragraph()
+    paragraph.add_run("Name:").bold = True
+    paragraph.add_run().add_tab()
+    run = paragraph.add_run("Value ")
+    # A field and a symbol inside a run that also has text.
+    run._r.append(parse_xml(f'<w:fldChar {nsdecls("w")} w:fldCharType="begin"/>'))
+    run._r.append(parse_xml(f'<w:sym {nsdecls("w")} w:font="Wingdings" w:char="F04A"/>'))
+    run._r.append(parse_xml(f'<w:t {nsdecls("w")}>here</w:t>'))
+    paragraph.add_run().add_break()
+    paragraph.add_run("next line")
+    return paragraph
+
+
+def child_tags(paragraph):
+    return [[child.tag.rsplit("}", 1)[1] for child in run._r] for run in paragraph.runs]
+
+
+def test_paragraph_text_reads_tabs_and_breaks():
+    paragraph = make_paragraph()
+    assert paragraph_text(paragraph.runs) == "Name:\tValue here\nnext line"
+
+
+def test_apply_translation_rewrites_only_text():
+    paragraph = make_paragraph()
+    before = child_tags(paragraph)
+    apply_translation(paragraph.runs, "Nombre:\tValor aquí\nsiguiente línea")
+    assert child_tags(paragraph) == before
+    assert paragraph_text(paragraph.runs) == "Nombre:\tValor aquí\nsiguiente línea"
+    assert paragraph.runs[0].bold
+    # The tab-only and break-only runs got no text.
+    assert paragraph.runs[1].text == "\t"
+    assert paragraph.runs[3].text == "\n"
+
+
+def test_apply_translation_without_the_tab_keeps_it_in_place():
+    paragraph = make_paragraph()
+    apply_translation(paragraph.runs, "Nombre: Valor aquí siguiente línea")
+    assert paragraph_text(paragraph.runs).count("\t") == 1
+    assert paragraph_text(paragraph.runs).count("\n") == 1
+    assert paragraph.runs[1].text == "\t"
+
+
+def test_distribute_fragments_follows_separators():
+    fragments = [("Name:", True), ("\t", False), ("Value ", True), ("here", True)]
+    assert distribute_fragments(fragments, "Nombre:\tValor aquí") == ["Nombre:", "Valor ", "aquí"]
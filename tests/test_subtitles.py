@@ -0,0 +1,62 @@
+# tests/test_subtitles.py
+
+from utils.subtitles import SubtitleTrack, format_srt_time, seconds_to_ms
+
+SRT = """1
+00:00:01,000 --> 00:00:02,500
+Hello there.
+
+2
+00:00:03,000 --> 00:01:04,042
+Two lines
+of text.
+
+3
+01:02:03,004 --> 01:02:05,000
+Last one.
+
+"""
+
+
+def test_format_srt_time():
+    assert format_srt_time(0) == "00:00:00,000"
+    assert format_srt_time(3723004) == "01:02:03,004"
+
+
+def test_segment_times_are_truncated_to_milliseconds():
+    assert seconds_to_ms(2.9999) == 2999
+    track = SubtitleTrack.from_segments([{"start": 0.0004, "end": 1.9996, "text": "x"}])
+    assert (track.starts[0], track.ends[0]) == (0, 1999)
+
+
+def test_parse_and_to_srt_round_trip():
+    track = SubtitleTrack.parse(SRT)
+    assert list(track) == [(1000, 2500, "Hello there."), (3000, 64042, "Two lines\nof text."),
+                           (3723004, 3725000, "Last one.")]
+    assert track.to_srt() == SRT
+
+
+def test_write_srt_and_read_round_trip(tmp_path):
+    track = SubtitleTrack.from_segments([{"start": 0.0, "end": 1.25, "text": " Café "},
+                                         {"start": 1.5, "end": 3.0, "text": "नमस्ते"}], language="en")
+    path = track.write_srt(str(tmp_path / "track.srt"))
+    read = SubtitleTrack.read(path)
+    assert list(read) == [(0, 1250, "Café"), (1500, 3000, "नमस्ते")]
+    assert read.to_srt() == track.to_srt()
+
+
+def test_parse_tolerates_bom_crlf_and_webvtt():
+    crlf = "﻿" + SRT.replace("\n", "\r\n")
+    assert list(SubtitleTrack.parse(crlf)) == list(SubtitleTrack.parse(SRT))
+    vtt = SubtitleTrack.parse(SRT).to_vtt()
+    assert vtt.startswith("WEBVTT\n\n00:00:01.000 --> 00:00:02.500\n")
+    assert list(SubtitleTrack.parse(vtt)) == list(SubtitleTrack.parse(SRT))
+
+
+def test_with_texts_keeps_timing():
+    track = SubtitleTrack.parse(SRT)
+    translated = track.with_texts(["a", "b", "c"], "es")
+    assert list(translated.starts) == list(track.starts)
+    assert list(translated.ends) == list(track.ends)
+    assert translated.texts == ["a", "b", "c"]
+    assert translated.language == "es"
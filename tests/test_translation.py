@@ -0,0 +1,46 @@
+# tests/test_translation.py
+
+import pytest
+
+from utils.subtitles import SubtitleTrack
+from utils.translation import TranslationIncomplete, translate_track
+from utils.translation_engine import TranslationEngine
+
+
+class PickyTranslator:
+    """Tags texts with [es], except those containing "fail", which raise."""
+
+    def translate(self, text):
+        if "fail" in text:
+            raise ConnectionError("rejected")
+        return "\n".join(f"[es] {line}" for line in text.split("\n"))
+
+
+def make_track(texts):
+    track = SubtitleTrack("en")
+    for index, text in enumerate(texts):
+        track.append(index * 1000, index * 1000 + 900, text)
+    return track
+
+
+def engine():
+    return TranslationEngine(lambda: PickyTranslator(), concurrency=1, rate=0, max_retries=0, backoff=0)
+
+
+def test_failed_cues_keep_their_text():
+    translated = translate_track(make_track(["one", "fail here", "two"]), "es", use_memory=False, engine=engine())
+    assert translated.texts == ["[es] one", "fail here", "[es] two"]
+    assert translated.language == "es"
+
+
+def test_strict_raises_with_the_partial_track():
+    with pytest.raises(TranslationIncomplete) as raised:
+        translate_track(make_track(["one", "fail here", "two"]), "es", use_memory=False, engine=engine(),
+                        strict=True)
+    assert (raised.value.failures, raised.value.total) == (1, 3)
+    assert raised.value.track.texts == ["[es] one", "fail here", "[es] two"]
+
+
+def test_strict_passes_complete_translations():
+    translated = translate_track(make_track(["one", "", "two"]), "es", use_memory=False, engine=engine(), strict=True)
+    assert translated.texts == ["[es] one", "", "[es] two"]
@@ -0,0 +1,140 @@
+# tests/test_translation_engine.py
+
+import threading
+
+import pytest
+
+from benchmarks.fake_translator import FakeBackend
+from utils.translation_backends import BatchMismatchError, TranslationBackend, TranslatorBackend
+from utils.translation_engine import MAX_BATCH_CHARS, TranslationEngine, pack_batches
+from utils.translation_memory import TranslationMemory
+
+
+class RecordingBackend(TranslationBackend):
+    """Tags each text with the target language and records every batch it is sent."""
+
+    name = "recording"
+    max_chars = MAX_BATCH_CHARS
+    default_concurrency = 1
+    default_rate = None
+
+    def __init__(self, fail=None):
+        # fail(batch, attempt) returns an exception to raise, or None.
+        self.fail = fail
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def translate_batch(self, texts, source_language, target_language):
+        with self._lock:
+            self.batches.append(list(texts))
+            attempt = len(self.batches)
+        error = self.fail(texts, attempt) if self.fail is not None else None
+        if error is not None:
+            raise error
+        return [f"[{target_language}] {text}" for text in texts]
+
+
+def make_engine(backend, **options):
+    options.setdefault("backoff", 0)
+    return TranslationEngine(backend, target_language="es", **options)
+
+
+def test_pack_batches_stays_under_max_chars():
+    texts = [f"text {i:05}" for i in range(2000)]  # 10 characters each
+    batches = pack_batches(texts)
+    assert [text for batch in batches for text in batch] == texts
+    assert all(len("\n".join(batch)) <= MAX_BATCH_CHARS for batch in batches)
+    # Full batches are cut only when the next text would not fit.
+    assert len("\n".join(batches[0])) + 11 > MAX_BATCH_CHARS
+
+
+def test_pack_batches_splits_at_max_chars_exactly():
+    assert pack_batches(["aaaa", "bbbb", "cccc"], max_chars=9) == [["aaaa", "bbbb"], ["cccc"]]
+    assert pack_batches(["aaaa", "bbbb", "cccc"], max_chars=8) == [["aaaa"], ["bbbb"], ["cccc"]]
+
+
+def test_pack_batches_long_and_multiline_texts_go_alone():
+    long_text = "x" * (MAX_BATCH_CHARS + 1)
+    assert pack_batches(["a", long_text, "b"]) == [["a"], [long_text], ["b"]]
+    assert pack_batches(["a", "two\nlines", "b"]) == [["two\nlines"], ["a", "b"]]
+    assert pack_batches(["a", "two\nlines", "b"], lone_multiline=False) == [["a", "two\nlines", "b"]]
+
+
+def test_pack_batches_max_texts():
+    assert pack_batches(list("abcde"), max_texts=2) == [["a", "b"], ["c", "d"], ["e"]]
+
+
+def test_retries_a_failing_batch():
+    backend = RecordingBackend(fail=lambda texts, attempt: ConnectionError("down") if attempt <= 2 else None)
+    engine = make_engine(backend, max_retries=3)
+    assert engine.translate_many(["one", "two"]) == ["[es] one", "[es] two"]
+    assert engine.requests == 3
+    assert engine.retries == 2
+    assert engine.failures == 0
+
+
+def test_falls_back_to_one_text_per_request():
+    # Batches always fail, single texts succeed except "bad".
+    def fail(texts, attempt):
+        if len(texts) > 1 or texts == ["bad"]:
+            return ConnectionError("rejected")
+        return None
+
+    backend = RecordingBackend(fail=fail)
+    engine = make_engine(backend, max_retries=1)
+    assert engine.translate_many(["one", "bad", "two"]) == ["[es] one", None, "[es] two"]
+    # The batch and each text are tried twice, except the texts that succeed at once.
+    assert backend.batches.count(["one", "bad", "two"]) == 2
+    assert backend.batches.count(["bad"]) == 2
+    assert backend.batches.count(["one"]) == backend.batches.count(["two"]) == 1
+    assert engine.failures == 1
+
+
+def test_mismatched_batch_is_not_retried():
+    class DroppingTranslator:
+        def translate(self, text):
+            # Merges the lines of a batch, as online translators sometimes do.
+            return text.replace("\n", " ")
+
+    backend = TranslatorBackend(lambda source, target: DroppingTranslator(), name="dropping", default_rate=None)
+    engine = make_engine(backend, max_retries=3)
+    assert engine.translate_many(["one", "two"]) == ["one", "two"]
+    # One failed batch, then one request per text, without retrying the mismatch.
+    assert engine.requests == 3
+    assert engine.retries == 0
+    with pytest.raises(BatchMismatchError):
+        backend.translate_batch(["one", "two"], "auto", "es")
+
+
+def test_duplicates_are_translated_once():
+    backend = RecordingBackend()
+    engine = make_engine(backend)
+    texts = ["hello", "world", "hello", "", "  ", "hello", "world"]
+    assert engine.translate_many(texts) == ["[es] hello", "[es] world", "[es] hello", None, None,
+                                            "[es] hello", "[es] world"]
+    assert backend.batches == [["hello", "world"]]
+    assert engine.requests == 1
+
+
+def test_translation_memory_skips_known_texts():
+    memory = TranslationMemory(":memory:")
+    backend = RecordingBackend()
+    engine = make_engine(backend)
+    assert engine.translate_many(["a", "b"], memory=memory) == ["[es] a", "[es] b"]
+    assert engine.translate_many(["b", "c", "a"], memory=memory) == ["[es] b", "[es] c", "[es] a"]
+    assert backend.batches == [["a", "b"], ["c"]]
+    assert (memory.hits, memory.misses) == (2, 3)
+
+
+def test_fake_backend_failures_are_retried():
+    engine = make_engine(FakeBackend(failure_rate=0.3, seed=1), concurrency=2, max_retries=5)
+    texts = [f"sentence {i}" for i in range(200)]
+    assert engine.translate_many(texts) == [f"[es] {text}" for text in texts]
+    assert engine.retries > 0
+
+
+def test_engines_on_one_backend_share_the_rate_limiter():
+    backend = FakeBackend(rate=50)
+    first, second = make_engine(backend), make_engine(backend)
+    assert first.limiter is second.limiter
+    assert make_engine(backend, rate=50).limiter is not first.limiter
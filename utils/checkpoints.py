@@ -0,0 +1,160 @@
+# utils/checkpoints.py
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from utils import metrics
+
+DEFAULT_ROOT = os.path.join(os.path.expanduser("~"), ".global_classroom", "checkpoints")
+_HASH_CHUNK_BYTES = 1 << 20
+
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def file_digest(path):
+    """
+    Returns the SHA-256 of a file's content. Results are remembered for the
+    life of the process, keyed by path, size and modification time.
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        if memo_key in _digests:
+            return _digests[memo_key]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(block)
+    result = digest.hexdigest()
+    with _digests_lock:
+        _digests[memo_key] = result
+    return result
+
+
+class CheckpointStore:
+    """
+    Content-addressed store for the intermediate results of the video pipeline.
+
+    A checkpoint is identified by the stage name, the digest of the input file
+    and the parameters that affect the stage's output, so a changed input or
+    setting never reuses a stale result.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, stage, input_digest, params=None):
+        payload = json.dumps({"stage": stage, "input": input_digest, "params": params or {}}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, stage, input_digest, params=None, suffix=""):
+        key = self.key(stage, input_digest, params)
+        return os.path.join(self.root, key[:2], f"{key}{suffix}")
+
+    def get(self, stage, input_digest, params=None, suffix=""):
+        """Returns the path of a stored checkpoint, or None if there is none."""
+        path = self.path(stage, input_digest, params, suffix)
+        if os.path.exists(path):
+            metrics.count("cache_hits", cache="checkpoint", stage=stage)
+            return path
+        metrics.count("cache_misses", cache="checkpoint", stage=stage)
+        return None
+
+    def put(self, stage, input_digest, src_path, params=None, suffix="", move=False):
+        """
+        Stores a file as a checkpoint. The file is written under a temporary
+        name first, so an interrupted write is never mistaken for a result.
+
+        Args:
+            move (bool): Move src_path into the store instead of copying it.
+
+        Returns:
+            str: Path of the stored checkpoint.
+        """
+        path = self.path(stage, input_digest, params, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            if move:
+                shutil.move(src_path, temp_path)
+            else:
+                shutil.copyfile(src_path, temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        if not move and metrics.enabled():
+            # A moved file was counted by whatever wrote it.
+            metrics.count("bytes_written", os.path.getsize(path), kind="checkpoint")
+        return path
+
+    def remove(self, stage, input_digest, params=None, suffix=""):
+        """
+        Deletes a checkpoint that is no longer needed.
+
+        Returns:
+            bool: True if there was one and it is gone.
+        """
+        path = self.path(stage, input_digest, params, suffix)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            # On Windows a file still mapped by someone cannot be deleted yet.
+            print(f"Could not remove checkpoint '{path}': {e}")
+            return False
+        return True
+
+    def get_marker(self, stage, input_digest, params=None):
+        """Returns the dict saved with put_marker, or None."""
+        path = self.get(stage, input_digest, params, ".json")
+        if path is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put_marker(self, stage, input_digest, data, params=None):
+        """
+        Records a small JSON document for a stage whose result lives outside
+        the store, such as a final video written to the output folder.
+        """
+        path = self.path(stage, input_digest, params, ".json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+        return path
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_checkpoint_store():
+    """
+    Returns the process-wide checkpoint store. The location can be changed
+    with GLOBAL_CLASSROOM_CHECKPOINT_DIR. Returns None if it cannot be created.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            root = os.environ.get("GLOBAL_CLASSROOM_CHECKPOINT_DIR", DEFAULT_ROOT)
+            try:
+                _store = CheckpointStore(root)
+            except OSError as e:
+                print(f"Error opening checkpoint store '{root}': {e}")
+                metrics.error("checkpoints", e, file=root)
+                return None
+        return _store
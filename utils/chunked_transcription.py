@@ -0,0 +1,224 @@
+# utils/chunked_transcription.py
+
+import multiprocessing
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.ffmpeg_utils import SAMPLE_RATE
+
+# Target length of each chunk. The actual cut is moved to the quietest point
+# within SEARCH_SECONDS before the target, so words are not split.
+CHUNK_SECONDS = 10 * 60
+SEARCH_SECONDS = 30
+# Extra audio given to each chunk past its cut so the last words have context.
+OVERLAP_SECONDS = 2
+# Window used to measure loudness when looking for a silence.
+FRAME_SECONDS = 0.5
+# Rough memory of one worker, in MB: its own copy of the model plus the
+# working set of decoding a chunk. Every worker process loads the model
+# again, so the pool is kept to as many as fit in free memory.
+MODEL_MEMORY_MB = {"tiny": 700, "base": 1000, "small": 2000, "medium": 5000, "large": 10000, "turbo": 6000}
+
+
+def find_cut_points(audio, sample_rate=SAMPLE_RATE, chunk_seconds=CHUNK_SECONDS, search_seconds=SEARCH_SECONDS):
+    """
+    Picks where to split the audio: roughly every chunk_seconds, at the
+    quietest FRAME_SECONDS window found in the search_seconds before that.
+
+    Returns:
+        list: Sample offsets of the cuts, not including 0 and len(audio).
+    """
+    import numpy as np
+
+    frame = max(1, int(FRAME_SECONDS * sample_rate))
+    chunk = int(chunk_seconds * sample_rate)
+    search = int(search_seconds * sample_rate)
+    cuts = []
+    position = 0
+    while len(audio) - position > chunk + search:
+        window_start = position + chunk - search
+        window = np.asarray(audio[window_start:position + chunk], dtype=np.float32)
+        frames = len(window) // frame
+        if frames == 0:
+            cut = position + chunk
+        else:
+            energy = np.square(window[:frames * frame]).reshape(frames, frame).mean(axis=1)
+            quietest = int(np.argmin(energy))
+            cut = window_start + quietest * frame + frame // 2
+        cuts.append(cut)
+        position = cut
+    return cuts
+
+
+def _model_memory_mb(model_name):
+    name = os.path.basename(str(model_name)).lower()
+    for size, megabytes in MODEL_MEMORY_MB.items():
+        if name == size or name.startswith(size + "-") or name.startswith(size + "."):
+            return megabytes
+    # Unknown names (custom paths, distilled models) are assumed large.
+    return MODEL_MEMORY_MB["large"]
+
+
+def _available_memory_mb():
+    """Returns the free physical memory in MB, or None where the OS does not say."""
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_workers(model_name):
+    """
+    Returns how many worker processes to transcribe chunks with: half the
+    CPU cores, since each worker runs several threads of its own, but no
+    more than the copies of the model that fit in free memory.
+    """
+    workers = max(1, (os.cpu_count() or 2) // 2)
+    available = _available_memory_mb()
+    if available is not None:
+        workers = min(workers, max(1, available // _model_memory_mb(model_name)))
+    return workers
+
+
+def _init_worker(threads, loader=None):
+    if loader is not None:
+        # Spawned workers do not inherit a stand-in loader set in the parent.
+        from utils.model_cache import set_model_loader
+        set_model_loader(loader)
+    if threads:
+        try:
+            import torch
+        except ImportError:
+            # Engines without torch get their thread count from for_workers().
+            return
+        torch.set_num_threads(threads)
+
+
+def _transcribe_chunk(samples, offset, model_name, device, precision, language, engine):
+    from utils import metrics
+    from utils.model_cache import get_model
+
+    model = get_model(model_name, device=device, precision=precision, engine=engine)
+    options = engine.transcribe_options() if engine is not None else {}
+    # Runs in a worker process, which hands its totals over by flushing.
+    with metrics.span("transcribe_chunk", engine=getattr(engine, "name", None), model=model_name) as span:
+        result = model.transcribe(samples, fp16=(precision == "fp16"), language=language, **options)
+        span.set(offset=offset, audio_seconds=round(len(samples) / SAMPLE_RATE, 3))
+    metrics.flush()
+    segments = [
+        {"start": segment["start"] + offset, "end": segment["end"] + offset, "text": segment["text"]}
+        for segment in result["segments"]
+    ]
+    return segments, result.get("language")
+
+
+def stitch_segments(chunk_segments, bounds):
+    """
+    Merges the segments of overlapping chunks into one timeline.
+
+    Args:
+        chunk_segments (list): For each chunk, its segments with absolute times.
+        bounds (list): For each chunk, the (start, end) in seconds of the part
+                       it owns, i.e. without the overlap.
+
+    Returns:
+        list: Segments in time order. A segment is kept only by the chunk
+              that owns its midpoint, so speech in the overlap is not doubled.
+    """
+    merged = []
+    for segments, (own_start, own_end) in zip(chunk_segments, bounds):
+        for segment in segments:
+            middle = (segment["start"] + segment["end"]) / 2
+            if own_start <= middle < own_end:
+                merged.append(dict(segment))
+    merged.sort(key=lambda segment: segment["start"])
+    for previous, current in zip(merged, merged[1:]):
+        if previous["end"] > current["start"]:
+            previous["end"] = current["start"]
+        if previous["text"].strip() == current["text"].strip() and current["start"] - previous["end"] < OVERLAP_SECONDS:
+            current["text"] = ""
+    return [segment for segment in merged if segment["text"].strip()]
+
+
+def transcribe_chunked(audio, model_name="base", device="cpu", precision="fp32", workers=None,
+                       sample_rate=SAMPLE_RATE, chunk_seconds=CHUNK_SECONDS, overlap_seconds=OVERLAP_SECONDS,
+                       on_progress=None, language=None, engine=None):
+    """
+    Transcribes long audio by splitting it at silences into overlapping chunks
+    and running them in a process pool. Each worker process loads a model of
+    its own; with a single worker the chunks run in this process instead, on
+    the model cached by utils.model_cache.
+
+    Args:
+        audio (numpy.ndarray): 16 kHz mono float32 samples.
+        model_name (str): Whisper model name.
+        device (str): Device each worker loads the model on.
+        precision (str): 'fp16' or 'fp32'.
+        workers (int): Worker processes. Defaults to default_workers().
+        on_progress (callable): Called as on_progress(seconds_done,
+                                total_seconds) each time a chunk finishes.
+        language (str): Spoken language, if known. Otherwise each chunk
+                        detects it and the language of most of the audio
+                        wins.
+        engine (TranscriptionEngine): Engine each worker runs the model with.
+                                      Defaults to the default engine.
+
+    Returns:
+        dict: Like Whisper's result, 'segments' (dicts with 'start', 'end'
+              and 'text', in seconds) and 'language'.
+    """
+    cuts = find_cut_points(audio, sample_rate, chunk_seconds)
+    edges = [0] + cuts + [len(audio)]
+    overlap = int(overlap_seconds * sample_rate)
+    if workers is None:
+        workers = default_workers(model_name)
+    workers = min(workers, len(edges) - 1)
+    if engine is None:
+        from utils.transcription_engines import get_default_engine
+        engine = get_default_engine()
+
+    chunks = []
+    bounds = []
+    for start, end in zip(edges, edges[1:]):
+        chunk_start = max(0, start - overlap)
+        # Slices are views; a worker gets its copy only when it is ready for it.
+        chunks.append((audio[chunk_start:min(len(audio), end + overlap)], chunk_start / sample_rate))
+        bounds.append((start / sample_rate, end / sample_rate))
+    total_seconds = len(audio) / sample_rate
+
+    if workers <= 1:
+        chunk_results = []
+        for (samples, offset), (start, end) in zip(chunks, bounds):
+            chunk_results.append(_transcribe_chunk(samples, offset, model_name, device, precision, language,
+                                                   engine))
+            if on_progress is not None:
+                on_progress(end, total_seconds)
+        print(f"Transcribed {len(bounds)} chunks in this process.")
+    else:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        worker_engine = engine.for_workers(threads)
+        from utils.model_cache import get_model_loader
+        # Spawned, not forked: this runs beside the other pipeline stages, the
+        # GUI and torch's thread pools, and forking a threaded process can
+        # leave the children deadlocked on a lock held by another thread.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(threads, get_model_loader())) as pool:
+            futures = [pool.submit(_transcribe_chunk, samples, offset, model_name, device, precision, language,
+                                   worker_engine)
+                       for samples, offset in chunks]
+            chunk_seconds_by_future = {future: end - start for future, (start, end) in zip(futures, bounds)}
+            done_seconds = 0.0
+            for future in as_completed(futures):
+                done_seconds += chunk_seconds_by_future[future]
+                if on_progress is not None:
+                    on_progress(done_seconds, total_seconds)
+            chunk_results = [future.result() for future in futures]
+        print(f"Transcribed {len(bounds)} chunks with {workers} worker processes.")
+    if language is None:
+        seconds_by_language = Counter()
+        for (_, detected), (start, end) in zip(chunk_results, bounds):
+            if detected:
+                seconds_by_language[detected] += end - start
+        language = seconds_by_language.most_common(1)[0][0] if seconds_by_language else None
+    return {"segments": stitch_segments([segments for segments, _ in chunk_results], bounds), "language": language}
@@ -0,0 +1,237 @@
+# utils/docx_stream.py
+"""
+Low-memory translation of large Word documents.
+
+python-docx loads the whole package, images included, into memory. Here the
+.docx is rewritten zip member by zip member instead: word/document.xml and the
+header and footer parts are streamed through a SAX parser and only the text
+inside w:t elements is replaced (tabs and line breaks stay where they are), while every other part (images, styles,
+fonts, ...) is copied through unchanged. Paragraphs are buffered only until a
+batch is full, so memory use stays bounded whatever the document size.
+"""
+
+import os
+import re
+import shutil
+import xml.sax
+import zipfile
+from xml.sax.saxutils import XMLGenerator
+
+from utils.docx_text import SEPARATORS, distribute_fragments
+
+W_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+# Parts whose text is translated; everything else is copied as is.
+TEXT_PARTS = re.compile(r"^word/(document|header\d*|footer\d*)\.xml$")
+DEFAULT_BATCH_PARAGRAPHS = 500
+_XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+_COPY_BUFFER_BYTES = 1 << 20
+
+
+class _CountingReader:
+    """File wrapper that counts the bytes read through it."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.count = 0
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.count += len(data)
+        return data
+
+    def close(self):
+        # The parser closes its source when done; the owner closes raw.
+        pass
+
+
+class _ParagraphRewriter(xml.sax.handler.ContentHandler):
+    """
+    Passes SAX events through to an XMLGenerator, holding back the events from
+    the first paragraph of a batch until the batch is complete. The text of
+    each held paragraph is then translated as a whole and spread back over its
+    w:t elements. Tabs and line breaks inside runs are read as "\t" and "\n",
+    like python-docx does, and kept as separators; see _apply_translation().
+
+    Names are handled with their prefixes as written (namespace processing is
+    off), so the output keeps the original prefixes and declarations.
+    """
+
+    def __init__(self, out, translate, batch_paragraphs=DEFAULT_BATCH_PARAGRAPHS, on_flush=None):
+        super().__init__()
+        self.out = out
+        self.translate = translate
+        self.batch_paragraphs = batch_paragraphs
+        self.on_flush = on_flush
+        self.prefix = "w:"
+        self.root = True
+        self.events = []
+        self.open_paragraphs = []  # stack of lists of text records
+        self.paragraphs = []       # finished paragraphs waiting in the batch
+        self.text = None           # [start_event, text] of the w:t being read
+        self.runs = 0              # depth of w:r elements open in the paragraph
+
+    def _emit(self, event):
+        if self.events or self.open_paragraphs:
+            self.events.append(event)
+        else:
+            self._write(event)
+
+    def _write(self, event):
+        kind = event[0]
+        if kind == "start":
+            self.out.startElement(event[1], event[2])
+        elif kind == "end":
+            self.out.endElement(event[1])
+        elif kind == "chars":
+            self.out.characters(event[1])
+        elif kind == "text":
+            self.out.characters(event[1][1])
+        elif kind == "pi":
+            self.out.processingInstruction(event[1], event[2])
+
+    def startElement(self, name, attrs):
+        attrs = dict(attrs)
+        if self.root:
+            # Word always writes "w", but the prefix is whatever the root declares.
+            self.root = False
+            for key, value in attrs.items():
+                if key.startswith("xmlns:") and value == W_NAMESPACE:
+                    self.prefix = key[len("xmlns:"):] + ":"
+        event = ["start", name, attrs]
+        if name == self.prefix + "p":
+            self.open_paragraphs.append([])
+        elif name == self.prefix + "r" and self.open_paragraphs:
+            self.runs += 1
+        elif name == self.prefix + "t" and self.open_paragraphs:
+            self.text = [event, ""]
+        elif self.runs and name.startswith(self.prefix) and name[len(self.prefix):] in SEPARATORS:
+            # A w:tab directly in w:tabs is a tab stop, not text; only run content counts.
+            if attrs.get(self.prefix + "type", "textWrapping") == "textWrapping":
+                self.open_paragraphs[-1].append([None, SEPARATORS[name[len(self.prefix):]]])
+        self._emit(event)
+
+    def characters(self, content):
+        if self.text is not None:
+            self.text[1] += content
+        else:
+            self._emit(["chars", content])
+
+    def ignorableWhitespace(self, whitespace):
+        self.characters(whitespace)
+
+    def processingInstruction(self, target, data):
+        self._emit(["pi", target, data])
+
+    def endElement(self, name):
+        if name == self.prefix + "t" and self.text is not None:
+            self.open_paragraphs[-1].append(self.text)
+            self.events.append(["text", self.text])
+            self.text = None
+        elif name == self.prefix + "r" and self.runs:
+            self.runs -= 1
+        self._emit(["end", name])
+        if name == self.prefix + "p" and self.open_paragraphs:
+            self.paragraphs.append(self.open_paragraphs.pop())
+            if not self.open_paragraphs and len(self.paragraphs) >= self.batch_paragraphs:
+                self.flush()
+
+    def endDocument(self):
+        self.flush()
+        self.out.endDocument()
+
+    def flush(self):
+        work = []
+        for texts in self.paragraphs:
+            text = "".join(t[1] for t in texts).strip()
+            if text:
+                work.append((texts, text))
+        translations = self.translate([text for _, text in work]) if work else []
+        for (texts, text), translated_text in zip(work, translations):
+            if translated_text is None:
+                print(f"Error translating paragraph '{text}': keeping original text")
+                continue
+            _apply_translation(texts, translated_text)
+        for event in self.events:
+            self._write(event)
+        self.events = []
+        self.paragraphs = []
+        if self.on_flush is not None:
+            self.on_flush()
+
+
+def _set_texts(records, pieces):
+    for record, piece in zip(records, pieces):
+        record[1] = piece
+        if piece != piece.strip():
+            record[0][2]["xml:space"] = "preserve"
+
+
+def _apply_translation(records, translated_text):
+    """
+    Spreads the translation of a paragraph over its w:t records. Tabs and
+    breaks are elements of their own, recorded as [None, "\t"] or
+    [None, "\n"], and stay where they are; see distribute_fragments().
+    """
+    pieces = distribute_fragments([(record[1], record[0] is not None) for record in records], translated_text)
+    _set_texts([record for record in records if record[0] is not None], pieces)
+
+
+def _rewrite_part(src, dst, translate, batch_paragraphs, on_flush):
+    dst.write(_XML_DECLARATION)
+    out = XMLGenerator(dst, encoding="utf-8", short_empty_elements=True)
+    parser = xml.sax.make_parser()
+    parser.setFeature(xml.sax.handler.feature_namespaces, False)
+    parser.setFeature(xml.sax.handler.feature_external_ges, False)
+    parser.setContentHandler(_ParagraphRewriter(out, translate, batch_paragraphs, on_flush))
+    parser.parse(src)
+
+
+def translate_docx_streaming(src_path, dst_path, translate, batch_paragraphs=DEFAULT_BATCH_PARAGRAPHS,
+                             on_progress=None):
+    """
+    Writes a translated copy of a .docx without loading it into memory.
+
+    Args:
+        src_path (str): Input .docx.
+        dst_path (str): Output .docx. Written under a temporary name and
+                        renamed when complete.
+        translate (callable): Takes a list of paragraph texts and returns their
+                              translations in order, None for a failure.
+        batch_paragraphs (int): Paragraphs held back before calling translate.
+        on_progress (callable): Called as on_progress(done, total) with the
+                                uncompressed bytes of text parts read so far.
+    """
+    partial_path = f"{dst_path}.partial"
+    try:
+        with zipfile.ZipFile(src_path) as src_zip, \
+                zipfile.ZipFile(partial_path, "w", zipfile.ZIP_DEFLATED) as dst_zip:
+            members = src_zip.infolist()
+            total = sum(info.file_size for info in members if TEXT_PARTS.match(info.filename))
+            done = 0
+            for info in members:
+                target = zipfile.ZipInfo(info.filename, info.date_time)
+                target.external_attr = info.external_attr
+                if not TEXT_PARTS.match(info.filename):
+                    target.compress_type = info.compress_type
+                    target.file_size = info.file_size
+                    with src_zip.open(info) as src, dst_zip.open(target, "w") as dst:
+                        shutil.copyfileobj(src, dst, _COPY_BUFFER_BYTES)
+                    continue
+                target.compress_type = zipfile.ZIP_DEFLATED
+                with src_zip.open(info) as raw, dst_zip.open(target, "w", force_zip64=True) as dst:
+                    src = _CountingReader(raw)
+
+                    def report(base=done, src=src):
+                        if on_progress is not None:
+                            on_progress(base + src.count, total)
+
+                    _rewrite_part(src, dst, translate, batch_paragraphs, report)
+                done += info.file_size
+        os.replace(partial_path, dst_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    if on_progress is not None:
+        on_progress(total, total)
+    return dst_path
@@ -0,0 +1,230 @@
+# utils/docx_text.py
+"""
+Helpers for translating Word documents a paragraph at a time.
+
+Word splits a sentence into many runs: one per change of formatting, and
+often more where spell-check or revision tracking left marks. Translating
+runs one by one costs a request per fragment and loses the sentence context,
+so instead the text of each paragraph is translated as a whole and then laid
+back over its runs, keeping every run and its formatting.
+"""
+
+import re
+
+_WHITESPACE = re.compile(r"\s")
+_SEPARATOR = re.compile(r"[\t\n]")
+# Run content read as text, as python-docx's run.text reads it, besides w:t.
+# Page and column breaks (w:br with another w:type) read as nothing.
+SEPARATORS = {"tab": "\t", "ptab": "\t", "br": "\n", "cr": "\n"}
+
+
+def _qn(tag):
+    from docx.oxml.ns import qn
+    return qn(tag)
+
+
+def iter_paragraphs(document):
+    """
+    Yields every paragraph of a document once: the body, tables and the tables
+    nested in their cells, and the headers and footers of each section.
+    Headers and footers linked to the previous section are not visited again.
+    """
+    # Holds the elements themselves: lxml hands out the same proxy for an
+    # element only while one is alive, so ids alone could be reused.
+    seen = set()
+
+    def visit(paragraphs):
+        for paragraph in paragraphs:
+            if paragraph._p not in seen:
+                seen.add(paragraph._p)
+                yield paragraph
+
+    def visit_tables(tables):
+        for table in tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    # Merged cells are returned once per grid position.
+                    if cell._tc in seen:
+                        continue
+                    seen.add(cell._tc)
+                    yield from visit(cell.paragraphs)
+                    yield from visit_tables(cell.tables)
+
+    yield from visit(document.paragraphs)
+    yield from visit_tables(document.tables)
+    for section in document.sections:
+        for part in (section.header, section.first_page_header, section.even_page_header,
+                     section.footer, section.first_page_footer, section.even_page_footer):
+            # Reading a linked header through python-docx would unlink it.
+            if part.is_linked_to_previous:
+                continue
+            yield from visit(part.paragraphs)
+            yield from visit_tables(part.tables)
+
+
+def text_runs(paragraph):
+    """
+    Returns the runs of a paragraph that carry text, including the runs
+    inside hyperlinks, in document order.
+    """
+    from docx.text.run import Run
+    elements = paragraph._p.xpath("./w:r | ./w:hyperlink/w:r | ./w:smartTag/w:r")
+    return [run for run in (Run(r, paragraph) for r in elements) if run.text]
+
+
+def _is_plain(r):
+    """True if a w:r holds nothing but formatting and text."""
+    return all(child.tag in (_qn("w:rPr"), _qn("w:t")) for child in r)
+
+
+def _formatting(r):
+    from lxml import etree
+    return etree.tostring(r.rPr) if r.rPr is not None else b""
+
+
+def merge_runs(paragraph):
+    """
+    Joins neighbouring plain-text runs that have the same formatting, such as
+    the pieces spell-check leaves behind. Returns the remaining text runs.
+    """
+    runs = text_runs(paragraph)
+    merged = []
+    for run in runs:
+        previous = merged[-1] if merged else None
+        if (previous is not None and previous._r.getnext() is run._r
+                and _is_plain(previous._r) and _is_plain(run._r)
+                and _formatting(previous._r) == _formatting(run._r)):
+            previous.text = previous.text + run.text
+            run._r.getparent().remove(run._r)
+            continue
+        merged.append(run)
+    return merged
+
+
+def split_text(text, lengths):
+    """
+    Cuts text into len(lengths) pieces in proportion to lengths, moving each
+    cut to the nearest whitespace so words are not broken where possible.
+    """
+    total = sum(lengths)
+    if len(lengths) == 1 or not text:
+        return [text] + [""] * (len(lengths) - 1)
+    cuts = []
+    consumed = 0
+    previous = 0
+    for length in lengths[:-1]:
+        consumed += length
+        target = round(len(text) * consumed / total) if total else previous
+        cut = _nearest_space(text, max(previous, target), previous)
+        cuts.append(cut)
+        previous = cut
+    bounds = [0] + cuts + [len(text)]
+    return [text[bounds[i]:bounds[i + 1]] for i in range(len(lengths))]
+
+
+def _nearest_space(text, target, lower):
+    """Returns the position of the whitespace closest to target, not below lower."""
+    best = None
+    for match in _WHITESPACE.finditer(text, lower):
+        # Cut after the space so it stays with the preceding word.
+        position = match.end()
+        if best is None or abs(position - target) < abs(best - target):
+            best = position
+        elif position > target:
+            break
+    # Scripts without spaces between words are cut at the proportional point.
+    return best if best is not None and abs(best - target) <= max(8, len(text) // 10) else target
+
+
+def distribute(texts, translated_text):
+    """
+    Splits the translation of a paragraph into one piece per original text
+    fragment, each in proportion to its fragment's share of the original.
+    Whitespace around the original paragraph text is kept.
+    """
+    original = "".join(texts)
+    leading = original[:len(original) - len(original.lstrip())]
+    trailing = original[len(original.rstrip()):]
+    pieces = split_text(translated_text, [len(text) for text in texts])
+    pieces[0] = leading + pieces[0]
+    pieces[-1] = pieces[-1] + trailing
+    return pieces
+
+
+def distribute_fragments(fragments, translated_text):
+    """
+    Like distribute(), for a paragraph that also holds tabs and line breaks.
+
+    Args:
+        fragments (list): (text, editable) pairs in document order: the text
+                          of each w:t, editable, and "\t" or "\n" for each
+                          tab or break, which stays where it is.
+        translated_text (str): Translation of the paragraph's whole text.
+
+    Returns:
+        list: The new text of each editable fragment, in order. When the
+              translation keeps every tab and break, the text between two of
+              them goes to the fragments between the same two, so the tab in
+              "Name:\tValue" still follows "Name:". Otherwise the translation
+              is spread over the editable fragments as a whole.
+    """
+    original = "".join(text for text, _ in fragments)
+    leading = original[:len(original) - len(original.lstrip())]
+    trailing = original[len(original.rstrip()):]
+    full = leading + translated_text.strip() + trailing
+    separators = [text for text, editable in fragments if not editable]
+    if separators and _SEPARATOR.findall(full) == separators:
+        groups = [[]]
+        for text, editable in fragments:
+            if editable:
+                groups[-1].append(text)
+            else:
+                groups.append([])
+        segments = _SEPARATOR.split(full)
+        if all(group or not segment.strip() for group, segment in zip(groups, segments)):
+            return [piece for group, segment in zip(groups, segments) if group
+                    for piece in distribute(group, segment.strip())]
+    texts = [text for text, editable in fragments if editable]
+    return distribute(texts, _SEPARATOR.sub(" ", translated_text)) if texts else []
+
+
+def text_fragments(runs):
+    """
+    Returns (w:t element or None, text) for the text-bearing children of
+    runs in document order: w:t elements with their text, and tabs and line
+    breaks as None with "\t" or "\n". Drawings, field characters, symbols,
+    footnote references and the like are not text and are left out.
+    """
+    t, br, br_type = _qn("w:t"), _qn("w:br"), _qn("w:type")
+    separators = {_qn(f"w:{name}"): text for name, text in SEPARATORS.items()}
+    fragments = []
+    for run in runs:
+        for child in run._r:
+            if child.tag == t:
+                fragments.append((child, child.text or ""))
+            elif child.tag in separators:
+                if child.tag == br and child.get(br_type, "textWrapping") != "textWrapping":
+                    continue
+                fragments.append((None, separators[child.tag]))
+    return fragments
+
+
+def paragraph_text(runs):
+    """Returns the text of runs as text_fragments() reads it."""
+    return "".join(text for _, text in text_fragments(runs))
+
+
+def apply_translation(runs, translated_text):
+    """
+    Writes the translation of a paragraph over the w:t elements of its runs,
+    so bold, italic and other run formatting stay in roughly the same place.
+    Everything else in the runs (tabs, breaks, drawings, fields, footnote
+    references) is left untouched.
+    """
+    fragments = text_fragments(runs)
+    elements = [element for element, _ in fragments if element is not None]
+    pieces = distribute_fragments([(text, element is not None) for element, text in fragments], translated_text)
+    for element, piece in zip(elements, pieces):
+        element.text = piece
+        if piece != piece.strip():
+            element.set(_qn("xml:space"), "preserve")
@@ -1,25 +1,433 @@
 # utils/ffmpeg_utils.py
 import os
+import re
+import shlex
 import subprocess
+import tempfile
+from utils import metrics
 
-def burn_subtitles(video_path, srt_path, output_path, font_path=None):
+# Whisper works on 16 kHz mono audio.
+SAMPLE_RATE = 16000
+# Decoded audio larger than this is spilled to a memory-mapped file instead of
+# being kept in RAM (about one hour of 16 kHz float32 audio).
+MEMMAP_THRESHOLD_BYTES = 16000 * 4 * 3600
+_READ_CHUNK_BYTES = 1 << 20
+# Keys of ffmpeg's -progress output, told apart from log lines on stderr.
+_PROGRESS_KEY = re.compile(r"[a-z0-9_]+")
+
+# Environment variables that replace the ffmpeg and ffprobe commands with
+# another command line, e.g. a build outside PATH or the stand-in used by the
+# benchmarks ("python benchmarks/fake_ffmpeg.py").
+FFMPEG_ENV = "GLOBAL_CLASSROOM_FFMPEG"
+FFPROBE_ENV = "GLOBAL_CLASSROOM_FFPROBE"
+
+def tool_command(name="ffmpeg"):
+    """Returns the command line prefix for running 'ffmpeg' or 'ffprobe'."""
+    value = os.environ.get(FFPROBE_ENV if name == "ffprobe" else FFMPEG_ENV)
+    return shlex.split(value, posix=os.name != "nt") if value else [name]
+
+def load_audio(video_path, sample_rate=SAMPLE_RATE, scratch_dir=None, memmap_threshold=MEMMAP_THRESHOLD_BYTES,
+               on_progress=None):
+    """
+    Decodes the audio track of a video straight into a float32 NumPy array,
+    with ffmpeg writing 16-bit mono PCM to a pipe. Nothing is written to disk
+    unless the audio is longer than memmap_threshold, in which case the samples
+    are streamed into a memory-mapped file in scratch_dir.
+
+    Args:
+        video_path (str): Path to the input video.
+        sample_rate (int): Output sample rate (default is 16000).
+        scratch_dir (str): Directory for the memory-mapped file. Defaults to the
+                           directory of the video. The caller removes the file
+                           (name ends in '.f32') once the array is released.
+        memmap_threshold (int): Size in bytes of float32 samples above which
+                                the samples are memory-mapped.
+        on_progress (callable): Called with each ffmpeg progress block (a dict
+                                with keys such as 'out_time_us') as the audio
+                                is decoded.
+
+    Returns:
+        numpy.ndarray: Samples in [-1, 1).
+    """
+    with metrics.span("audio_extract", file=video_path) as span:
+        audio = _decode_audio(video_path, sample_rate, scratch_dir, memmap_threshold, on_progress)
+        span.set(audio_seconds=round(len(audio) / sample_rate, 3), memmap=hasattr(audio, "filename"))
+    # ffmpeg hands over 16-bit samples; spilled ones are stored as 32-bit floats.
+    metrics.count("bytes_read", len(audio) * 2, kind="audio")
+    if hasattr(audio, "filename"):
+        metrics.count("bytes_written", len(audio) * 4, kind="audio")
+    return audio
+
+def _decode_audio(video_path, sample_rate, scratch_dir, memmap_threshold, on_progress=None):
+    import threading
+    from collections import deque
+    import numpy as np
+
+    # stdout carries the samples, so progress blocks come on stderr.
+    progress_args = ["-nostats", "-progress", "pipe:2"] if on_progress is not None else []
+    command = [
+        *tool_command("ffmpeg"), "-nostdin", *progress_args, "-i", video_path, "-vn", "-map", "a:0",
+        "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-acodec", "pcm_s16le", "-loglevel", "error", "pipe:1",
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # Drain stderr while reading stdout; warnings about a damaged input can
+    # fill the pipe and stall ffmpeg, and with it this loop.
+    stderr_tail = deque(maxlen=_STDERR_TAIL_LINES)
+
+    def drain_stderr():
+        block = {}
+        for line in process.stderr:
+            if on_progress is not None:
+                key, sep, value = line.decode(errors="replace").strip().partition("=")
+                if sep and _PROGRESS_KEY.fullmatch(key):
+                    block[key] = value
+                    if key == "progress":
+                        on_progress(block)
+                        block = {}
+                    continue
+            stderr_tail.append(line)
+
+    reader = threading.Thread(target=drain_stderr, daemon=True)
+    reader.start()
+    chunks = []
+    in_memory_bytes = 0
+    spill = None
+    leftover = b""
+    try:
+        while True:
+            data = process.stdout.read(_READ_CHUNK_BYTES)
+            if not data:
+                break
+            data = leftover + data
+            # Keep an odd trailing byte for the next read so samples stay aligned.
+            usable = len(data) - (len(data) % 2)
+            data, leftover = data[:usable], data[usable:]
+            samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+            if spill is None:
+                chunks.append(samples)
+                in_memory_bytes += samples.nbytes
+                if in_memory_bytes > memmap_threshold:
+                    spill = tempfile.NamedTemporaryFile(
+                        dir=scratch_dir or os.path.dirname(os.path.abspath(video_path)), suffix=".f32", delete=False
+                    )
+                    for chunk in chunks:
+                        spill.write(chunk.tobytes())
+                    chunks = []
+            else:
+                spill.write(samples.tobytes())
+        process.wait()
+    except BaseException:
+        process.kill()
+        process.wait()
+        if spill is not None:
+            spill.close()
+            os.remove(spill.name)
+        raise
+    finally:
+        reader.join()
+        process.stdout.close()
+        process.stderr.close()
+    stderr = b"".join(stderr_tail)
+
+    if process.returncode != 0:
+        if spill is not None:
+            spill.close()
+            os.remove(spill.name)
+        raise RuntimeError(f"Failed to load audio from '{video_path}': {stderr.decode(errors='replace').strip()}")
+
+    if spill is None:
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+    spill.close()
+    return map_audio(spill.name)
+
+def map_audio(path):
+    """
+    Memory-maps a file of raw float32 samples, as written by load_audio.
+    Copy-on-write, so consumers that expect a writable array still work.
+    """
+    import numpy as np
+    return np.memmap(path, dtype=np.float32, mode="c")
+
+def probe_duration(path):
+    """Returns the duration of a media file in seconds, or None if ffprobe cannot tell."""
+    command = tool_command('ffprobe') + ['-v', 'error', '-show_entries', 'format=duration',
+               '-of', 'default=noprint_wrappers=1:nokey=1', path]
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        return float(result.stdout.strip())
+    except (OSError, ValueError):
+        return None
+
+def progress_seconds(block):
+    """Returns the output position in seconds from an ffmpeg progress block, or None."""
+    # Despite the name, ffmpeg reports out_time_ms in microseconds as well.
+    for key in ('out_time_us', 'out_time_ms'):
+        value = block.get(key, '')
+        if value.isdigit():
+            return int(value) / 1000000
+    return None
+
+# Named encoder settings for burning subtitles. "default" matches plain
+# ffmpeg/libx264 behaviour. crf is translated to the matching quality option
+# when a hardware encoder is used; max_height downscales taller videos.
+ENCODER_PROFILES = {
+    "default": {
+        "video_codec": "libx264", "preset": None, "crf": None, "threads": None,
+        "max_height": None, "audio_codec": "copy", "audio_bitrate": None, "hardware": False,
+    },
+    "fast-draft": {
+        "video_codec": "libx264", "preset": "veryfast", "crf": 28, "threads": None,
+        "max_height": None, "audio_codec": "copy", "audio_bitrate": None, "hardware": True,
+    },
+    "archive": {
+        "video_codec": "libx264", "preset": "slow", "crf": 18, "threads": None,
+        "max_height": None, "audio_codec": "copy", "audio_bitrate": None, "hardware": False,
+    },
+    "low-bandwidth": {
+        "video_codec": "libx264", "preset": "medium", "crf": 30, "threads": None,
+        "max_height": 480, "audio_codec": "aac", "audio_bitrate": "64k", "hardware": False,
+    },
+}
+
+# Hardware H.264 encoders in order of preference, with how each takes a
+# constant-quality value.
+_HARDWARE_ENCODERS = (
+    ("h264_nvenc", "-cq"),
+    ("h264_qsv", "-global_quality"),
+    ("h264_amf", "-qp_i"),
+    ("h264_videotoolbox", None),
+)
+
+# Keep only the end of ffmpeg's log for error messages.
+_STDERR_TAIL_LINES = 40
+
+_encoders = None
+
+def available_encoders():
+    """Returns the set of encoder names the local ffmpeg build supports."""
+    global _encoders
+    if _encoders is None:
+        try:
+            result = subprocess.run(tool_command('ffmpeg') + ['-hide_banner', '-encoders'],
+                                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            names = set()
+            for line in result.stdout.splitlines():
+                parts = line.split()
+                # Encoder lines look like " V....D libx264  description".
+                if len(parts) >= 2 and len(parts[0]) == 6 and parts[0][0] in "VAS":
+                    names.add(parts[1])
+            _encoders = names
+        except OSError:
+            _encoders = set()
+    return _encoders
+
+def get_encoder_profile(profile=None, **overrides):
+    """
+    Returns a copy of a named encoder profile with overrides applied.
+
+    Args:
+        profile (str or dict): Profile name from ENCODER_PROFILES, a profile
+                               dict, or None for "default".
+        **overrides: Profile keys to replace, e.g. threads=4.
+    """
+    if profile is None:
+        profile = "default"
+    if isinstance(profile, str):
+        if profile not in ENCODER_PROFILES:
+            raise ValueError(f"Unknown encoder profile '{profile}', expected one of {sorted(ENCODER_PROFILES)}")
+        profile = ENCODER_PROFILES[profile]
+    settings = dict(ENCODER_PROFILES["default"], **profile)
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    return settings
+
+def _hardware_encoder_args(settings):
+    """Returns encoder arguments for the preferred available hardware encoder, or None."""
+    encoders = available_encoders()
+    for name, quality_option in _HARDWARE_ENCODERS:
+        if name in encoders:
+            args = ['-c:v', name]
+            if quality_option and settings["crf"] is not None:
+                args += [quality_option, str(settings["crf"])]
+            return args
+    return None
+
+def _software_encoder_args(settings):
+    args = ['-c:v', settings["video_codec"]]
+    if settings["preset"]:
+        args += ['-preset', settings["preset"]]
+    if settings["crf"] is not None:
+        args += ['-crf', str(settings["crf"])]
+    if settings["threads"]:
+        args += ['-threads', str(settings["threads"])]
+    return args
+
+def _run_with_progress(command, on_progress=None):
+    """
+    Runs ffmpeg with '-progress pipe:1' and hands each progress block to
+    on_progress as a dict as soon as it arrives. stderr is drained on a
+    separate thread and only its last lines are kept.
+
+    Returns:
+        tuple: (return code, tail of stderr as a string)
+    """
+    import threading
+    from collections import deque
+
+    # ffmpeg writes UTF-8 whatever the locale; file names in its log would
+    # otherwise fail to decode on Windows and stop the stderr drain.
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               stdin=subprocess.DEVNULL, text=True, encoding="utf-8", errors="replace",
+                               bufsize=1)
+    stderr_tail = deque(maxlen=_STDERR_TAIL_LINES)
+
+    def drain_stderr():
+        for line in process.stderr:
+            stderr_tail.append(line)
+
+    reader = threading.Thread(target=drain_stderr, daemon=True)
+    reader.start()
+    block = {}
+    for line in process.stdout:
+        key, sep, value = line.strip().partition('=')
+        if not sep:
+            continue
+        block[key] = value
+        # Every block of progress values ends with a "progress" line.
+        if key == 'progress':
+            if on_progress is not None:
+                on_progress(block)
+            block = {}
+    process.wait()
+    reader.join()
+    process.stdout.close()
+    process.stderr.close()
+    return process.returncode, "".join(stderr_tail)
+
+def burn_subtitles(video_path, srt_path, output_path, font_path=None, profile=None, threads=None, on_progress=None):
+    """
+    Draws subtitles into a video, re-encoding it.
+
+    Args:
+        video_path (str): Path to the input video.
+        srt_path (str): Path to the subtitles.
+        output_path (str): Path of the output video.
+        font_path (str): Font file to render the subtitles with.
+        profile (str or dict): Encoder profile, see ENCODER_PROFILES.
+        threads (int): Encoder threads, overriding the profile.
+        on_progress (callable): Called with each ffmpeg progress block (a dict
+                                with keys such as 'out_time_us' and 'speed').
+
+    Returns:
+        bool: True if ffmpeg succeeded.
+    """
     def escape_path(path):
         return path.replace('\\', '/').replace(':', '\\:').replace("'", "\\'")
 
-    video_path_escaped = escape_path(video_path)
+    settings = get_encoder_profile(profile, threads=threads)
     srt_path_escaped = escape_path(srt_path)
-    output_path_escaped = escape_path(output_path)
 
     if font_path:
         font_path_escaped = escape_path(font_path)
         subtitles_filter = f"subtitles='{srt_path_escaped}':force_style='FontFile={font_path_escaped}'"
     else:
         subtitles_filter = f"subtitles='{srt_path_escaped}'"
+    if settings["max_height"]:
+        # Scale first so the subtitles are rendered at the output resolution.
+        subtitles_filter = f"scale=-2:'min({settings['max_height']},ih)',{subtitles_filter}"
 
-    command = ['ffmpeg', '-i', video_path, '-vf', subtitles_filter, '-c:a', 'copy', '-y', output_path]
-    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    audio_args = ['-c:a', settings["audio_codec"]]
+    if settings["audio_bitrate"]:
+        audio_args += ['-b:a', settings["audio_bitrate"]]
 
-    if result.returncode != 0:
-        print(f"Error burning subtitles into '{video_path}': {result.stderr}")
-    else:
-        print(f"Created video with subtitles: '{output_path}'")
+    encoder_args = [_software_encoder_args(settings)]
+    hardware_args = _hardware_encoder_args(settings) if settings["hardware"] else None
+    if hardware_args:
+        # The build may list a hardware encoder the machine cannot use, so
+        # keep the software encoder as a fallback.
+        encoder_args.insert(0, hardware_args)
+    for attempt, video_args in enumerate(encoder_args):
+        if attempt:
+            print(f"Hardware encoding failed for '{video_path}', retrying with {settings['video_codec']}.")
+        command = (tool_command('ffmpeg') + ['-nostats', '-progress', 'pipe:1', '-i', video_path,
+                                             '-vf', subtitles_filter]
+                   + video_args + audio_args + ['-y', output_path])
+        with metrics.span("burn", file=output_path, encoder=video_args[1]) as span:
+            returncode, stderr = _run_with_progress(command, on_progress)
+            span.set(returncode=returncode)
+        if returncode == 0:
+            break
+
+    if returncode != 0:
+        print(f"Error burning subtitles into '{video_path}': {stderr}")
+        metrics.error("burn", stderr.strip(), file=video_path)
+        return False
+    _count_output(output_path)
+    print(f"Created video with subtitles: '{output_path}'")
+    return True
+
+def _count_output(path):
+    if metrics.enabled():
+        metrics.count("bytes_written", os.path.getsize(path), kind="video")
+
+# Subtitle codec each container can carry as a selectable track.
+SUBTITLE_CODECS = {
+    ".mp4": "mov_text",
+    ".m4v": "mov_text",
+    ".mov": "mov_text",
+    ".mkv": "srt",
+    ".webm": "webvtt",
+}
+
+def mux_output_extension(video_path):
+    """
+    Returns the container extension to mux subtitles into: the input's own
+    when it supports subtitle tracks, otherwise '.mkv'.
+    """
+    ext = os.path.splitext(video_path)[1].lower()
+    return ext if ext in SUBTITLE_CODECS else ".mkv"
+
+def mux_subtitles(video_path, subtitle_tracks, output_path, subtitle_codec=None, on_progress=None):
+    """
+    Adds subtitles to a video as selectable tracks without re-encoding: the
+    video and audio streams are copied as they are, so this takes seconds
+    rather than a full encode.
+
+    Args:
+        video_path (str): Path to the input video.
+        subtitle_tracks (list): (subtitle_path, language_code) pairs, one
+                                track per language.
+        output_path (str): Path of the output video. Its extension picks the
+                           container.
+        subtitle_codec (str): 'mov_text', 'srt' or 'webvtt'. Defaults to what
+                              the output container supports.
+        on_progress (callable): Called with each ffmpeg progress block.
+
+    Returns:
+        bool: True if ffmpeg succeeded.
+    """
+    if subtitle_codec is None:
+        subtitle_codec = SUBTITLE_CODECS.get(os.path.splitext(output_path)[1].lower(), "srt")
+
+    command = tool_command('ffmpeg') + ['-i', video_path]
+    for subtitle_path, _ in subtitle_tracks:
+        command += ['-i', subtitle_path]
+    command += ['-map', '0:v', '-map', '0:a?']
+    for index in range(len(subtitle_tracks)):
+        command += ['-map', f'{index + 1}:0']
+    command += ['-c', 'copy', '-c:s', subtitle_codec]
+    for index, (_, language) in enumerate(subtitle_tracks):
+        # The title shows up in player menus even where the container only
+        # accepts three-letter language tags.
+        command += [f'-metadata:s:s:{index}', f'language={language}', f'-metadata:s:s:{index}', f'title={language}']
+    command += ['-nostats', '-progress', 'pipe:1', '-y', output_path]
+    with metrics.span("mux", file=output_path, codec=subtitle_codec) as span:
+        returncode, stderr = _run_with_progress(command, on_progress)
+        span.set(tracks=len(subtitle_tracks), returncode=returncode)
+
+    if returncode != 0:
+        print(f"Error muxing subtitles into '{video_path}': {stderr}")
+        metrics.error("mux", stderr.strip(), file=video_path)
+        return False
+    _count_output(output_path)
+    print(f"Created video with subtitle tracks: '{output_path}'")
+    return True
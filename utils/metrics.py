@@ -0,0 +1,372 @@
+# utils/metrics.py
+"""
+Metrics and tracing for the processing pipeline.
+
+Spans time one piece of work: audio extraction, a model load, a
+transcription, a translation batch, a burn or a mux. Counters add up events:
+translation requests, cache hits, bytes read and written, errors. Both carry
+a few labels such as the backend or the stage.
+
+    with metrics.span("burn", file=video_path, language="ne"):
+        ...
+    metrics.count("translation_requests", backend="google")
+
+Nothing is recorded unless GLOBAL_CLASSROOM_METRICS names a folder or
+enable() is called; until then span() and count() return at once. When
+enabled, the folder receives
+
+    events.jsonl  one JSON object per finished span and per error, appended
+                  as they happen by every process, worker processes included
+    metrics.prom  the counters and span totals of the process that enabled
+                  recording, in the Prometheus text format, rewritten by
+                  flush() and at exit
+
+Labels end up in metrics.prom and should take few values; per-file detail
+goes in `file`, which is written to events.jsonl only.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+
+METRICS_ENV = "GLOBAL_CLASSROOM_METRICS"
+EVENTS_FILE = "events.jsonl"
+PROMETHEUS_FILE = "metrics.prom"
+PREFIX = "global_classroom"
+# Set to the pid of the process that started recording, so worker processes
+# that inherit GLOBAL_CLASSROOM_METRICS leave metrics.prom to it.
+_OWNER_ENV = "GLOBAL_CLASSROOM_METRICS_OWNER"
+
+
+class _NullSpan:
+    """What span() returns while recording is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "file", "labels", "fields", "wall", "start")
+
+    def __init__(self, recorder, name, file, labels):
+        self.recorder = recorder
+        self.name = name
+        self.file = file
+        self.labels = labels
+        self.fields = None
+
+    def __enter__(self):
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recorder.finish_span(self, time.perf_counter() - self.start, exc)
+        return False
+
+    def set(self, **fields):
+        """Adds fields to the span's event, e.g. sizes known only once the work is done."""
+        if self.fields is None:
+            self.fields = {}
+        self.fields.update(fields)
+
+
+class Recorder:
+    """
+    Collects spans and counters for one folder; see the module docstring.
+
+    The process that created the recorder owns metrics.prom. Worker
+    processes instead append a snapshot of their totals to events.jsonl
+    whenever they flush, and the owner adds the latest snapshot of each
+    worker to its own totals.
+
+    Args:
+        directory (str): Folder for events.jsonl and metrics.prom.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.events_path = os.path.join(directory, EVENTS_FILE)
+        self.prometheus_path = os.path.join(directory, PROMETHEUS_FILE)
+        self.pid = os.getpid()
+        self._counters = {}  # (name, labels) -> total
+        self._spans = {}     # (name, labels) -> [count, seconds]
+        self._lock = threading.Lock()
+        self._events = None
+        self._events_pid = None
+        self._workers = {}   # pid -> latest snapshot event of a worker process
+        self._scanned = 0    # how far events.jsonl has been read for snapshots
+
+    def after_fork(self):
+        """Starts a forked worker from zero, so the owner's totals are not counted twice."""
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._spans = {}
+        self._events = None
+        self._workers = {}
+
+    def is_owner(self):
+        return os.getpid() == self.pid and os.environ.get(_OWNER_ENV, str(self.pid)) == str(self.pid)
+
+    def count(self, name, value, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def finish_span(self, span, seconds, exc=None):
+        key = (span.name, tuple(sorted(span.labels.items())))
+        with self._lock:
+            totals = self._spans.setdefault(key, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+        event = {"type": "span", "name": span.name, "start": round(span.wall, 6), "seconds": round(seconds, 6)}
+        event.update(span.labels)
+        if span.file is not None:
+            event["file"] = span.file
+        if span.fields:
+            event.update(span.fields)
+        if exc is not None:
+            event["error"] = str(exc) or type(exc).__name__
+        self.write_event(event)
+
+    def error(self, stage, message, file=None):
+        self.count("errors", 1, {"stage": stage})
+        event = {"type": "error", "stage": stage, "time": round(time.time(), 6), "message": message}
+        if file is not None:
+            event["file"] = file
+        self.write_event(event)
+
+    def write_event(self, event):
+        event["pid"] = os.getpid()
+        line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            # A forked worker must not share the parent's buffer.
+            if self._events is None or self._events_pid != os.getpid():
+                self._events = open(self.events_path, "a", encoding="utf-8", buffering=1)
+                self._events_pid = os.getpid()
+            self._events.write(line)
+
+    def snapshot(self):
+        """Returns {'counters': {...}, 'spans': {...}} keyed by (name, labels), for this process alone."""
+        with self._lock:
+            return {"counters": dict(self._counters),
+                    "spans": {key: tuple(totals) for key, totals in self._spans.items()}}
+
+    def totals(self):
+        """Like snapshot(), with the latest totals of every worker process added."""
+        totals = self.snapshot()
+        counters, spans = totals["counters"], totals["spans"]
+        for event in self._read_worker_snapshots():
+            for name, labels, value in event["counters"]:
+                key = (name, tuple(sorted(labels.items())))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, count, seconds in event["spans"]:
+                key = (name, tuple(sorted(labels.items())))
+                previous = spans.get(key, (0, 0.0))
+                spans[key] = (previous[0] + count, previous[1] + seconds)
+        return totals
+
+    def _read_worker_snapshots(self):
+        try:
+            with open(self.events_path, "rb") as f:
+                f.seek(self._scanned)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # still being written; read it next time
+                    self._scanned += len(line)
+                    if line.startswith(b'{"type": "snapshot"'):
+                        event = json.loads(line)
+                        if event.get("owner") == self.pid:
+                            self._workers[event["pid"]] = event
+        except (OSError, ValueError):
+            pass
+        return list(self._workers.values())
+
+    def _write_snapshot(self):
+        snapshot = self.snapshot()
+        if not snapshot["counters"] and not snapshot["spans"]:
+            return
+        owner = os.environ.get(_OWNER_ENV)
+        self.write_event({
+            "type": "snapshot", "owner": int(owner) if owner and owner.isdigit() else None,
+            "counters": [[name, dict(labels), value] for (name, labels), value in snapshot["counters"].items()],
+            "spans": [[name, dict(labels), count, seconds]
+                      for (name, labels), (count, seconds) in snapshot["spans"].items()],
+        })
+
+    def prometheus_text(self):
+        totals = self.totals()
+        lines = []
+        for name in sorted({name for name, _ in totals["counters"]}):
+            metric = f"{PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (counter, labels), value in sorted(totals["counters"].items()):
+                if counter == name:
+                    lines.append(f"{metric}{_format_labels(labels)} {value}")
+        if totals["spans"]:
+            metric = f"{PREFIX}_span_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for (name, labels), (count, seconds) in sorted(totals["spans"].items()):
+                labels = _format_labels((("span", name),) + labels)
+                lines.append(f"{metric}_count{labels} {count}")
+                lines.append(f"{metric}_sum{labels} {seconds:.6f}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def flush(self):
+        """Rewrites metrics.prom in the owning process, or records a snapshot in a worker."""
+        if not self.is_owner():
+            self._write_snapshot()
+        with self._lock:
+            if self._events is not None and self._events_pid == os.getpid():
+                self._events.flush()
+        if not self.is_owner():
+            return
+        temp_path = f"{self.prometheus_path}.{self.pid}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, self.prometheus_path)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._events is not None and self._events_pid == os.getpid():
+                self._events.close()
+            self._events = None
+
+
+def _escape(value):
+    if isinstance(value, bool):
+        value = "true" if value else "false"
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def enable(directory):
+    """
+    Starts recording into `directory`, replacing any earlier recorder. The
+    folder is also put in GLOBAL_CLASSROOM_METRICS so worker processes
+    started afterwards record their spans too.
+
+    Returns:
+        Recorder: The new recorder.
+    """
+    global _recorder
+    recorder = Recorder(directory)
+    with _recorder_lock:
+        previous, _recorder = _recorder, recorder
+    if previous is not None:
+        previous.close()
+    os.environ[METRICS_ENV] = directory
+    os.environ[_OWNER_ENV] = str(os.getpid())
+    return recorder
+
+
+def disable():
+    """Stops recording, writing metrics.prom one last time."""
+    global _recorder
+    with _recorder_lock:
+        recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.close()
+
+
+def enabled():
+    return _recorder is not None
+
+
+def span(name, file=None, **labels):
+    """
+    Times the block it wraps:
+
+        with span("translate_batch", backend="google") as s:
+            ...
+            s.set(texts=len(batch))
+
+    An exception leaving the block is noted in the span's event. It is not
+    counted as an error; the code that reports the failure calls error(),
+    so a failure passing through nested spans is counted once.
+    """
+    recorder = _recorder
+    if recorder is None:
+        return _NULL_SPAN
+    return _Span(recorder, name, file, labels)
+
+
+def count(name, value=1, **labels):
+    """Adds value to a counter, exported as global_classroom_<name>_total."""
+    recorder = _recorder
+    if recorder is not None and value:
+        recorder.count(name, value, labels)
+
+
+def error(stage, message, file=None):
+    """Counts a failure of `stage` and writes it to events.jsonl."""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.error(stage, str(message), file)
+
+
+def flush():
+    """
+    Writes metrics.prom now instead of at exit. Worker processes call this
+    when they finish a piece of work, to hand their totals to the owner.
+    """
+    recorder = _recorder
+    if recorder is not None:
+        recorder.flush()
+
+
+def snapshot():
+    """Returns the counters and span totals of this process, or None when recording is off."""
+    recorder = _recorder
+    return recorder.snapshot() if recorder is not None else None
+
+
+def _close_at_exit():
+    recorder = _recorder
+    if recorder is not None:
+        try:
+            recorder.close()
+        except OSError:
+            pass
+
+
+def _after_fork():
+    recorder = _recorder
+    if recorder is not None:
+        recorder.after_fork()
+
+
+atexit.register(_close_at_exit)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+if os.environ.get(METRICS_ENV):
+    try:
+        _recorder = Recorder(os.environ[METRICS_ENV])
+        os.environ.setdefault(_OWNER_ENV, str(os.getpid()))
+    except OSError as e:
+        print(f"Error opening metrics folder '{os.environ[METRICS_ENV]}': {e}")
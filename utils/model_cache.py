@@ -0,0 +1,209 @@
+# utils/model_cache.py
+
+import threading
+from collections import OrderedDict
+from utils import metrics
+from utils.transcription_engines import get_default_engine, default_model_name
+
+# How many loaded models to keep in memory at once. Whisper "base" is ~150 MB,
+# "large" is several GB, so keep this small.
+DEFAULT_MAX_MODELS = 2
+
+
+def resolve_device(device=None):
+    """
+    Returns the device a model should be loaded on.
+
+    Args:
+        device (str): Explicit device ('cpu', 'cuda', ...). If not provided,
+                      CUDA is used when available, otherwise the CPU.
+
+    Returns:
+        str: The resolved device name.
+    """
+    if device:
+        return device
+    try:
+        import torch
+    except ImportError:
+        # Only stand-in models can run without torch, and they run anywhere.
+        return "cpu"
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def resolve_precision(precision, device):
+    """
+    Returns 'fp16' or 'fp32'. Half precision is only used on GPUs, matching
+    what whisper itself falls back to on the CPU.
+    """
+    if precision is None:
+        precision = "fp16"
+    if device == "cpu":
+        return "fp32"
+    return precision
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models keyed by (model name, device,
+    precision, engine settings). Models are loaded by their transcription
+    engine, see utils.transcription_engines, unless a loader is given.
+
+    Models stay loaded across calls (and across GUI worker runs) until the
+    registry holds more than `max_models`, at which point the least recently
+    used model is dropped.
+    """
+
+    def __init__(self, loader=None, max_models=DEFAULT_MAX_MODELS):
+        self._loader = loader
+        self._max_models = max_models
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get(self, model_name, device=None, precision=None, engine=None):
+        """
+        Returns a loaded model, loading it on first use.
+
+        Args:
+            model_name (str): Model name, e.g. 'base'.
+            device (str): Device to load on. Defaults to CUDA when available.
+            precision (str): 'fp16' or 'fp32'. Forced to 'fp32' on the CPU.
+            engine (TranscriptionEngine): Engine that loads the model.
+                                          Defaults to the process-wide
+                                          default engine.
+
+        Returns:
+            The loaded model.
+        """
+        device = resolve_device(device)
+        engine = engine or get_default_engine()
+        key = (model_name, device, resolve_precision(precision, device), engine.cache_key())
+
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                metrics.count("cache_hits", cache="model")
+                return self._models[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so other models stay available, but
+        # make concurrent requests for the same key wait for a single load.
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    metrics.count("cache_hits", cache="model")
+                    return self._models[key]
+            metrics.count("cache_misses", cache="model")
+            with metrics.span("model_load", engine=key[3][0], model=model_name, device=device):
+                if self._loader is not None:
+                    model = self._loader(*key[:3])
+                else:
+                    model = engine.load(*key[:3])
+            with self._lock:
+                self._models[key] = model
+                self._models.move_to_end(key)
+                self._evict()
+                self._key_locks.pop(key, None)
+            return model
+
+    def _evict(self):
+        while len(self._models) > self._max_models:
+            key, _ = self._models.popitem(last=False)
+            print(f"Unloaded model '{key[0]}' ({key[3][0]}, {key[1]}, {key[2]}) from cache.")
+
+    def set_max_models(self, max_models):
+        with self._lock:
+            self._max_models = max(1, int(max_models))
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def set_loader(self, loader):
+        """Replaces the loader and drops the models loaded by the old one."""
+        with self._lock:
+            self._loader = loader
+            self._models.clear()
+
+    def loader(self):
+        """Returns the loader given to set_loader, or None."""
+        return self._loader
+
+    def loaded(self):
+        """Returns the keys of the currently loaded models, oldest first."""
+        with self._lock:
+            return list(self._models)
+
+
+_registry = ModelRegistry()
+
+
+def get_model(model_name=None, device=None, precision=None, engine=None):
+    """
+    Returns a cached speech recognition model, loading it on first use. The
+    model name defaults to GLOBAL_CLASSROOM_WHISPER_MODEL or 'base', the
+    engine to the default transcription engine.
+    """
+    return _registry.get(model_name or default_model_name(), device=device, precision=precision, engine=engine)
+
+
+def warm_up(model_names=None, device=None, precision=None, background=True, engine=None):
+    """
+    Loads models ahead of time so the first video does not pay the load cost.
+
+    Args:
+        model_names (iterable): Model names to load. Defaults to the default
+                                model.
+        device (str): Device to load on.
+        precision (str): 'fp16' or 'fp32'.
+        background (bool): Load in a daemon thread and return immediately.
+        engine (TranscriptionEngine): Engine to load with.
+
+    Returns:
+        threading.Thread or None: The loader thread when `background` is set.
+    """
+    model_names = model_names or (default_model_name(),)
+
+    def load_all():
+        for name in model_names:
+            try:
+                get_model(name, device=device, precision=precision, engine=engine)
+                print(f"Warmed up model '{name}'.")
+            except Exception as e:
+                print(f"Error warming up model '{name}': {e}")
+                metrics.error("model_load", f"'{name}': {e}")
+
+    if not background:
+        load_all()
+        return None
+    thread = threading.Thread(target=load_all, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def set_max_models(max_models):
+    """Sets how many models the process-wide cache keeps loaded."""
+    _registry.set_max_models(max_models)
+
+
+def clear_models():
+    """Drops every cached model."""
+    _registry.clear()
+
+
+def set_model_loader(loader=None):
+    """
+    Makes the process-wide cache load models with loader(model_name, device,
+    precision) whatever the engine, e.g. a stand-in for benchmarks. Any
+    object with Whisper's transcribe(audio, **options) method will do. None
+    goes back to loading with the transcription engines.
+    """
+    _registry.set_loader(loader)
+
+
+def get_model_loader():
+    """Returns the loader set with set_model_loader, or None."""
+    return _registry.loader()
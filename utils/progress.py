@@ -0,0 +1,104 @@
+# utils/progress.py
+
+import time
+from collections import namedtuple
+
+# A progress update from one stage of processing one file.
+#   file:    path of the input being processed
+#   stage:   'audio', 'transcribe', 'translate', 'burn', ...
+#   current: amount done so far, in `unit`
+#   total:   amount to do in `unit`, or None if unknown
+#   unit:    's' (media seconds), 'cues', 'paragraphs', ...
+ProgressEvent = namedtuple("ProgressEvent", ["file", "stage", "current", "total", "unit"])
+
+
+def reporter(on_progress, file, stage, unit, total=None):
+    """
+    Returns a function report(current, total=None) that sends ProgressEvents
+    for one file and stage to on_progress. If on_progress is None the returned
+    function does nothing, so callers never need to check.
+    """
+    if on_progress is None:
+        return lambda current, total=None: None
+    fixed_total = total
+
+    def report(current, total=None):
+        on_progress(ProgressEvent(file, stage, current, total if total is not None else fixed_total, unit))
+
+    return report
+
+
+# Rough share of the wall time each stage takes, used to combine stage
+# progress into one number per file.
+VIDEO_STAGE_WEIGHTS = {"audio": 0.05, "transcribe": 0.5, "translate": 0.15, "burn": 0.3, "mux": 0.3}
+DOCUMENT_STAGE_WEIGHTS = {"translate": 1.0}
+
+
+def format_eta(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02}:{secs:02}" if hours else f"{minutes}:{secs:02}"
+
+
+class ProgressTracker:
+    """
+    Turns ProgressEvents from many files and stages into an overall fraction
+    and a per-stage estimate of the time left, based on each stage's own
+    rate so far.
+    """
+
+    def __init__(self, files, stage_weights=VIDEO_STAGE_WEIGHTS, clock=time.monotonic):
+        self.files = list(files)
+        self.stage_weights = stage_weights
+        self.clock = clock
+        self.fractions = {file: {} for file in self.files}
+        self.started = {}
+        self.events = {}
+        self.done = set()
+
+    def update(self, event):
+        key = (event.file, event.stage)
+        self.started.setdefault(key, self.clock())
+        self.events[key] = event
+        if event.total:
+            self.fractions.setdefault(event.file, {})[event.stage] = min(1.0, event.current / event.total)
+
+    def finish_file(self, file):
+        self.done.add(file)
+
+    def file_fraction(self, file):
+        if file in self.done:
+            return 1.0
+        # "burn" and "mux" are alternatives; only one of them counts.
+        fractions = self.fractions.get(file, {})
+        weights = dict(self.stage_weights)
+        if "mux" in fractions:
+            weights.pop("burn", None)
+        else:
+            weights.pop("mux", None)
+        total_weight = sum(weights.values()) or 1.0
+        return sum(weight * fractions.get(stage, 0.0) for stage, weight in weights.items()) / total_weight
+
+    def overall(self):
+        """Returns the fraction of all work done, between 0 and 1."""
+        if not self.files:
+            return 1.0
+        return sum(self.file_fraction(file) for file in self.files) / len(self.files)
+
+    def eta(self, file, stage):
+        """Returns the estimated seconds left for a stage, or None if unknown."""
+        event = self.events.get((file, stage))
+        if event is None or not event.total or event.current <= 0:
+            return None
+        elapsed = self.clock() - self.started[(file, stage)]
+        return elapsed * (event.total - event.current) / event.current
+
+    def active_stages(self):
+        """Returns (file, stage, fraction, eta) for each unfinished stage."""
+        active = []
+        for (file, stage), event in self.events.items():
+            if file in self.done or not event.total or event.current >= event.total:
+                continue
+            active.append((file, stage, event.current / event.total, self.eta(file, stage)))
+        return active
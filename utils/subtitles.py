@@ -0,0 +1,139 @@
+# utils/subtitles.py
+"""
+In-memory subtitle tracks.
+
+A SubtitleTrack keeps cue times as integer milliseconds in two arrays and the
+texts in a list, so a lecture's worth of cues costs a few bytes per cue on
+top of the text. Tracks travel from transcription through translation to
+burning and muxing as objects; SRT or WebVTT text is produced only where a
+file is needed, for ffmpeg or a checkpoint, and parsed only when one is read
+back.
+"""
+
+import os
+import re
+from array import array
+from utils import metrics
+
+_TIMESTAMP = r"(\d+):(\d{2}):(\d{2})[,.](\d{1,3})"
+_TIMING_LINE = re.compile(_TIMESTAMP + r"\s*-->\s*" + _TIMESTAMP)
+
+
+def seconds_to_ms(seconds):
+    """
+    Converts seconds to whole milliseconds, truncating the way SRT files
+    have always been written here, so timestamps match earlier outputs.
+    """
+    whole = int(seconds)
+    return whole * 1000 + int((seconds - whole) * 1000)
+
+
+def format_srt_time(ms):
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02}:{minutes:02}:{seconds:02},{ms:03}"
+
+
+def format_vtt_time(ms):
+    return format_srt_time(ms).replace(",", ".")
+
+
+def _parse_time(hours, minutes, seconds, fraction):
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(fraction.ljust(3, "0"))
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    if metrics.enabled():
+        metrics.count("bytes_written", os.path.getsize(path), kind="subtitles")
+    return path
+
+
+class SubtitleTrack:
+    """
+    Cues with start and end times in milliseconds and their text.
+
+    Args:
+        language (str): Language code of the texts, if known.
+    """
+
+    __slots__ = ("starts", "ends", "texts", "language")
+
+    def __init__(self, language=None):
+        self.starts = array("i")
+        self.ends = array("i")
+        self.texts = []
+        self.language = language
+
+    @classmethod
+    def from_segments(cls, segments, language=None):
+        """Builds a track from Whisper-style segments: dicts with 'start' and 'end' in seconds, and 'text'."""
+        track = cls(language)
+        for segment in segments:
+            track.append(seconds_to_ms(segment["start"]), seconds_to_ms(segment["end"]),
+                         segment["text"].strip())
+        return track
+
+    def append(self, start_ms, end_ms, text):
+        self.starts.append(start_ms)
+        self.ends.append(end_ms)
+        self.texts.append(text)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __iter__(self):
+        """Yields (start_ms, end_ms, text) per cue."""
+        return zip(self.starts, self.ends, self.texts)
+
+    def with_texts(self, texts, language=None):
+        """Returns a track with the same timing and new texts, e.g. a translation."""
+        if len(texts) != len(self.texts):
+            raise ValueError(f"Expected {len(self.texts)} texts, got {len(texts)}")
+        track = SubtitleTrack(language)
+        track.starts = array("i", self.starts)
+        track.ends = array("i", self.ends)
+        track.texts = list(texts)
+        return track
+
+    def to_srt(self):
+        return "".join(f"{index}\n{format_srt_time(start)} --> {format_srt_time(end)}\n{text}\n\n"
+                       for index, (start, end, text) in enumerate(self, start=1))
+
+    def to_vtt(self):
+        return "WEBVTT\n\n" + "".join(f"{format_vtt_time(start)} --> {format_vtt_time(end)}\n{text}\n\n"
+                                      for start, end, text in self)
+
+    def write_srt(self, path):
+        return _write(path, self.to_srt())
+
+    def write_vtt(self, path):
+        return _write(path, self.to_vtt())
+
+    @classmethod
+    def parse(cls, text, language=None):
+        """
+        Parses SRT or WebVTT text. Cue numbers, the WEBVTT header, notes and
+        cue settings after the timing are ignored.
+        """
+        track = cls(language)
+        for block in re.split(r"\n\s*\n", text.lstrip("\ufeff").replace("\r\n", "\n").replace("\r", "\n")):
+            lines = block.strip("\n").split("\n")
+            for position, line in enumerate(lines):
+                match = _TIMING_LINE.search(line)
+                if match:
+                    track.append(_parse_time(*match.groups()[:4]), _parse_time(*match.groups()[4:]),
+                                 "\n".join(lines[position + 1:]).strip())
+                    break
+        return track
+
+    @classmethod
+    def read(cls, path, language=None):
+        """Reads an .srt or .vtt file."""
+        with open(path, "r", encoding="utf-8-sig") as f:
+            text = f.read()
+        if metrics.enabled():
+            metrics.count("bytes_read", os.path.getsize(path), kind="subtitles")
+        return cls.parse(text, language)
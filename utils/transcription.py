@@ -1,37 +1,172 @@
 # utils/transcription.py
 import os
-import subprocess
-import whisper
+import threading
+import types
+from collections import namedtuple
+from utils import metrics
+from utils.ffmpeg_utils import load_audio, SAMPLE_RATE
+from utils.model_cache import get_model, resolve_device, resolve_precision
+from utils.transcription_engines import get_default_engine, default_model_name
+from utils.subtitles import SubtitleTrack, format_srt_time, seconds_to_ms
 
-def transcribe_video(video_path, model_name="base"):
-    # Load the Whisper model
-    model = whisper.load_model(model_name)
+# Recordings longer than this are transcribed in parallel chunks on the CPU.
+LONG_AUDIO_SECONDS = 30 * 60
 
-    # Extract the audio from the video
-    audio_path = os.path.splitext(video_path)[0] + ".mp3"
-    command = ["ffmpeg", "-i", video_path, "-q:a", "0", "-map", "a", "-y", audio_path]
-    subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+# Result of a transcription.
+#   srt_path: the SRT file written, or None if none was asked for
+#   language: spoken language detected by Whisper (a code such as 'en'), or
+#             the language it was told to expect
+#   duration: length of the audio in seconds
+#   track:    the segments as a utils.subtitles.SubtitleTrack
+Transcript = namedtuple("Transcript", ["srt_path", "language", "duration", "track"])
 
-    # Transcribe the audio
-    result = model.transcribe(audio_path)
-
-    # Generate SRT file
+def transcribe_video(video_path, model_name=None, device=None, precision=None, language=None, engine=None):
+    # Decode the audio straight into memory; no intermediate audio file.
+    audio = load_audio(video_path)
+    audio_file = audio_backing_file(audio)
     srt_path = os.path.splitext(video_path)[0] + ".srt"
-    with open(srt_path, "w", encoding="utf-8") as srt_file:
-        for segment in result["segments"]:
-            srt_file.write(f"{segment['id'] + 1}\n")
-            start_time = format_timestamp(segment['start'])
-            end_time = format_timestamp(segment['end'])
-            srt_file.write(f"{start_time} --> {end_time}\n")
-            srt_file.write(f"{segment['text'].strip()}\n\n")
-
-    # Remove the temporary audio file
-    os.remove(audio_path)
-    print(f"Transcribed '{video_path}' to '{srt_path}' successfully.")
+    try:
+        transcript = transcribe_audio(audio, srt_path, model_name, device=device, precision=precision,
+                                      language=language, engine=engine)
+    finally:
+        # Drop the array before removing the file, Windows refuses to delete mapped files.
+        del audio
+        if audio_file:
+            os.remove(audio_file)
+    print(f"Transcribed '{video_path}' ({transcript.language}) to '{srt_path}' successfully.")
+    return transcript
+
+def audio_backing_file(audio):
+    """Returns the file behind a memory-mapped array from load_audio, or None."""
+    return getattr(audio, "filename", None)
+
+_progress_local = threading.local()
+_progress_hook_lock = threading.Lock()
+_progress_hook_installed = False
+
+def _install_progress_hook():
+    """
+    Whisper reports progress only through a tqdm bar over mel frames. Swap in
+    a tqdm subclass that also forwards each update to the callback registered
+    for the calling thread. Installed once; a no-op for threads without one.
+    """
+    global _progress_hook_installed
+    with _progress_hook_lock:
+        if _progress_hook_installed:
+            return
+        try:
+            import whisper.transcribe as whisper_transcribe
+            from whisper.audio import FRAMES_PER_SECOND
+        except ImportError:
+            # Stand-in models (see model_cache.set_model_loader) need no hook.
+            return
+        base = whisper_transcribe.tqdm.tqdm
+
+        class ReportingTqdm(base):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self._callback = getattr(_progress_local, "callback", None)
+                self._frames = 0
+
+            def update(self, n=1):
+                # Counted here because a disabled tqdm does not track n.
+                self._frames += n
+                if self._callback is not None and self.total:
+                    self._callback(min(self._frames, self.total) / FRAMES_PER_SECOND, self.total / FRAMES_PER_SECOND)
+                return super().update(n)
+
+        whisper_transcribe.tqdm = types.SimpleNamespace(tqdm=ReportingTqdm)
+        _progress_hook_installed = True
+
+def transcribe_audio(audio, srt_path=None, model_name=None, device=None, precision=None, chunked=None,
+                     on_progress=None, language=None, engine=None):
+    """
+    Transcribes audio with Whisper into a subtitle track, optionally also
+    written as SRT.
+
+    Args:
+        audio: Path to an audio file, or 16 kHz mono float32 samples as
+               returned by utils.ffmpeg_utils.load_audio.
+        srt_path (str): Path of the SRT file to write, if any.
+        model_name (str): Model size, e.g. 'base' or 'small'. Defaults to
+                          GLOBAL_CLASSROOM_WHISPER_MODEL or 'base'.
+        chunked (bool): Split the audio at silences and transcribe the pieces
+                        in a process pool. By default this is done for CPU
+                        transcription of sample arrays longer than
+                        LONG_AUDIO_SECONDS, when free memory holds more
+                        than one copy of the model.
+        on_progress (callable): Called as on_progress(seconds_done,
+                                total_seconds) as segments are decoded.
+        language (str): Spoken language, if known. By default Whisper
+                        detects it from the first 30 seconds.
+        engine (TranscriptionEngine): Engine to run the model with, see
+                                      utils.transcription_engines. Defaults
+                                      to the process-wide default engine.
+
+    Returns:
+        Transcript: The SRT path, language, duration and track.
+    """
+    model_name = model_name or default_model_name()
+    engine = engine or get_default_engine()
+    device = resolve_device(device)
+    precision = resolve_precision(precision, device)
+    if chunked is None:
+        chunked = device == "cpu" and not isinstance(audio, str) and len(audio) > LONG_AUDIO_SECONDS * SAMPLE_RATE
+        if chunked:
+            # Every worker loads its own model; without room for two, one
+            # pass on the cached model is faster than chunking.
+            from utils.chunked_transcription import default_workers
+            chunked = default_workers(model_name) > 1
+    with metrics.span("transcribe", engine=engine.name, model=model_name, chunked=chunked) as span:
+        transcript = _transcribe(audio, srt_path, model_name, device, precision, chunked, on_progress, language,
+                                 engine)
+        span.set(audio_seconds=round(transcript.duration, 3), segments=len(transcript.track),
+                 language=transcript.language)
+    return transcript
+
+def _transcribe(audio, srt_path, model_name, device, precision, chunked, on_progress, language, engine):
+    if chunked:
+        from utils.chunked_transcription import transcribe_chunked
+        result = transcribe_chunked(audio, model_name, device=device, precision=precision, on_progress=on_progress,
+                                    language=language, engine=engine)
+        return _transcript(result, audio, srt_path)
+
+    # Get the model (loaded once per process and cached)
+    model = get_model(model_name, device=device, precision=precision, engine=engine)
+    options = dict(engine.transcribe_options(), fp16=(precision == "fp16"), language=language)
+
+    if getattr(model, "reports_progress", False):
+        result = model.transcribe(audio, on_progress=on_progress, **options)
+        return _transcript(result, audio, srt_path)
+    if on_progress is not None:
+        _install_progress_hook()
+    _progress_local.callback = on_progress
+    try:
+        result = model.transcribe(audio, **options)
+    finally:
+        _progress_local.callback = None
+    return _transcript(result, audio, srt_path)
+
+def _transcript(result, audio, srt_path):
+    """Turns a Whisper-style result into a Transcript, writing the SRT file if asked to."""
+    track = SubtitleTrack.from_segments(result["segments"], result.get("language"))
+    if isinstance(audio, str):
+        duration = track.ends[-1] / 1000 if len(track) else 0.0
+    else:
+        duration = len(audio) / SAMPLE_RATE
+    if srt_path:
+        track.write_srt(srt_path)
+    return Transcript(srt_path, track.language, duration, track)
+
+def write_srt(segments, srt_path):
+    """
+    Writes Whisper-style segments (dicts with 'start', 'end' and 'text') as SRT,
+    numbering them from 1.
+
+    Returns:
+        str: Path to the SRT file.
+    """
+    return SubtitleTrack.from_segments(segments).write_srt(srt_path)
 
 def format_timestamp(seconds):
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    milliseconds = int((seconds - int(seconds)) * 1000)
-    return f"{hours:02}:{minutes:02}:{secs:02},{milliseconds:03}"
+    return format_srt_time(seconds_to_ms(seconds))
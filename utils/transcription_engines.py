@@ -0,0 +1,217 @@
+# utils/transcription_engines.py
+"""
+Transcription engines.
+
+An engine loads speech recognition models and says how to call them. Every
+model it loads has Whisper's interface, transcribe(audio, **options)
+returning a dict with 'segments' and 'language', so the rest of the pipeline
+(chunking, progress, subtitle tracks) does not care which engine ran.
+
+    whisper         the reference openai-whisper package on torch
+    faster-whisper  the same models converted for CTranslate2, with int8
+                    quantization and voice activity detection; several
+                    times faster on the CPU
+
+Engines are looked up by name with get_engine(); the default comes from
+GLOBAL_CLASSROOM_TRANSCRIPTION_ENGINE and is 'whisper'. The model size
+defaults to GLOBAL_CLASSROOM_WHISPER_MODEL, or 'base'.
+"""
+
+import os
+import threading
+
+ENGINE_ENV = "GLOBAL_CLASSROOM_TRANSCRIPTION_ENGINE"
+DEFAULT_ENGINE = "whisper"
+MODEL_ENV = "GLOBAL_CLASSROOM_WHISPER_MODEL"
+DEFAULT_MODEL = "base"
+MODEL_SIZES = ("tiny", "base", "small", "medium", "large-v3", "turbo")
+
+
+def default_model_name():
+    return os.environ.get(MODEL_ENV) or DEFAULT_MODEL
+
+
+class TranscriptionEngine:
+    """Base class; see the module docstring."""
+
+    name = None
+    module = None  # the package that does the work, for pre-loading
+
+    def load(self, model_name, device, precision):
+        """Returns a model with Whisper's transcribe(audio, **options) method."""
+        raise NotImplementedError
+
+    def cache_key(self):
+        """Settings that make a loaded model differ; part of the model cache key."""
+        return (self.name,)
+
+    def transcribe_options(self):
+        """Extra options passed to every transcribe() call."""
+        return {}
+
+    def params(self):
+        """Settings that change the transcription; part of the checkpoint key."""
+        return {"engine": self.name}
+
+    def for_workers(self, threads):
+        """Returns the engine to use in each of several worker processes with `threads` cores each."""
+        return self
+
+
+class WhisperEngine(TranscriptionEngine):
+    """
+    The reference openai-whisper implementation.
+
+    Args:
+        beam_size (int): Beam width; None decodes greedily, as Whisper does
+                         by default.
+        threads (int): Torch threads; 0 leaves torch's default.
+    """
+
+    name = "whisper"
+    module = "whisper"
+
+    def __init__(self, beam_size=None, threads=0):
+        self.beam_size = beam_size
+        self.threads = threads
+
+    def load(self, model_name, device, precision):
+        import whisper
+        if self.threads:
+            import torch
+            torch.set_num_threads(self.threads)
+        return whisper.load_model(model_name, device=device)
+
+    def transcribe_options(self):
+        return {"beam_size": self.beam_size} if self.beam_size else {}
+
+    def params(self):
+        # Plain Whisper keeps the checkpoint keys it had before engines existed.
+        return {"beam_size": self.beam_size} if self.beam_size else {}
+
+
+class FasterWhisperModel:
+    """Gives a faster_whisper.WhisperModel the interface of a Whisper model."""
+
+    # transcribe() takes on_progress itself; Whisper needs a tqdm hook instead.
+    reports_progress = True
+
+    def __init__(self, model):
+        self.model = model
+
+    def transcribe(self, audio, fp16=None, language=None, on_progress=None, **options):
+        # faster-whisper decodes lazily; segments arrive as the generator is read.
+        segments, info = self.model.transcribe(audio, language=language, **options)
+        result = []
+        for segment in segments:
+            result.append({"start": segment.start, "end": segment.end, "text": segment.text})
+            if on_progress is not None and info.duration:
+                on_progress(min(segment.end, info.duration), info.duration)
+        return {"text": "".join(s["text"] for s in result), "segments": result, "language": info.language}
+
+
+class FasterWhisperEngine(TranscriptionEngine):
+    """
+    Whisper models run by CTranslate2 through the faster-whisper package.
+    Models are downloaded and converted by faster-whisper on first use.
+
+    Args:
+        compute_type (str): CTranslate2 compute type. Defaults to 'int8' on
+                            the CPU and 'float16' on a GPU.
+        threads (int): CPU threads per model; 0 uses OMP_NUM_THREADS if set,
+                       otherwise every core.
+        beam_size (int): Beam width; 1 is greedy and fastest.
+        vad_filter (bool): Skip silence with the Silero voice activity
+                           detector before decoding.
+        min_silence_ms (int): Shortest silence the detector cuts out.
+    """
+
+    name = "faster-whisper"
+    module = "faster_whisper"
+
+    def __init__(self, compute_type=None, threads=0, beam_size=5, vad_filter=True, min_silence_ms=500):
+        self.compute_type = compute_type
+        self.threads = threads
+        self.beam_size = beam_size
+        self.vad_filter = vad_filter
+        self.min_silence_ms = min_silence_ms
+
+    def _compute_type(self, device):
+        return self.compute_type or ("int8" if device == "cpu" else "float16")
+
+    def load(self, model_name, device, precision):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError("The faster-whisper engine needs the faster-whisper package: "
+                              "pip install faster-whisper") from e
+        return FasterWhisperModel(WhisperModel(model_name, device=device, compute_type=self._compute_type(device),
+                                               cpu_threads=self._cpu_threads()))
+
+    def _cpu_threads(self):
+        # CTranslate2 takes 0 to mean OMP_NUM_THREADS or else just 4 threads.
+        if self.threads or os.environ.get("OMP_NUM_THREADS"):
+            return self.threads
+        return os.cpu_count() or 0
+
+    def cache_key(self):
+        return (self.name, self.compute_type, self.threads)
+
+    def transcribe_options(self):
+        options = {"beam_size": self.beam_size, "vad_filter": self.vad_filter}
+        if self.vad_filter:
+            options["vad_parameters"] = {"min_silence_duration_ms": self.min_silence_ms}
+        return options
+
+    def params(self):
+        return {"engine": self.name, "compute_type": self.compute_type or "auto", "beam_size": self.beam_size,
+                "vad": self.min_silence_ms if self.vad_filter else None}
+
+    def for_workers(self, threads):
+        if self.threads:
+            return self
+        return FasterWhisperEngine(self.compute_type, threads, self.beam_size, self.vad_filter, self.min_silence_ms)
+
+
+_ENGINES = {
+    "whisper": WhisperEngine,
+    "faster-whisper": FasterWhisperEngine,
+}
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_engine(name=None, **options):
+    """
+    Creates an engine by name: 'whisper' or 'faster-whisper'. Without a name,
+    returns the process-wide default engine.
+    """
+    if name is None and not options:
+        return get_default_engine()
+    name = name or os.environ.get(ENGINE_ENV, DEFAULT_ENGINE)
+    if name not in _ENGINES:
+        raise ValueError(f"Unknown transcription engine '{name}', expected one of {sorted(_ENGINES)}")
+    return _ENGINES[name](**options)
+
+
+def get_default_engine():
+    """Returns the engine set with set_default_engine, or the one named by GLOBAL_CLASSROOM_TRANSCRIPTION_ENGINE."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = get_engine(os.environ.get(ENGINE_ENV, DEFAULT_ENGINE))
+        return _default
+
+
+def set_default_engine(engine=None):
+    """
+    Makes every transcription without an explicit engine use this one.
+    Accepts an engine or an engine name; None goes back to the environment
+    setting.
+    """
+    global _default
+    if isinstance(engine, str):
+        engine = get_engine(engine)
+    with _default_lock:
+        _default = engine
@@ -1,76 +1,261 @@
 # utils/translation.py
 
 import os
-import pysrt
-from deep_translator import GoogleTranslator
-from docx import Document
+from utils.translation_memory import get_translation_memory
+from utils.translation_engine import MAX_BATCH_CHARS, TranslationEngine
+from utils.translation_backends import get_backend
+from utils.subtitles import SubtitleTrack
 
-def translate_srt_file(srt_path, target_language='ne', suffix=None):
+class TranslationIncomplete(Exception):
     """
-    Translates the SRT file to the specified target language.
+    Raised by translate_track(strict=True) when some subtitles could not be
+    translated. `track` is the translation with those subtitles left in the
+    original language.
+    """
+
+    def __init__(self, track, failures, total):
+        super().__init__(f"{failures} of {total} subtitles could not be translated into '{track.language}'")
+        self.track = track
+        self.failures = failures
+        self.total = total
+
+def make_engine(target_language, concurrency=None, rate=None, translator_factory=None, backend=None,
+                source_language='auto'):
+    """
+    Creates a TranslationEngine for the given target language.
 
     Args:
-        srt_path (str): Path to the input SRT file.
+        target_language (str): Target language code.
+        concurrency (int): Maximum number of requests in flight. Defaults to
+                           the backend's.
+        rate (float): Maximum requests per second, 0 for no limit. Defaults
+                      to the backend's.
+        translator_factory (callable): Returns a translator with a
+                                       translate(text) method, used instead
+                                       of a backend.
+        backend (TranslationBackend or str): Backend or backend name, see
+                                             utils.translation_backends.
+                                             Defaults to the process-wide
+                                             default backend.
+        source_language (str): Source language code (default is 'auto').
+
+    Returns:
+        TranslationEngine: The engine.
+    """
+    if translator_factory is not None:
+        backend = translator_factory
+    elif backend is None or isinstance(backend, str):
+        backend = get_backend(backend)
+    return TranslationEngine(backend, concurrency=concurrency, rate=rate, target_language=target_language,
+                             source_language=source_language)
+
+def translate_batch(texts, translator, max_chars=MAX_BATCH_CHARS, memory=None,
+                    source_language='auto', target_language=None, backend='google'):
+    """
+    Translates a list of texts using as few requests as possible.
+
+    Identical texts are translated once, and texts already in the translation
+    memory are not sent at all. The remaining texts are joined with
+    newlines into requests of up to max_chars characters and the response is
+    split back by line. If a request fails, or the response does not have one
+    line per text, that batch falls back to one request per text.
+
+    Args:
+        texts (list): Texts to translate.
+        translator: Object with a translate(text) method, e.g. GoogleTranslator.
+        max_chars (int): Maximum characters per request.
+        memory (TranslationMemory): Optional store to read from and write to.
+        source_language (str): Source language code, part of the memory key.
+        target_language (str): Target language code, part of the memory key.
+        backend (str): Translation backend name, part of the memory key.
+
+    Returns:
+        list: Translations in the same order as texts. An entry is None if
+              that text could not be translated.
+    """
+    engine = TranslationEngine(lambda: translator, concurrency=1, rate=0, max_chars=max_chars)
+    return engine.translate_many(texts, memory=memory, source_language=source_language,
+                                 target_language=target_language, backend=backend)
+
+def _report_memory(memory, hits_before, misses_before):
+    if memory is not None:
+        print(f"Translation memory: {memory.hits - hits_before} hits, {memory.misses - misses_before} misses")
+
+def translate_track(track, target_language='ne', use_memory=True, engine=None, on_progress=None,
+                    source_language=None, strict=False):
+    """
+    Translates a subtitle track in memory.
+
+    Many subtitles are packed into each request, repeated lines are translated
+    only once and requests run concurrently. Multi-line subtitles are joined
+    into a single line.
+
+    Args:
+        track (SubtitleTrack): Subtitles to translate, see utils.subtitles.
+        target_language (str): Target language code (default is 'ne').
+        use_memory (bool): Reuse and store translations in the persistent
+                           translation memory (default is True).
+        engine (TranslationEngine): Engine to translate with. If not provided,
+                                    one is created with make_engine().
+        on_progress (callable): Called as on_progress(done, total) with the
+                                number of subtitles translated so far.
+        source_language (str): Language of the subtitles. Defaults to the
+                               track's language, or 'auto' to let the
+                               backend detect it.
+        strict (bool): Raise TranslationIncomplete if any subtitle could not
+                       be translated, instead of only printing it.
+
+    Returns:
+        SubtitleTrack: A track with the same timing and the translated texts.
+                       Subtitles that could not be translated keep their
+                       original text.
+
+    Raises:
+        TranslationIncomplete: With strict=True, if a subtitle kept its
+                               original text.
+    """
+    source_language = source_language or track.language or 'auto'
+    if engine is None:
+        engine = make_engine(target_language)
+    memory = get_translation_memory() if use_memory else None
+    hits_before, misses_before = (memory.hits, memory.misses) if memory is not None else (0, 0)
+
+    texts = [" ".join(text.split("\n")).strip() for text in track.texts]
+    translations = engine.translate_many(texts, memory=memory, source_language=source_language,
+                                         target_language=target_language, on_progress=on_progress)
+    translated_texts = []
+    failures = 0
+    for original, text, translated_text in zip(track.texts, texts, translations):
+        if translated_text is None and text:
+            print(f"Error translating subtitle '{original}': keeping original text")
+            failures += 1
+        translated_texts.append(original if translated_text is None else translated_text)
+    _report_memory(memory, hits_before, misses_before)
+    translated = track.with_texts(translated_texts, target_language)
+    if strict and failures:
+        raise TranslationIncomplete(translated, failures, len(track))
+    return translated
+
+def translate_srt_file(srt_path, target_language='ne', suffix=None, use_memory=True, engine=None, on_progress=None,
+                       source_language='auto'):
+    """
+    Translates the SRT (or WebVTT) file to the specified target language with
+    translate_track.
+
+    Args:
+        srt_path (str): Path to the input SRT or .vtt file.
         target_language (str): Target language code (default is 'ne').
         suffix (str): Suffix to append to the output filename. If not provided,
                       defaults to f"_{target_language}".
-    
+        use_memory (bool): Reuse and store translations in the persistent
+                           translation memory (default is True).
+        engine (TranslationEngine): Engine to translate with. If not provided,
+                                    one is created with make_engine().
+        on_progress (callable): Called as on_progress(done, total) with the
+                                number of subtitles translated so far.
+        source_language (str): Language of the subtitles, or 'auto' to let the
+                               backend detect it (the default).
+
     Returns:
         str: Path to the translated SRT file.
     """
     if suffix is None:
         suffix = f"_{target_language}"
-        
-    subs = pysrt.open(srt_path, encoding='utf-8')
-    translator = GoogleTranslator(source='auto', target=target_language)
-    
-    for sub in subs:
-        try:
-            translated_text = translator.translate(sub.text)
-            sub.text = translated_text
-        except Exception as e:
-            print(f"Error translating subtitle '{sub.text}': {e}")
-
+    track = SubtitleTrack.read(srt_path)
+    translated = translate_track(track, target_language, use_memory=use_memory, engine=engine,
+                                 on_progress=on_progress, source_language=source_language)
     base, ext = os.path.splitext(srt_path)
-    new_srt_path = f"{base}{suffix}{ext}"
-    subs.save(new_srt_path, encoding='utf-8')
+    write = translated.write_vtt if ext.lower() == ".vtt" else translated.write_srt
+    new_srt_path = write(f"{base}{suffix}{ext}")
     print(f"Translated SRT saved to '{new_srt_path}'")
     return new_srt_path
 
-def translate_paragraph(paragraph, translator):
-    """
-    Translates all text runs in a paragraph using the provided translator.
-    """
-    if not paragraph.runs:
-        return
-    for run in paragraph.runs:
-        if run.text and run.text.strip():
-            try:
-                translated_text = translator.translate(run.text)
-                run.text = translated_text
-            except Exception as e:
-                print(f"Error translating run text '{run.text}': {e}")
-
-def translate_document(file_path, target_language='ne'):
+def translate_document(file_path, target_language='ne', use_memory=True, engine=None, on_progress=None,
+                       source_language='auto'):
     """
     Translates a Word document to the specified target language.
-    
+
+    Every paragraph of the body, tables (nested ones included), headers and
+    footers is collected first and translated as a whole, in batches through
+    the engine, so the number of requests follows the number of paragraphs
+    rather than the number of formatting runs. The translation is then laid
+    back over the runs of each paragraph, keeping their formatting.
+
     Args:
         file_path (str): Path to the input .docx file.
         target_language (str): Target language code (default is 'ne').
+        use_memory (bool): Reuse and store translations in the persistent
+                           translation memory (default is True).
+        engine (TranslationEngine): Engine to translate with. If not provided,
+                                    one is created with make_engine().
+        on_progress (callable): Called as on_progress(done, total) with the
+                                number of paragraphs translated so far.
+        source_language (str): Language of the document, or 'auto' to let the
+                               backend detect it (the default).
 
     Returns:
         Document: The translated Document object.
     """
+    from docx import Document
+    from utils.docx_text import iter_paragraphs, merge_runs, paragraph_text, apply_translation
     print(f"Translating document: {file_path}")
     document = Document(file_path)
-    translator = GoogleTranslator(source='auto', target=target_language)
-    
-    for paragraph in document.paragraphs:
-        translate_paragraph(paragraph, translator)
-    for table in document.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for paragraph in cell.paragraphs:
-                    translate_paragraph(paragraph, translator)
+    if engine is None:
+        engine = make_engine(target_language)
+    memory = get_translation_memory() if use_memory else None
+    hits_before, misses_before = (memory.hits, memory.misses) if memory is not None else (0, 0)
+
+    work = []
+    for paragraph in iter_paragraphs(document):
+        runs = merge_runs(paragraph)
+        text = paragraph_text(runs).strip()
+        if text:
+            work.append((runs, text))
+    translations = engine.translate_many([text for _, text in work], memory=memory, source_language=source_language,
+                                         target_language=target_language, on_progress=on_progress)
+    for (runs, text), translated_text in zip(work, translations):
+        if translated_text is None:
+            print(f"Error translating paragraph '{text}': keeping original text")
+            continue
+        apply_translation(runs, translated_text)
+    _report_memory(memory, hits_before, misses_before)
     return document
+
+def translate_document_streaming(file_path, output_path, target_language='ne', use_memory=True, engine=None,
+                                 on_progress=None, source_language='auto'):
+    """
+    Translates a Word document straight from one .docx file to another with
+    bounded memory, for documents too large to load with python-docx. Only
+    the text of the body, headers and footers is rewritten; images and other
+    parts are copied unchanged. See utils.docx_stream.
+
+    Args:
+        file_path (str): Path to the input .docx file.
+        output_path (str): Path of the translated .docx to write.
+        target_language (str): Target language code (default is 'ne').
+        use_memory (bool): Reuse and store translations in the persistent
+                           translation memory (default is True).
+        engine (TranslationEngine): Engine to translate with. If not provided,
+                                    one is created with make_engine().
+        on_progress (callable): Called as on_progress(done, total) with the
+                                bytes of document text processed so far.
+        source_language (str): Language of the document, or 'auto' to let the
+                               backend detect it (the default).
+
+    Returns:
+        str: output_path.
+    """
+    from utils.docx_stream import translate_docx_streaming
+    print(f"Translating document (streaming): {file_path}")
+    if engine is None:
+        engine = make_engine(target_language)
+    memory = get_translation_memory() if use_memory else None
+    hits_before, misses_before = (memory.hits, memory.misses) if memory is not None else (0, 0)
+
+    def translate(texts):
+        return engine.translate_many(texts, memory=memory, source_language=source_language,
+                                     target_language=target_language)
+
+    translate_docx_streaming(file_path, output_path, translate, on_progress=on_progress)
+    _report_memory(memory, hits_before, misses_before)
+    return output_path
@@ -0,0 +1,266 @@
+# utils/translation_backends.py
+"""
+Translation backends.
+
+A backend translates a batch of texts at once with
+translate_batch(texts, source_language, target_language). The
+TranslationEngine around it takes care of deduplication, the translation
+memory, packing texts into batches, concurrency, rate limits and retries, and
+reads its defaults from the backend:
+
+    name                 part of the translation memory key
+    max_chars            largest batch, in characters
+    max_texts            largest batch, in texts (None for no limit)
+    default_concurrency  batches in flight at once
+    default_rate         batches per second, or None for no limit
+    joins_lines          True if a batch travels as one newline-joined
+                         string, so texts with newlines must go alone
+
+Backends are looked up by name with get_backend(); the default comes from
+GLOBAL_CLASSROOM_TRANSLATION_BACKEND and is 'google'. The built-in backends
+can be pickled, so worker processes rebuild the same backend with the same
+options.
+"""
+
+import os
+import threading
+
+BACKEND_ENV = "GLOBAL_CLASSROOM_TRANSLATION_BACKEND"
+DEFAULT_BACKEND = "google"
+MT_MODELS_ENV = "GLOBAL_CLASSROOM_MT_MODELS"
+MT_SOURCE_ENV = "GLOBAL_CLASSROOM_MT_SOURCE"
+DEFAULT_MT_MODELS = os.path.join(os.path.expanduser("~"), ".global_classroom", "mt_models")
+
+
+class BatchMismatchError(ValueError):
+    """A batch came back with a different number of texts; retrying will not help."""
+
+
+class TranslationBackend:
+    """Base class; see the module docstring."""
+
+    name = None
+    max_chars = 4500
+    max_texts = None
+    default_concurrency = 4
+    default_rate = 5.0
+    joins_lines = False
+
+    def translate_batch(self, texts, source_language, target_language):
+        """
+        Returns the translations of texts, in order. Raises if the batch as a
+        whole failed; the engine then retries and falls back to single texts.
+        """
+        raise NotImplementedError
+
+
+class TranslatorBackend(TranslationBackend):
+    """
+    Adapts translators with a translate(text) method, such as
+    deep_translator's, that take one string per request. A batch is sent as
+    one newline-joined request and split back by line.
+
+    Args:
+        factory (callable): factory(source_language, target_language) returns
+                            a translator. Each thread gets its own instance.
+        name (str): Backend name for the translation memory.
+    """
+
+    # One line per text, so a text that has newlines must travel alone.
+    joins_lines = True
+
+    def __init__(self, factory, name="custom", max_chars=4500, default_concurrency=4, default_rate=5.0):
+        self.factory = factory
+        self.name = name
+        self.max_chars = max_chars
+        self.default_concurrency = default_concurrency
+        self.default_rate = default_rate
+        self._local = threading.local()
+
+    def _translator(self, source_language, target_language):
+        translators = getattr(self._local, "translators", None)
+        if translators is None:
+            translators = self._local.translators = {}
+        key = (source_language, target_language)
+        if key not in translators:
+            translators[key] = self.factory(source_language, target_language)
+        return translators[key]
+
+    def translate_batch(self, texts, source_language, target_language):
+        translator = self._translator(source_language, target_language)
+        if len(texts) == 1:
+            return [translator.translate(texts[0])]
+        response = translator.translate("\n".join(texts))
+        lines = response.split("\n") if response else []
+        if len(lines) != len(texts):
+            raise BatchMismatchError(f"Batch of {len(texts)} texts came back with {len(lines)} lines")
+        return [line.strip() for line in lines]
+
+
+# Whisper's language codes where Google uses a different one.
+_GOOGLE_LANGUAGE_CODES = {"zh": "zh-CN", "yue": "zh-TW", "he": "iw", "nn": "no"}
+
+
+class GoogleBackend(TranslatorBackend):
+    """Google Translate through deep_translator. Needs network access."""
+
+    def __init__(self):
+        def factory(source_language, target_language):
+            from deep_translator import GoogleTranslator
+            from deep_translator.exceptions import LanguageNotSupportedException
+            source = _GOOGLE_LANGUAGE_CODES.get(source_language, source_language or 'auto')
+            try:
+                return GoogleTranslator(source=source, target=target_language)
+            except LanguageNotSupportedException:
+                if source == 'auto':
+                    raise
+                # A detected language Google does not know; let it detect instead.
+                return GoogleTranslator(source='auto', target=target_language)
+        # Google rejects requests of 5000 characters or more; leave headroom
+        # for the newlines added between texts.
+        super().__init__(factory, name="google", max_chars=4500, default_concurrency=4, default_rate=5.0)
+
+    def __reduce__(self):
+        # The factory is a closure; a worker process builds its own instead.
+        return GoogleBackend, ()
+
+
+class CTranslate2Backend(TranslationBackend):
+    """
+    Offline translation with local Marian (OPUS-MT) models run by CTranslate2
+    on the CPU, with batched inference and no network.
+
+    Each language pair is a directory named "<source>-<target>" under
+    models_dir holding a CTranslate2 model converted with, for example,
+
+        ct2-transformers-converter --model Helsinki-NLP/opus-mt-en-ne \\
+            --output_dir <models_dir>/en-ne --quantization int8
+
+    together with the source.spm and target.spm SentencePiece files from the
+    original model. Models are loaded on first use and kept.
+
+    Args:
+        models_dir (str): Where the pair directories are. Defaults to
+                          GLOBAL_CLASSROOM_MT_MODELS or
+                          ~/.global_classroom/mt_models.
+        source_language (str): Language assumed when the source is 'auto'.
+                               Defaults to GLOBAL_CLASSROOM_MT_SOURCE or 'en'.
+        device (str): 'cpu' or 'cuda'.
+        compute_type (str): CTranslate2 compute type, e.g. 'int8'.
+        threads (int): Threads per translation; 0 lets CTranslate2 decide.
+        beam_size (int): Beam width; 1 is greedy and fastest.
+        max_batch_size (int): Sentences per inference batch.
+    """
+
+    max_chars = 20000
+    default_concurrency = 1  # CTranslate2 parallelises inside a batch.
+    default_rate = None
+
+    def __init__(self, models_dir=None, source_language=None, device="cpu", compute_type="int8", threads=0,
+                 beam_size=2, max_batch_size=32):
+        self.models_dir = models_dir or os.environ.get(MT_MODELS_ENV, DEFAULT_MT_MODELS)
+        self.source_language = source_language or os.environ.get(MT_SOURCE_ENV, "en")
+        self.device = device
+        self.compute_type = compute_type
+        self.threads = threads
+        self.beam_size = beam_size
+        self.max_batch_size = max_batch_size
+        self.max_texts = max_batch_size * 4
+        self.name = f"ctranslate2:{os.path.basename(os.path.normpath(self.models_dir))}"
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # Loaded models stay behind; a worker process loads its own.
+        return CTranslate2Backend, (self.models_dir, self.source_language, self.device, self.compute_type,
+                                    self.threads, self.beam_size, self.max_batch_size)
+
+    def _pair_dir(self, source_language, target_language):
+        # The GUI uses Google's codes, e.g. 'zh-cn'; OPUS-MT uses 'zh'.
+        for source in dict.fromkeys((source_language, source_language.split("-")[0])):
+            for target in dict.fromkeys((target_language, target_language.split("-")[0])):
+                path = os.path.join(self.models_dir, f"{source}-{target}")
+                if os.path.isdir(path):
+                    return path
+        raise FileNotFoundError(f"No local translation model for {source_language}->{target_language} "
+                                f"in '{self.models_dir}'")
+
+    def _model(self, source_language, target_language):
+        path = self._pair_dir(source_language, target_language)
+        with self._lock:
+            if path not in self._models:
+                try:
+                    import ctranslate2
+                    import sentencepiece
+                except ImportError as e:
+                    raise ImportError("The local translation backend needs ctranslate2 and sentencepiece: "
+                                      "pip install ctranslate2 sentencepiece") from e
+                translator = ctranslate2.Translator(path, device=self.device, compute_type=self.compute_type,
+                                                    intra_threads=self.threads)
+                source_sp = sentencepiece.SentencePieceProcessor(model_file=os.path.join(path, "source.spm"))
+                target_sp = sentencepiece.SentencePieceProcessor(model_file=os.path.join(path, "target.spm"))
+                self._models[path] = (translator, source_sp, target_sp)
+            return self._models[path]
+
+    def translate_batch(self, texts, source_language, target_language):
+        if not source_language or source_language == "auto":
+            source_language = self.source_language
+        translator, source_sp, target_sp = self._model(source_language, target_language)
+        # Translate line by line so multi-line texts keep their shape.
+        lines = [line for text in texts for line in text.split("\n")]
+        to_translate = [line for line in lines if line.strip()]
+        tokens = [source_sp.encode(line, out_type=str) + ["</s>"] for line in to_translate]
+        results = translator.translate_batch(tokens, max_batch_size=self.max_batch_size, beam_size=self.beam_size)
+        translated = iter(target_sp.decode(result.hypotheses[0]) for result in results)
+        lines = [next(translated) if line.strip() else line for line in lines]
+        output = []
+        position = 0
+        for text in texts:
+            count = text.count("\n") + 1
+            output.append("\n".join(lines[position:position + count]))
+            position += count
+        return output
+
+
+_BACKENDS = {
+    "google": GoogleBackend,
+    "local": CTranslate2Backend,
+}
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_backend(name=None, **options):
+    """
+    Creates a backend by name: 'google' or 'local' (CTranslate2).
+    Without a name, returns the process-wide default backend.
+    """
+    if name is None and not options:
+        return get_default_backend()
+    name = name or os.environ.get(BACKEND_ENV, DEFAULT_BACKEND)
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown translation backend '{name}', expected one of {sorted(_BACKENDS)}")
+    return _BACKENDS[name](**options)
+
+
+def get_default_backend():
+    """Returns the backend set with set_default_backend, or the one named by GLOBAL_CLASSROOM_TRANSLATION_BACKEND."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = get_backend(os.environ.get(BACKEND_ENV, DEFAULT_BACKEND))
+        return _default
+
+
+def set_default_backend(backend=None):
+    """
+    Makes every engine created without an explicit backend use this one.
+    Accepts a backend or a backend name; None goes back to the environment
+    setting.
+    """
+    global _default
+    if isinstance(backend, str):
+        backend = get_backend(backend)
+    with _default_lock:
+        _default = backend
@@ -0,0 +1,244 @@
+# utils/translation_engine.py
+
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils import metrics
+
+# GoogleTranslator rejects requests of 5000 characters or more; leave headroom
+# for the separators added when packing several texts into one request.
+MAX_BATCH_CHARS = 4500
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE = 5.0  # requests per second
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 0.5  # seconds
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Each acquire() takes one token, waiting until
+    one is available. Tokens refill at `rate` per second up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def shared_limiter(backend_name, rate):
+    """
+    Returns the process-wide token bucket for a backend and rate. Engines are
+    created per call (per subtitle track, per document), so a bucket of
+    their own would let every concurrent caller send `rate` requests per
+    second; sharing one keeps the whole process under the limit.
+    """
+    with _limiters_lock:
+        key = (backend_name, float(rate))
+        if key not in _limiters:
+            _limiters[key] = TokenBucket(rate)
+        return _limiters[key]
+
+
+def pack_batches(texts, max_chars=MAX_BATCH_CHARS, max_texts=None, lone_multiline=True):
+    """
+    Groups texts into batches whose newline-joined length stays under max_chars
+    and that hold at most max_texts texts. A text longer than max_chars gets a
+    batch of its own, and so does one that contains a newline itself unless
+    lone_multiline is False.
+    """
+    batches = []
+    current = []
+    current_len = 0
+    for text in texts:
+        if lone_multiline and "\n" in text:
+            batches.append([text])
+            continue
+        added = len(text) + (1 if current else 0)
+        if current and (current_len + added > max_chars or (max_texts and len(current) >= max_texts)):
+            batches.append(current)
+            current = []
+            current_len = 0
+            added = len(text)
+        current.append(text)
+        current_len += added
+    if current:
+        batches.append(current)
+    return batches
+
+
+class TranslationEngine:
+    """
+    Translates many texts concurrently with a backend from
+    utils.translation_backends.
+
+    Texts are deduplicated, looked up in an optional translation memory and
+    packed into batches sized for the backend. The batches run on a bounded
+    thread pool, pass through a shared token-bucket rate limiter and are
+    retried with exponential backoff; a batch that keeps failing is retried
+    one text at a time. Concurrency and rate default to the backend's own;
+    rate=0 turns the rate limit off. With the backend's default rate, all
+    engines on that backend share one limiter (see shared_limiter); an
+    explicit rate or burst gives the engine a limiter of its own.
+
+    For compatibility, `backend` may also be a function returning an object
+    with a translate(text) method, such as deep_translator's GoogleTranslator.
+    """
+
+    def __init__(self, backend, concurrency=None, rate=None, burst=None, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff=DEFAULT_BACKOFF, max_chars=None, target_language=None, source_language='auto'):
+        from utils.translation_backends import TranslationBackend, TranslatorBackend, BatchMismatchError
+        self._mismatch_error = BatchMismatchError
+        if not isinstance(backend, TranslationBackend):
+            factory = backend
+            backend = TranslatorBackend(lambda source, target: factory(), default_concurrency=DEFAULT_CONCURRENCY,
+                                        default_rate=DEFAULT_RATE)
+        self.backend = backend
+        self.concurrency = max(1, int(concurrency or backend.default_concurrency))
+        if rate is None and burst is None:
+            rate = backend.default_rate
+            self.limiter = shared_limiter(backend.name, rate) if rate else None
+        else:
+            rate = backend.default_rate if rate is None else rate
+            self.limiter = TokenBucket(rate, burst) if rate else None
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_chars = max_chars or backend.max_chars
+        self.target_language = target_language
+        self.source_language = source_language
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self._stats_lock = threading.Lock()
+
+    def _count(self, requests=0, retries=0, failures=0):
+        with self._stats_lock:
+            self.requests += requests
+            self.retries += retries
+            self.failures += failures
+
+    def _request(self, batch, source_language, target_language):
+        """Sends one batch, retrying with exponential backoff. Raises the last error."""
+        backend = self.backend.name
+        attempt = 0
+        with metrics.span("translate_batch", backend=backend, target=target_language) as span:
+            span.set(texts=len(batch), chars=sum(len(text) for text in batch))
+            while True:
+                if self.limiter is not None:
+                    self.limiter.acquire()
+                self._count(requests=1)
+                metrics.count("translation_requests", backend=backend)
+                try:
+                    return self.backend.translate_batch(batch, source_language, target_language)
+                except Exception as e:
+                    if attempt >= self.max_retries or isinstance(e, self._mismatch_error):
+                        raise
+                    delay = self.backoff * (2 ** attempt)
+                    time.sleep(delay + random.uniform(0, delay))
+                    attempt += 1
+                    span.set(retries=attempt)
+                    self._count(retries=1)
+                    metrics.count("translation_retries", backend=backend)
+
+    def _translate_packed(self, batch, source_language, target_language):
+        if len(batch) > 1:
+            try:
+                return self._request(batch, source_language, target_language)
+            except Exception as e:
+                print(f"Error translating batch of {len(batch)} texts: {e}; retrying one by one.")
+                metrics.error("translate_batch", f"{len(batch)} texts: {e}")
+        results = []
+        for text in batch:
+            try:
+                results.append(self._request([text], source_language, target_language)[0])
+            except Exception as e:
+                print(f"Error translating text '{text}': {e}")
+                metrics.error("translate_text", f"'{text}': {e}")
+                self._count(failures=1)
+                results.append(None)
+        return results
+
+    def translate_many(self, texts, memory=None, source_language=None, target_language=None, backend=None,
+                       on_progress=None):
+        """
+        Translates a list of texts.
+
+        Args:
+            texts (list): Texts to translate.
+            memory (TranslationMemory): Optional store to read from and write to.
+            source_language (str): Source language code. Defaults to the
+                                   engine's, normally 'auto'.
+            target_language (str): Target language code. Defaults to the
+                                   engine's.
+            backend (str): Name under which results are kept in the memory.
+                           Defaults to the backend's name.
+            on_progress (callable): Called as on_progress(done, total) with the
+                                    number of input texts finished so far.
+
+        Returns:
+            list: Translations in the same order as texts. An entry is None if
+                  that text could not be translated.
+        """
+        source_language = source_language or self.source_language
+        target_language = target_language or self.target_language
+        backend = backend or self.backend.name
+        occurrences = Counter(texts)
+        unique = list(dict.fromkeys(t for t in texts if t and t.strip()))
+        translated = {}
+        if memory is not None:
+            translated = memory.get_many(unique, source_language, target_language, backend)
+            unique = [t for t in unique if t not in translated]
+
+        done = len(texts) - sum(occurrences[t] for t in unique)
+        if on_progress is not None:
+            on_progress(done, len(texts))
+
+        batches = pack_batches(unique, self.max_chars, self.backend.max_texts, self.backend.joins_lines)
+        new_translations = {}
+        if self.concurrency == 1 or len(batches) <= 1:
+            for batch in batches:
+                new_translations.update(zip(batch, self._translate_packed(batch, source_language, target_language)))
+                done += sum(occurrences[t] for t in batch)
+                if on_progress is not None:
+                    on_progress(done, len(texts))
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches)),
+                                    thread_name_prefix="translate") as pool:
+                futures = {pool.submit(self._translate_packed, batch, source_language, target_language): batch
+                           for batch in batches}
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    new_translations.update(zip(batch, future.result()))
+                    done += sum(occurrences[t] for t in batch)
+                    if on_progress is not None:
+                        on_progress(done, len(texts))
+
+        if memory is not None:
+            memory.put_many(new_translations, source_language, target_language, backend)
+        translated.update(new_translations)
+        return [translated.get(text) for text in texts]
+
+    def translate(self, text):
+        """Translates a single text; returns None if it could not be translated."""
+        return self.translate_many([text])[0]
@@ -0,0 +1,189 @@
+# utils/translation_memory.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from utils import metrics
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".global_classroom", "translation_memory.sqlite3")
+DEFAULT_MAX_ENTRIES = 500000
+
+# How long a connection waits for another process's write to finish before
+# giving up with "database is locked". Document worker processes share the
+# file, and an eviction can hold the write lock for a while.
+BUSY_TIMEOUT_SECONDS = 30.0
+
+# SQLite limits the number of bound parameters per statement.
+_QUERY_CHUNK = 500
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TranslationMemory:
+    """
+    Persistent cache of translations stored in a local SQLite file.
+
+    Entries are keyed by (source text hash, source language, target language,
+    backend). Once the store holds more than `max_entries` rows the least
+    recently used ones are deleted. Hit and miss counts are kept per instance.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT_SECONDS)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                text_hash TEXT NOT NULL,
+                source_language TEXT NOT NULL,
+                target_language TEXT NOT NULL,
+                backend TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (text_hash, source_language, target_language, backend)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+        self._conn.commit()
+
+    def get_many(self, texts, source_language, target_language, backend):
+        """
+        Looks up several texts at once.
+
+        Returns:
+            dict: Maps each text found in the store to its translation.
+        """
+        hashes = {}
+        for text in texts:
+            hashes.setdefault(text_hash(text), text)
+        found = {}
+        now = time.time()
+        with self._lock:
+            keys = list(hashes)
+            for start in range(0, len(keys), _QUERY_CHUNK):
+                chunk = keys[start:start + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, translation FROM translations "
+                    f"WHERE source_language = ? AND target_language = ? AND backend = ? "
+                    f"AND text_hash IN ({placeholders})",
+                    [source_language, target_language, backend, *chunk],
+                ).fetchall()
+                for h, translation in rows:
+                    found[hashes[h]] = translation
+                self._conn.executemany(
+                    "UPDATE translations SET last_used = ? WHERE text_hash = ? AND source_language = ? "
+                    "AND target_language = ? AND backend = ?",
+                    [(now, h, source_language, target_language, backend) for h, _ in rows],
+                )
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        metrics.count("cache_hits", len(found), cache="translation_memory")
+        metrics.count("cache_misses", len(hashes) - len(found), cache="translation_memory")
+        return found
+
+    def get(self, text, source_language, target_language, backend):
+        """Returns the stored translation of text, or None."""
+        return self.get_many([text], source_language, target_language, backend).get(text)
+
+    def put_many(self, translations, source_language, target_language, backend):
+        """
+        Stores translations.
+
+        Args:
+            translations (dict): Maps source text to translated text.
+        """
+        now = time.time()
+        rows = [
+            (text_hash(text), source_language, target_language, backend, translated, now)
+            for text, translated in translations.items()
+            if translated is not None
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._writes_since_evict += len(rows)
+            # Counting rows is not free, so only check the bound now and then.
+            if self._writes_since_evict >= max(1, self.max_entries // 100):
+                self._evict()
+            self._conn.commit()
+
+    def put(self, text, translation, source_language, target_language, backend):
+        self.put_many({text: translation}, source_language, target_language, backend)
+
+    def _evict(self):
+        self._writes_since_evict = 0
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM translations WHERE rowid IN "
+                "(SELECT rowid FROM translations ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def stats(self):
+        """Returns a dict with hit and miss counts and the number of stored entries."""
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": count}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_memory = None
+_memory_lock = threading.Lock()
+# Connections inherited across fork(). SQLite connections must not be used
+# or closed in the child, so they are only kept from being collected there.
+_inherited = []
+
+
+def get_translation_memory():
+    """
+    Returns the process-wide translation memory, opening it on first use.
+    The file location can be changed with GLOBAL_CLASSROOM_TM_PATH.
+    Returns None if the store cannot be opened.
+    """
+    global _memory
+    with _memory_lock:
+        if _memory is None:
+            path = os.environ.get("GLOBAL_CLASSROOM_TM_PATH", DEFAULT_PATH)
+            try:
+                _memory = TranslationMemory(path)
+            except (sqlite3.Error, OSError) as e:
+                print(f"Error opening translation memory '{path}': {e}")
+                metrics.error("translation_memory", e, file=path)
+                return None
+        return _memory
+
+
+def _after_fork():
+    """Makes a forked child open the store again instead of using the parent's connection."""
+    global _memory, _memory_lock
+    if _memory is not None:
+        _inherited.append(_memory)
+    _memory = None
+    # The parent may have held the lock at the moment of the fork.
+    _memory_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,61 @@
+# utils/workspace.py
+
+import os
+import shutil
+import sys
+import tempfile
+
+# Scratch files (decoded audio spills, intermediate SRTs, partial outputs) go
+# here. Defaults to the system temp dir; point it at a fast local disk with
+# GLOBAL_CLASSROOM_WORK_DIR.
+WORK_DIR_ENV = "GLOBAL_CLASSROOM_WORK_DIR"
+
+# ioctl request number for FICLONE on Linux (btrfs, XFS, ...).
+_FICLONE = 0x40049409
+
+
+def get_work_dir(work_dir=None):
+    """Returns the directory scratch files are created in, creating it if needed."""
+    work_dir = work_dir or os.environ.get(WORK_DIR_ENV) or tempfile.gettempdir()
+    os.makedirs(work_dir, exist_ok=True)
+    return work_dir
+
+
+def make_scratch_dir(work_dir=None, prefix="global_classroom_"):
+    """Creates a fresh scratch directory inside the work dir and returns its path."""
+    return tempfile.mkdtemp(prefix=prefix, dir=get_work_dir(work_dir))
+
+
+def _reflink(src, dst):
+    import fcntl
+    with open(src, "rb") as source, open(dst, "wb") as target:
+        try:
+            fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+        except OSError:
+            target.close()
+            os.remove(dst)
+            raise
+
+
+def link_or_copy(src, dst_dir):
+    """
+    Makes src available inside dst_dir without copying data where possible:
+    a hardlink first, then a reflink (copy-on-write clone) on Linux, and only
+    then a plain copy.
+
+    Returns:
+        str: Path of the file inside dst_dir.
+    """
+    dst = os.path.join(dst_dir, os.path.basename(src))
+    try:
+        os.link(src, dst)
+        return dst
+    except OSError:
+        pass
+    if sys.platform.startswith("linux"):
+        try:
+            _reflink(src, dst)
+            return dst
+        except OSError:
+            pass
+    return shutil.copy(src, dst)